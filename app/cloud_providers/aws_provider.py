@@ -1,31 +1,74 @@
 import boto3
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+from cloud_providers.incremental import IncrementalScanner
+from cloud_providers.inventory import Inventory, ResourceRecord, region_from_zone
+from cloud_providers.pricing import estimate_monthly_cost
+from cloud_providers.scan_budget import ScanBudget
+from cloud_providers.snapshot import snapshot_client
 
 class AWSProvider:
     def __init__(self):
-        self.ec2 = boto3.client('ec2')
-        self.cloudwatch = boto3.client('cloudwatch')
-        self.cost_explorer = boto3.client('ce')
+        # Captured to or replayed from a snapshot when SCAN_SNAPSHOT_MODE is set
+        self.ec2 = snapshot_client('aws.ec2', lambda: boto3.client('ec2'))
+        self.cloudwatch = snapshot_client('aws.cloudwatch', lambda: boto3.client('cloudwatch'))
+        self.cost_explorer = snapshot_client('aws.ce', lambda: boto3.client('ce'))
+        self.scanner = IncrementalScanner('aws')
+
+    def get_unused_resources(self, budget: Optional[ScanBudget] = None) -> Inventory:
+        """Identify unused or underutilized EC2 instances.
 
-    def get_unused_resources(self) -> List[Dict]:
-        """Identify unused or underutilized EC2 instances."""
+        Only instances that are new, changed or stale since the last scan are analyzed again.
+        With a budget, the most expensive instances are analyzed first and the scan stops
+        at the deadline, reporting its coverage on the returned inventory.
+        """
         instances = self._get_running_instances()
-        unused_resources = []
+        unused_resources = self.scanner.scan(
+            instances,
+            key=lambda instance: instance['InstanceId'],
+            fingerprint=self._instance_fingerprint,
+            analyze=self._analyze_instance,
+            estimate_cost=self._estimate_instance_cost,
+            budget=budget,
+            resource_type='EC2'
+        )
+        if budget is not None:
+            unused_resources.coverage = budget.to_dict()
+        return unused_resources
 
-        for instance in instances:
-            cpu_utilization = self._get_cpu_utilization(instance['InstanceId'])
-            if cpu_utilization < 5:  # Less than 5% CPU utilization
-                unused_resources.append({
-                    'resource_id': instance['InstanceId'],
-                    'resource_type': 'EC2',
-                    'region': instance.get('Placement', {}).get('AvailabilityZone', ''),
-                    'utilization': cpu_utilization,
-                    'recommendation': 'Consider stopping or terminating this instance',
-                    'potential_savings': self._calculate_potential_savings(instance)
-                })
+    def _estimate_instance_cost(self, instance: Dict) -> float:
+        """Estimate an instance's monthly cost for prioritizing the scan."""
+        zone = instance.get('Placement', {}).get('AvailabilityZone', '')
+        return estimate_monthly_cost('aws', instance.get('InstanceType', ''), region_from_zone(zone))
 
-        return unused_resources
+    def _instance_fingerprint(self, instance: Dict) -> Dict:
+        """Get the instance attributes whose change requires re-analysis."""
+        return {
+            'instance_type': instance.get('InstanceType'),
+            'zone': instance.get('Placement', {}).get('AvailabilityZone'),
+            'launch_time': instance.get('LaunchTime'),
+            'tags': sorted((tag['Key'], tag['Value']) for tag in instance.get('Tags', [])),
+        }
+
+    def _analyze_instance(self, instance: Dict) -> Optional[ResourceRecord]:
+        """Check a single instance's utilization and build a record if it is unused."""
+        cpu_utilization = self._get_cpu_utilization(instance['InstanceId'])
+        if cpu_utilization >= 5:  # Only report instances under 5% CPU utilization
+            return None
+
+        zone = instance.get('Placement', {}).get('AvailabilityZone', '')
+        return ResourceRecord(
+            provider='aws',
+            resource_id=instance['InstanceId'],
+            resource_type='EC2',
+            region=region_from_zone(zone),
+            zone=zone,
+            instance_type=instance.get('InstanceType', ''),
+            utilization=cpu_utilization,
+            recommendation='Consider stopping or terminating this instance',
+            potential_savings=self._calculate_potential_savings(instance)
+        )
 
     def get_cost_analysis(self) -> Dict:
         """Get cost analysis for the last 30 days."""
@@ -43,6 +86,34 @@ class AWSProvider:
         
         return response['ResultsByTime']
 
+    def get_daily_costs(self, days: int = 30) -> List[Dict]:
+        """Get daily unblended cost per service for the last N days."""
+        end = datetime.now()
+        start = end - timedelta(days=days)
+
+        rows = []
+        kwargs = {
+            'TimePeriod': {'Start': start.strftime('%Y-%m-%d'), 'End': end.strftime('%Y-%m-%d')},
+            'Granularity': 'DAILY',
+            'Metrics': ['UnblendedCost'],
+            'GroupBy': [{'Type': 'DIMENSION', 'Key': 'SERVICE'}],
+        }
+        while True:
+            response = self.cost_explorer.get_cost_and_usage(**kwargs)
+            for result in response['ResultsByTime']:
+                for group in result.get('Groups', []):
+                    amount = group['Metrics']['UnblendedCost']
+                    rows.append({
+                        'provider': 'aws',
+                        'date': result['TimePeriod']['Start'],
+                        'service': group['Keys'][0],
+                        'cost': float(amount['Amount']),
+                        'currency': amount.get('Unit', 'USD'),
+                    })
+            if not response.get('NextPageToken'):
+                return rows
+            kwargs['NextPageToken'] = response['NextPageToken']
+
     def _get_running_instances(self) -> List:
         """Get all running EC2 instances."""
         response = self.ec2.describe_instances(
@@ -1,35 +1,53 @@
-from azure.identity import DefaultAzureCredential
 from azure.mgmt.consumption import ConsumptionManagementClient
 from azure.mgmt.monitor import MonitorManagementClient
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Dict, List, Optional
 import os
 
+from cloud_providers.azure_credentials import shared_credential
+from cloud_providers.incremental import IncrementalScanner
+from cloud_providers.inventory import Inventory, ResourceRecord
+from cloud_providers.pricing import estimate_monthly_cost
+from cloud_providers.scan_budget import ScanBudget
+from cloud_providers.snapshot import shared_snapshot, snapshot_client
+
 class AzureProvider:
-    def __init__(self):
-        self.credential = DefaultAzureCredential()
-        self.subscription_id = os.getenv('AZURE_SUBSCRIPTION_ID')
-        self.consumption_client = ConsumptionManagementClient(
-            self.credential,
-            self.subscription_id
+    def __init__(self, subscription_id: Optional[str] = None):
+        snapshot = shared_snapshot()
+        # One credential and token cache for all clients and subscriptions; replays need none
+        self.credential = None if snapshot is not None and snapshot.replaying else shared_credential()
+        self.subscription_id = subscription_id or os.getenv('AZURE_SUBSCRIPTION_ID')
+        # Captured to or replayed from a snapshot when SCAN_SNAPSHOT_MODE is set
+        self.consumption_client = snapshot_client(
+            f"azure.{self.subscription_id}.consumption",
+            lambda: ConsumptionManagementClient(self.credential, self.subscription_id),
+            snapshot
         )
-        self.monitor_client = MonitorManagementClient(
-            self.credential,
-            self.subscription_id
+        self.monitor_client = snapshot_client(
+            f"azure.{self.subscription_id}.monitor",
+            lambda: MonitorManagementClient(self.credential, self.subscription_id),
+            snapshot
         )
+        self.scanner = IncrementalScanner('azure')
+
+    def get_unused_resources(self, budget: Optional[ScanBudget] = None) -> Inventory:
+        """Identify unused or underutilized Azure resources.
 
-    def get_unused_resources(self) -> List[Dict]:
-        """Identify unused or underutilized Azure resources."""
-        unused_resources = []
+        With a budget, the most expensive VMs are analyzed first and the scan stops at the
+        deadline, reporting its coverage on the returned inventory.
+        """
+        unused_resources = Inventory()
         
         # Check VM utilization
-        underutilized_vms = self._get_underutilized_vms()
+        underutilized_vms = self._get_underutilized_vms(budget)
         unused_resources.extend(underutilized_vms)
         
         # Check unused disks
         unused_disks = self._get_unused_disks()
         unused_resources.extend(unused_disks)
         
+        if budget is not None:
+            unused_resources.coverage = budget.to_dict()
         return unused_resources
 
     def get_cost_analysis(self) -> Dict:
@@ -82,35 +100,97 @@ class AzureProvider:
         except Exception as e:
             return {'error': str(e)}
 
-    def _get_underutilized_vms(self) -> List[Dict]:
-        """Find VMs with low CPU utilization."""
-        results = []
+    def get_daily_costs(self, days: int = 30) -> List[Dict]:
+        """Get daily pre-tax cost per consumed service for the last N days."""
+        scope = f"/subscriptions/{self.subscription_id}"
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=days)
+
+        usage_details = self.consumption_client.usage_details.list(
+            scope=scope,
+            expand="properties",
+            filter=f"properties/usageStart ge '{start_date.strftime('%Y-%m-%d')}' and properties/usageEnd le '{end_date.strftime('%Y-%m-%d')}'"
+        )
+
+        totals: Dict[tuple, float] = {}
+        currencies: Dict[tuple, str] = {}
+        for usage in usage_details:
+            key = (usage.properties.usage_start.strftime('%Y-%m-%d'), usage.properties.consumed_service)
+            totals[key] = totals.get(key, 0.0) + float(usage.properties.pretax_cost)
+            currencies[key] = usage.properties.currency or 'USD'
+
+        return [
+            {'provider': 'azure', 'date': day, 'service': service, 'cost': cost, 'currency': currencies[(day, service)]}
+            for (day, service), cost in sorted(totals.items())
+        ]
+
+    def _get_underutilized_vms(self, budget: Optional[ScanBudget] = None) -> List[ResourceRecord]:
+        """Find VMs with low CPU utilization, re-analyzing only new, changed or stale VMs."""
         try:
             # Get list of VMs
             vms = self.monitor_client.virtual_machines.list_all()
             
-            for vm in vms:
-                cpu_metrics = self._get_vm_cpu_metrics(vm.id)
-                if cpu_metrics < 5:  # Less than 5% CPU utilization
-                    results.append({
-                        'resource_id': vm.id,
-                        'resource_type': 'Virtual Machine',
-                        'resource_group': vm.resource_group,
-                        'location': vm.location,
-                        'utilization': cpu_metrics,
-                        'recommendation': 'Consider downsizing or stopping this VM',
-                    })
+            return list(self.scanner.scan(
+                vms,
+                key=lambda vm: vm.id,
+                fingerprint=self._vm_fingerprint,
+                analyze=self._analyze_vm,
+                estimate_cost=self._estimate_vm_cost,
+                budget=budget,
+                resource_type='Virtual Machine'
+            ))
         except Exception as e:
             print(f"Error getting VM metrics: {e}")
             
-        return results
+        return []
+
+    def _vm_fingerprint(self, vm) -> Dict:
+        """Get the VM attributes whose change requires re-analysis."""
+        hardware_profile = getattr(vm, 'hardware_profile', None)
+        return {
+            'vm_size': getattr(hardware_profile, 'vm_size', None),
+            'location': vm.location,
+            'tags': getattr(vm, 'tags', None),
+            'provisioning_state': getattr(vm, 'provisioning_state', None),
+        }
+
+    def _estimate_vm_cost(self, vm) -> float:
+        """Estimate a VM's monthly cost for prioritizing the scan."""
+        hardware_profile = getattr(vm, 'hardware_profile', None)
+        return estimate_monthly_cost('azure', getattr(hardware_profile, 'vm_size', '') or '', vm.location)
 
-    def _get_unused_disks(self) -> List[Dict]:
+    def _analyze_vm(self, vm) -> Optional[ResourceRecord]:
+        """Check a single VM's utilization and build a record if it is underutilized."""
+        cpu_metrics = self._get_vm_cpu_metrics(vm.id)
+        if cpu_metrics >= 5:  # Only report VMs under 5% CPU utilization
+            return None
+
+        hardware_profile = getattr(vm, 'hardware_profile', None)
+        return ResourceRecord(
+            provider='azure',
+            resource_id=vm.id,
+            resource_type='Virtual Machine',
+            region=vm.location,
+            scope=self._resource_group(vm.id),
+            instance_type=getattr(hardware_profile, 'vm_size', '') or '',
+            utilization=cpu_metrics,
+            recommendation='Consider downsizing or stopping this VM',
+        )
+
+    def _get_unused_disks(self) -> List[ResourceRecord]:
         """Find unused managed disks."""
         # Implementation would involve checking for unattached disks
         # This is a placeholder implementation
         return []
 
+    def _resource_group(self, resource_id: str) -> str:
+        """Get the resource group name from an Azure resource id."""
+        parts = resource_id.split('/')
+        for i, part in enumerate(parts[:-1]):
+            if part.lower() == 'resourcegroups':
+                return parts[i + 1]
+        return ''
+
     def _get_vm_cpu_metrics(self, resource_id: str) -> float:
         """Get CPU metrics for a specific VM."""
         try:
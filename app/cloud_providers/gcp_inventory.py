@@ -0,0 +1,177 @@
+from google.cloud import compute_v1
+from google.cloud import monitoring_v3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List
+import os
+
+from cloud_providers.inventory import region_from_zone
+from cloud_providers.pricing import estimate_disk_monthly_cost, estimate_monthly_cost
+from cloud_providers.snapshot import snapshot_client
+
+CPU_METRIC = 'compute.googleapis.com/instance/cpu/utilization'
+# Results per aggregated-list page; the API's maximum
+PAGE_SIZE = 500
+DEFAULT_PROJECT_WORKERS = int(os.getenv('GCP_SCAN_PROJECT_WORKERS', 8))
+
+
+def _last_segment(url: str) -> str:
+    """'https://.../zones/us-central1-a/machineTypes/e2-standard-4' -> 'e2-standard-4'."""
+    return (url or '').rsplit('/', 1)[-1]
+
+
+class GCPInventory:
+    """Instances and disks of one or more projects, with each instance's average CPU joined in."""
+
+    def __init__(self):
+        self.instances: List[Dict] = []
+        self.disks: List[Dict] = []
+        # project -> error, for projects that failed while the others completed
+        self.errors: Dict[str, str] = {}
+
+    def extend(self, other: 'GCPInventory') -> None:
+        self.instances.extend(other.instances)
+        self.disks.extend(other.disks)
+        self.errors.update(other.errors)
+
+    def instances_by_link(self) -> Dict[str, Dict]:
+        return {instance['self_link']: instance for instance in self.instances}
+
+
+class GCPInventoryScanner:
+    """List every instance and disk in a project with aggregated list calls and join CPU metrics.
+
+    aggregatedList returns all zones in a few pages of up to 500 resources, instead of
+    one list call per zone, and includes instances that publish no metrics (stopped, or
+    without the agent). CPU utilization for the whole project comes from one
+    ListTimeSeries call aligned to a single mean per instance over the window, joined to
+    instances by id in memory. Projects are scanned in parallel, and within a project
+    the instance, disk and metric listings run concurrently.
+    """
+
+    def __init__(
+        self,
+        project_ids: List[str],
+        max_workers: int = DEFAULT_PROJECT_WORKERS,
+        metric_window_hours: int = 24,
+        instances_client=None,
+        disks_client=None,
+        monitoring_client=None
+    ):
+        self.project_ids = project_ids
+        self.max_workers = max_workers
+        self.metric_window_hours = metric_window_hours
+        # Captured to or replayed from a snapshot when SCAN_SNAPSHOT_MODE is set
+        self.instances_client = instances_client or snapshot_client('gcp.compute.instances', lambda: compute_v1.InstancesClient())
+        self.disks_client = disks_client or snapshot_client('gcp.compute.disks', lambda: compute_v1.DisksClient())
+        self.monitoring_client = monitoring_client or snapshot_client('gcp.monitoring', lambda: monitoring_v3.MetricServiceClient())
+
+    def collect(self) -> GCPInventory:
+        """Scan every project in parallel; a failing project is reported in errors."""
+        inventory = GCPInventory()
+        if not self.project_ids:
+            return inventory
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(self.project_ids))) as executor:
+            for project_inventory in executor.map(self._collect_project, self.project_ids):
+                inventory.extend(project_inventory)
+        return inventory
+
+    def _collect_project(self, project_id: str) -> GCPInventory:
+        inventory = GCPInventory()
+        try:
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                instances = executor.submit(self._list_instances, project_id)
+                disks = executor.submit(self._list_disks, project_id)
+                cpu = executor.submit(self._get_cpu_averages, project_id)
+                cpu_by_id = cpu.result()
+                for instance in instances.result():
+                    instance['cpu_average'] = cpu_by_id.get(instance['id'])
+                    inventory.instances.append(instance)
+                inventory.disks = disks.result()
+        except Exception as e:
+            print(f"Error scanning GCP project {project_id}: {e}")
+            inventory = GCPInventory()
+            inventory.errors[project_id] = str(e)
+        return inventory
+
+    def _list_instances(self, project_id: str) -> List[Dict]:
+        request = compute_v1.AggregatedListInstancesRequest(
+            project=project_id, max_results=PAGE_SIZE, return_partial_success=True
+        )
+        instances = []
+        # The pager follows page tokens and yields (scope such as 'zones/us-central1-a', scoped list)
+        for _, scoped in self.instances_client.aggregated_list(request=request):
+            for instance in getattr(scoped, 'instances', None) or []:
+                zone = _last_segment(instance.zone)
+                instances.append({
+                    'id': str(instance.id),
+                    'name': instance.name,
+                    'project': project_id,
+                    'zone': zone,
+                    'region': region_from_zone(zone),
+                    'machine_type': _last_segment(instance.machine_type),
+                    'status': instance.status,
+                    'labels': dict(instance.labels or {}),
+                    'disks': [disk.source for disk in instance.disks or []],
+                    'self_link': instance.self_link,
+                })
+        return instances
+
+    def _list_disks(self, project_id: str) -> List[Dict]:
+        request = compute_v1.AggregatedListDisksRequest(
+            project=project_id, max_results=PAGE_SIZE, return_partial_success=True
+        )
+        disks = []
+        for _, scoped in self.disks_client.aggregated_list(request=request):
+            for disk in getattr(scoped, 'disks', None) or []:
+                # Regional disks carry a region instead of a zone
+                zone = _last_segment(disk.zone) if disk.zone else ''
+                disks.append({
+                    'id': str(disk.id),
+                    'name': disk.name,
+                    'project': project_id,
+                    'zone': zone,
+                    'region': region_from_zone(zone) if zone else _last_segment(disk.region),
+                    'disk_type': _last_segment(disk.type_),
+                    'size_gb': int(disk.size_gb or 0),
+                    'users': list(disk.users or []),
+                    'labels': dict(disk.labels or {}),
+                    'self_link': disk.self_link,
+                })
+        return disks
+
+    def _get_cpu_averages(self, project_id: str) -> Dict[str, float]:
+        """Mean CPU utilization (percent) per instance id over the window, from one paginated call."""
+        seconds = int(datetime.now().timestamp())
+        window = self.metric_window_hours * 3600
+        request = monitoring_v3.ListTimeSeriesRequest(
+            name=f"projects/{project_id}",
+            filter=f'metric.type = "{CPU_METRIC}"',
+            interval=monitoring_v3.TimeInterval({
+                'end_time': {'seconds': seconds},
+                'start_time': {'seconds': seconds - window},
+            }),
+            # One aligned mean per instance instead of every raw point
+            aggregation=monitoring_v3.Aggregation({
+                'alignment_period': {'seconds': window},
+                'per_series_aligner': monitoring_v3.Aggregation.Aligner.ALIGN_MEAN,
+            }),
+            view=monitoring_v3.ListTimeSeriesRequest.TimeSeriesView.FULL,
+        )
+        averages: Dict[str, List[float]] = {}
+        for time_series in self.monitoring_client.list_time_series(request):
+            instance_id = time_series.resource.labels['instance_id']
+            averages.setdefault(instance_id, []).extend(point.value.double_value for point in time_series.points)
+        return {
+            instance_id: sum(values) / len(values) * 100
+            for instance_id, values in averages.items() if values
+        }
+
+
+def estimate_instance_cost(instance: Dict) -> float:
+    """Estimate an instance's monthly cost from its machine type and region."""
+    return estimate_monthly_cost('gcp', instance['machine_type'], instance['region'])
+
+
+def estimate_disk_cost(disk: Dict) -> float:
+    return estimate_disk_monthly_cost(disk['disk_type'], disk['size_gb'], disk['region'])
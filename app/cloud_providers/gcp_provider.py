@@ -1,27 +1,50 @@
 from google.cloud import billing
 from google.cloud import monitoring_v3
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Dict, List, Optional
 import os
 
+from cloud_providers.gcp_inventory import GCPInventory, GCPInventoryScanner, estimate_disk_cost, estimate_instance_cost
+from cloud_providers.incremental import IncrementalScanner
+from cloud_providers.inventory import Inventory, ResourceRecord
+from cloud_providers.scan_budget import ScanBudget
+from cloud_providers.snapshot import snapshot_client
+
 class GCPProvider:
     def __init__(self):
         self.project_id = os.getenv('GCP_PROJECT_ID')
-        self.billing_client = billing.CloudBillingClient()
-        self.monitoring_client = monitoring_v3.MetricServiceClient()
+        # Captured to or replayed from a snapshot when SCAN_SNAPSHOT_MODE is set
+        self.billing_client = snapshot_client(f"gcp.{self.project_id}.billing", billing.CloudBillingClient)
+        self.monitoring_client = snapshot_client(f"gcp.{self.project_id}.monitoring", monitoring_v3.MetricServiceClient)
+        self.project_ids = [
+            project.strip() for project in os.getenv('GCP_PROJECT_IDS', self.project_id or '').split(',') if project.strip()
+        ]
+        self.inventory_scanner = GCPInventoryScanner(self.project_ids, monitoring_client=self.monitoring_client)
+        self.scanner = IncrementalScanner('gcp')
+
+    def get_unused_resources(self, budget: Optional[ScanBudget] = None) -> Inventory:
+        """Identify unused or underutilized GCP resources.
+
+        Instances and disks come from aggregated lists across all zones of every project
+        in GCP_PROJECT_IDS (or GCP_PROJECT_ID), joined with CPU metrics in memory. With a
+        budget, the scan stops at the deadline and reports its coverage on the returned
+        inventory. Projects that could not be scanned are reported in its errors.
+        """
+        unused_resources = Inventory()
+        inventory = self.inventory_scanner.collect()
+        # Failed projects were already printed by the scanner
+        unused_resources.errors = dict(inventory.errors)
 
-    def get_unused_resources(self) -> List[Dict]:
-        """Identify unused or underutilized GCP resources."""
-        unused_resources = []
-        
         # Get compute instances with low CPU utilization
-        underutilized_instances = self._get_underutilized_instances()
+        underutilized_instances = self._get_underutilized_instances(inventory, budget)
         unused_resources.extend(underutilized_instances)
-        
+
         # Get unused persistent disks
-        unused_disks = self._get_unused_disks()
+        unused_disks = self._get_unused_disks(inventory)
         unused_resources.extend(unused_disks)
         
+        if budget is not None:
+            unused_resources.coverage = budget.to_dict()
         return unused_resources
 
     def get_cost_analysis(self) -> Dict:
@@ -47,59 +70,90 @@ class GCPProvider:
         except Exception as e:
             return {'error': str(e)}
 
-    def _get_underutilized_instances(self) -> List[Dict]:
-        """Find compute instances with low CPU utilization."""
-        project_name = f"projects/{self.project_id}"
-        
-        now = datetime.now()
-        seconds = int(now.timestamp())
-        interval = monitoring_v3.TimeInterval({
-            'end_time': {'seconds': seconds},
-            'start_time': {'seconds': seconds - 3600 * 24},  # Last 24 hours
-        })
-        
-        results = []
-        try:
-            # Example metric for CPU utilization
-            metric_type = 'compute.googleapis.com/instance/cpu/utilization'
-            request = monitoring_v3.ListTimeSeriesRequest(
-                name=project_name,
-                filter=f'metric.type = "{metric_type}"',
-                interval=interval,
-                view=monitoring_v3.ListTimeSeriesRequest.TimeSeriesView.FULL,
-            )
-            
-            page_result = self.monitoring_client.list_time_series(request)
-            for time_series in page_result:
-                if self._is_underutilized(time_series):
-                    results.append({
-                        'resource_id': time_series.resource.labels['instance_id'],
-                        'resource_type': 'Compute Instance',
-                        'zone': time_series.resource.labels['zone'],
-                        'utilization': self._calculate_average_utilization(time_series),
-                        'recommendation': 'Consider downsizing or stopping this instance',
-                    })
-                    
-        except Exception as e:
-            print(f"Error getting instance metrics: {e}")
-            
-        return results
+    def get_daily_costs(self, days: int = 30) -> List[Dict]:
+        """Get daily cost per service for the last N days.
 
-    def _get_unused_disks(self) -> List[Dict]:
-        """Find unused persistent disks."""
-        # Implementation would involve checking for unattached disks
-        # This is a placeholder implementation
+        GCP only exposes itemized costs through a BigQuery billing export, which this
+        provider isn't configured for, so no rows are returned.
+        """
         return []
 
-    def _is_underutilized(self, time_series) -> bool:
-        """Check if a resource is underutilized based on its metrics."""
-        avg_utilization = self._calculate_average_utilization(time_series)
-        return avg_utilization < 0.05  # Less than 5% utilization
+    def _get_underutilized_instances(self, inventory: GCPInventory, budget: Optional[ScanBudget] = None) -> List[ResourceRecord]:
+        """Find running instances with low or no CPU utilization, re-analyzing only changed ones."""
+        running = [instance for instance in inventory.instances if instance['status'] == 'RUNNING']
+        return list(self.scanner.scan(
+            running,
+            key=lambda instance: instance['id'],
+            fingerprint=self._instance_fingerprint,
+            analyze=self._analyze_instance,
+            estimate_cost=estimate_instance_cost,
+            budget=budget,
+            resource_type='Compute Instance'
+        ))
 
-    def _calculate_average_utilization(self, time_series) -> float:
-        """Calculate average utilization from a time series."""
-        if not time_series.points:
-            return 0.0
-        
-        total = sum(point.value.double_value for point in time_series.points)
-        return total / len(time_series.points)
+    def _instance_fingerprint(self, instance: Dict) -> Dict:
+        """Get the instance attributes whose change requires re-analysis."""
+        return {
+            'machine_type': instance['machine_type'],
+            'zone': instance['zone'],
+            'status': instance['status'],
+            'labels': sorted(instance['labels'].items()),
+        }
+
+    def _analyze_instance(self, instance: Dict) -> Optional[ResourceRecord]:
+        """Build a record for an instance whose joined CPU average shows it is underutilized."""
+        cpu_average = instance['cpu_average']
+        if cpu_average is not None and cpu_average >= 5:  # Only report instances under 5% CPU utilization
+            return None
+
+        if cpu_average is None:
+            savings = None
+        else:
+            # Idle instances can be stopped; lightly used ones downsized one size (half the price)
+            cost = estimate_instance_cost(instance)
+            savings = round(cost if cpu_average < 1 else cost / 2, 2)
+        return ResourceRecord(
+            provider='gcp',
+            resource_id=instance['id'],
+            resource_type='Compute Instance',
+            region=instance['region'],
+            zone=instance['zone'],
+            scope=instance['project'],
+            instance_type=instance['machine_type'],
+            utilization=cpu_average,
+            recommendation=(
+                'No CPU metrics reported; verify this instance is still in use'
+                if cpu_average is None else 'Consider downsizing or stopping this instance'
+            ),
+            potential_savings=savings,
+        )
+
+    def _get_unused_disks(self, inventory: GCPInventory) -> List[ResourceRecord]:
+        """Find persistent disks that are billed without serving a running instance.
+
+        That is disks attached to nothing, and disks whose only users are stopped
+        (TERMINATED) instances, which keep paying for their storage.
+        """
+        instances = inventory.instances_by_link()
+        results = []
+        for disk in inventory.disks:
+            users = [instances.get(user) for user in disk['users']]
+            if not disk['users']:
+                recommendation = 'Unattached disk; snapshot and delete it if no longer needed'
+            elif all(user is not None and user['status'] == 'TERMINATED' for user in users):
+                names = ', '.join(user['name'] for user in users)
+                recommendation = f"Attached only to stopped instance {names}; snapshot and delete it if the instance isn't coming back"
+            else:
+                continue
+            results.append(ResourceRecord(
+                provider='gcp',
+                resource_id=disk['id'],
+                resource_type='Persistent Disk',
+                region=disk['region'],
+                zone=disk['zone'],
+                scope=disk['project'],
+                instance_type=disk['disk_type'],
+                recommendation=recommendation,
+                potential_savings=round(estimate_disk_cost(disk), 2),
+            ))
+        return results
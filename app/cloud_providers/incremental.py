@@ -0,0 +1,170 @@
+from typing import Callable, Dict, Iterable, List, Optional
+import hashlib
+import json
+import os
+import threading
+import time
+
+from cloud_providers.inventory import Inventory, ResourceRecord
+from cloud_providers.scan_budget import ScanBudget
+
+# Resources are re-analyzed at least this often even when their configuration is
+# unchanged, since utilization drifts without any inventory change.
+DEFAULT_MAX_AGE_HOURS = float(os.getenv('INVENTORY_SNAPSHOT_MAX_AGE_HOURS', 24))
+
+
+def content_hash(data) -> str:
+    """Get a stable hash of a JSON-serializable description of a resource."""
+    encoded = json.dumps(data, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.blake2b(encoded.encode(), digest_size=16).hexdigest()
+
+
+class InventorySnapshotStore:
+    """Snapshot of the last scan per provider: content hash, analysis time and result per resource.
+
+    Snapshots live in memory and, when a directory is configured, are also written to
+    one JSON file per provider so they survive restarts.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+        self._snapshots: Dict[str, Dict[str, Dict]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'InventorySnapshotStore':
+        """Create a store persisted to INVENTORY_SNAPSHOT_DIR, or in memory if it is unset."""
+        return cls(os.getenv('INVENTORY_SNAPSHOT_DIR'))
+
+    def _path(self, provider: str) -> str:
+        return os.path.join(self.directory, f"{provider}_inventory.json")
+
+    def load(self, provider: str) -> Dict[str, Dict]:
+        """Get the last snapshot for a provider, keyed by resource id."""
+        with self._lock:
+            if provider not in self._snapshots and self.directory and os.path.exists(self._path(provider)):
+                with open(self._path(provider)) as f:
+                    self._snapshots[provider] = json.load(f)
+            return self._snapshots.get(provider, {})
+
+    def save(self, provider: str, snapshot: Dict[str, Dict]) -> None:
+        """Replace the snapshot for a provider."""
+        with self._lock:
+            self._snapshots[provider] = snapshot
+            if not self.directory:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f"{self._path(provider)}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(snapshot, f, separators=(',', ':'))
+            os.replace(tmp_path, self._path(provider))
+
+
+class InventoryDiff:
+    """Resource ids added, removed, changed and unchanged since the previous snapshot."""
+
+    __slots__ = ('added', 'removed', 'changed', 'unchanged', 'stale')
+
+    def __init__(self):
+        self.added: List[str] = []
+        self.removed: List[str] = []
+        self.changed: List[str] = []
+        self.unchanged: List[str] = []
+        self.stale: List[str] = []
+
+    def summary(self) -> Dict[str, int]:
+        return {field: len(getattr(self, field)) for field in self.__slots__}
+
+
+class IncrementalScanner:
+    """Re-analyze only the resources that changed since the last scan.
+
+    Each scan hashes a fingerprint of every listed resource and diffs it against the
+    previous snapshot. Added, changed and stale resources are analyzed again (metric
+    fetching and recommendation logic); unchanged resources carry their previous result
+    forward, so steady-state scan cost follows the churn rate instead of the fleet size.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        store: Optional[InventorySnapshotStore] = None,
+        max_age_hours: float = DEFAULT_MAX_AGE_HOURS
+    ):
+        self.provider = provider
+        self.store = store or InventorySnapshotStore.from_env()
+        self.max_age_seconds = max_age_hours * 3600
+        self.last_diff: Optional[InventoryDiff] = None
+
+    def scan(
+        self,
+        resources: Iterable,
+        key: Callable[[object], str],
+        fingerprint: Callable[[object], object],
+        analyze: Callable[[object], Optional[ResourceRecord]],
+        estimate_cost: Optional[Callable[[object], float]] = None,
+        budget: Optional[ScanBudget] = None,
+        resource_type: str = ''
+    ) -> Inventory:
+        """Analyze changed resources and carry unchanged results forward.
+
+        key returns a resource's id, fingerprint returns the attributes whose change should
+        trigger re-analysis, and analyze returns a record for resources worth reporting
+        (or None). When a budget is given, resources needing analysis are handled most
+        expensive first (by estimate_cost) and the rest are skipped once the deadline passes;
+        skipped resources keep their previous snapshot entry so the next scan retries them.
+        """
+        previous = self.store.load(self.provider)
+        now = time.time()
+        diff = InventoryDiff()
+        snapshot: Dict[str, Dict] = {}
+        inventory = Inventory()
+        pending = []
+
+        for resource in resources:
+            resource_id = key(resource)
+            digest = content_hash(fingerprint(resource))
+            entry = previous.get(resource_id)
+            cost = estimate_cost(resource) if estimate_cost else 0.0
+
+            if entry is None:
+                diff.added.append(resource_id)
+            elif entry['hash'] != digest:
+                diff.changed.append(resource_id)
+            elif now - entry['analyzed_at'] >= self.max_age_seconds:
+                diff.stale.append(resource_id)
+            else:
+                diff.unchanged.append(resource_id)
+                snapshot[resource_id] = entry
+                if entry['record'] is not None:
+                    inventory.append(ResourceRecord.from_dict(entry['record']))
+                if budget is not None:
+                    budget.add(resource_id, cost, analyzed=True, resource_type=resource_type)
+                continue
+
+            pending.append((cost, resource_id, digest, resource))
+
+        # Most expensive first, so a deadline cuts off the cheapest resources
+        pending.sort(key=lambda item: -item[0])
+        for cost, resource_id, digest, resource in pending:
+            if budget is not None and budget.expired():
+                budget.add(resource_id, cost, analyzed=False, resource_type=resource_type)
+                if resource_id in previous:
+                    snapshot[resource_id] = previous[resource_id]
+                continue
+
+            record = analyze(resource)
+            snapshot[resource_id] = {
+                'hash': digest,
+                'analyzed_at': now,
+                'record': record.to_dict() if record is not None else None
+            }
+            if record is not None:
+                inventory.append(record)
+            if budget is not None:
+                budget.add(resource_id, cost, analyzed=True, resource_type=resource_type)
+
+        diff.removed = [resource_id for resource_id in previous if resource_id not in snapshot]
+        self.store.save(self.provider, snapshot)
+        self.last_diff = diff
+        return inventory
@@ -0,0 +1,171 @@
+from typing import Dict, Iterable, Iterator, List, Optional
+import json
+import re
+import sys
+
+# Optional faster JSON encoder
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class ResourceRecord:
+    """A single resource in the provider-neutral inventory.
+
+    Records use __slots__ and intern their low-cardinality strings (provider, type,
+    region, zone, scope, instance type and family), so a 100k-resource scan shares one
+    copy of each region or type name instead of one per resource dict.
+    """
+
+    __slots__ = (
+        'provider',
+        'resource_id',
+        'resource_type',
+        'region',
+        'zone',
+        'scope',
+        'instance_type',
+        'family',
+        'utilization',
+        'recommendation',
+        'potential_savings',
+    )
+
+    def __init__(
+        self,
+        provider: str,
+        resource_id: str,
+        resource_type: str,
+        region: str = '',
+        zone: str = '',
+        scope: str = '',
+        instance_type: str = '',
+        family: str = '',
+        utilization: Optional[float] = None,
+        recommendation: str = '',
+        potential_savings: Optional[float] = None
+    ):
+        self.provider = sys.intern(provider)
+        self.resource_id = resource_id
+        self.resource_type = sys.intern(resource_type)
+        self.region = sys.intern(region or '')
+        self.zone = sys.intern(zone or '')
+        self.scope = sys.intern(scope or '')
+        self.instance_type = sys.intern(instance_type or '')
+        self.family = sys.intern(family or instance_family(instance_type or ''))
+        self.utilization = utilization
+        self.recommendation = sys.intern(recommendation or '')
+        self.potential_savings = potential_savings
+
+    def to_dict(self) -> Dict:
+        """Convert the record to a plain dict."""
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ResourceRecord':
+        """Build a record from a dict produced by to_dict."""
+        return cls(**{field: data[field] for field in cls.__slots__ if field in data})
+
+    def __repr__(self) -> str:
+        return f"ResourceRecord({self.provider!r}, {self.resource_id!r}, {self.resource_type!r})"
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ResourceRecord):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.__slots__)
+
+
+FIELDS = ResourceRecord.__slots__
+
+# Columns stored as pandas categoricals in to_dataframe
+CATEGORICAL_FIELDS = ('provider', 'resource_type', 'region', 'zone', 'scope', 'instance_type', 'family', 'recommendation')
+
+class Inventory:
+    """An ordered collection of ResourceRecords with bulk conversion helpers.
+
+    coverage is set by time-budgeted scans to describe how much of the fleet was analyzed;
+    errors maps scopes (e.g. projects) that could not be scanned to the reason.
+    """
+
+    __slots__ = ('records', 'coverage', 'errors')
+
+    def __init__(
+        self,
+        records: Optional[Iterable[ResourceRecord]] = None,
+        coverage: Optional[Dict] = None,
+        errors: Optional[Dict[str, str]] = None
+    ):
+        self.records: List[ResourceRecord] = list(records) if records is not None else []
+        self.coverage = coverage
+        self.errors: Dict[str, str] = errors or {}
+
+    def append(self, record: ResourceRecord) -> None:
+        self.records.append(record)
+
+    def extend(self, records: Iterable[ResourceRecord]) -> None:
+        self.records.extend(records)
+
+    def __iter__(self) -> Iterator[ResourceRecord]:
+        return iter(self.records)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, index):
+        return self.records[index]
+
+    def to_dicts(self) -> List[Dict]:
+        """Convert every record to a plain dict, e.g. for a JSON API response."""
+        return [record.to_dict() for record in self.records]
+
+    def to_columns(self) -> Dict[str, list]:
+        """Convert the inventory to a struct-of-arrays dict, one list per field."""
+        return {field: [getattr(record, field) for record in self.records] for field in FIELDS}
+
+    def to_json(self) -> bytes:
+        """Encode the inventory as a JSON array of objects."""
+        if orjson is not None:
+            return orjson.dumps(self.to_dicts())
+        return json.dumps(self.to_dicts(), separators=(',', ':')).encode()
+
+    def to_dataframe(self):
+        """Convert the inventory to a pandas DataFrame with categorical string columns."""
+        import pandas as pd
+
+        frame = pd.DataFrame(self.to_columns(), columns=list(FIELDS))
+        for field in CATEGORICAL_FIELDS:
+            frame[field] = frame[field].astype('category')
+        frame['utilization'] = frame['utilization'].astype('float64')
+        frame['potential_savings'] = frame['potential_savings'].astype('float64')
+        return frame
+
+
+def instance_family(instance_type: str) -> str:
+    """Get the family of an instance type or machine size.
+
+    'm5.large' -> 'm5', 'n2-standard-4' -> 'n2', 'Standard_D2s_v3' -> 'Ds_v3'.
+    """
+    if not instance_type:
+        return ''
+    if '.' in instance_type:
+        return instance_type.split('.', 1)[0]
+    if '-' in instance_type:
+        return instance_type.split('-', 1)[0]
+    if instance_type.startswith('Standard_'):
+        parts = instance_type.split('_')[1:]
+        return '_'.join([re.sub(r'\d+', '', parts[0])] + parts[1:])
+    return instance_type
+
+
+def region_from_zone(zone: str) -> str:
+    """Get the region of an AWS availability zone or GCP zone.
+
+    'us-east-1a' -> 'us-east-1', 'us-central1-a' -> 'us-central1'.
+    """
+    if len(zone) < 3:
+        return zone
+    if zone[-2] == '-':
+        return zone[:-2]
+    if zone[-1].isalpha() and zone[-2].isdigit():
+        return zone[:-1]
+    return zone
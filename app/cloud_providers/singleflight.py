@@ -0,0 +1,177 @@
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
+import hashlib
+import json
+import logging
+import uuid
+
+# Optional cross-process coalescing
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def coalescing_key(tenant: str, provider: str, endpoint: str, params: Optional[Dict] = None) -> str:
+    """Build the key identical requests share: tenant, provider, endpoint and parameters.
+
+    Results are shared by everyone with the same key, so a tenant is required; requests
+    without one must not fall back to a key other tenants would share.
+    """
+    if not tenant:
+        raise ValueError("A tenant is required to share results between requests")
+    encoded = json.dumps([tenant, provider, endpoint, params or {}], sort_keys=True, default=str)
+    return hashlib.blake2b(encoded.encode(), digest_size=16).hexdigest()
+
+
+class SingleFlight:
+    """Coalesce identical concurrent computations so only one of them runs.
+
+    The first caller for a key runs the computation; callers arriving while it is in
+    flight await the same future and get the same result (or exception). With a Redis
+    URL, coalescing also spans worker processes: the leader holds a Redis lock and
+    publishes its JSON-encoded result on a channel that followers in other processes
+    subscribe to. The leader's lock is a short lease it renews while computing, so if
+    the leader dies the lock soon expires; followers then, or when the wait times out,
+    compute the result themselves rather than fail.
+    """
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        lock_timeout_seconds: float = 600,
+        result_ttl_seconds: float = 5,
+        namespace: str = 'singleflight',
+        lease_seconds: float = 10
+    ):
+        self.lock_timeout_seconds = lock_timeout_seconds
+        self.lease_seconds = lease_seconds
+        self.result_ttl_seconds = result_ttl_seconds
+        self.namespace = namespace
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._redis = None
+        if redis_url and aioredis is not None:
+            self._redis = aioredis.from_url(redis_url)
+        elif redis_url:
+            logger.warning("redis is not installed; request coalescing is limited to this process")
+        self.stats = {'calls': 0, 'executions': 0, 'local_hits': 0, 'remote_hits': 0, 'remote_fallbacks': 0}
+
+    def metrics(self) -> Dict:
+        """Get call counts and the fraction of calls served by another caller's computation."""
+        hits = self.stats['local_hits'] + self.stats['remote_hits']
+        return {
+            **self.stats,
+            'in_flight': len(self._in_flight),
+            'hit_rate': round(hits / self.stats['calls'], 4) if self.stats['calls'] else 0.0,
+        }
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn for key, or join the computation already in flight for it."""
+        self.stats['calls'] += 1
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.stats['local_hits'] += 1
+            # Shield so one cancelled caller doesn't cancel the shared computation
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            if self._redis is not None:
+                result = await self._do_distributed(key, fn)
+            else:
+                self.stats['executions'] += 1
+                result = await fn()
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an un-awaited future doesn't log "exception never retrieved"
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._in_flight[key]
+
+    async def _do_distributed(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Lead the computation across processes, or wait for the process that leads it."""
+        lock_key = f"{self.namespace}:lock:{key}"
+        result_key = f"{self.namespace}:result:{key}"
+        channel = f"{self.namespace}:channel:{key}"
+        token = uuid.uuid4().hex
+
+        if await self._redis.set(lock_key, token, nx=True, px=int(self.lease_seconds * 1000)):
+            return await self._lead(lock_key, result_key, channel, token, fn)
+
+        result = await self._follow(lock_key, result_key, channel)
+        if result is not _MISSING:
+            self.stats['remote_hits'] += 1
+            return result
+
+        self.stats['remote_fallbacks'] += 1
+        self.stats['executions'] += 1
+        return await fn()
+
+    async def _lead(self, lock_key: str, result_key: str, channel: str, token: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.stats['executions'] += 1
+        heartbeat = asyncio.ensure_future(self._renew_lease(lock_key, token))
+        try:
+            try:
+                result = await fn()
+            except Exception:
+                await self._redis.publish(channel, json.dumps({'ok': False}))
+                raise
+            payload = json.dumps({'ok': True, 'result': result}, default=str)
+            # Late subscribers read the result key instead of the channel
+            await self._redis.set(result_key, payload, px=int(self.result_ttl_seconds * 1000))
+            await self._redis.publish(channel, payload)
+            return result
+        finally:
+            heartbeat.cancel()
+            # Release the lock only if it is still ours
+            if (await self._redis.get(lock_key) or b'').decode() == token:
+                await self._redis.delete(lock_key)
+
+    async def _renew_lease(self, lock_key: str, token: str) -> None:
+        """Extend the lock while this process computes, for up to lock_timeout_seconds."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.lock_timeout_seconds
+        while loop.time() < deadline:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if (await self._redis.get(lock_key) or b'').decode() != token:
+                return
+            await self._redis.pexpire(lock_key, int(self.lease_seconds * 1000))
+
+    async def _follow(self, lock_key: str, result_key: str, channel: str) -> Any:
+        """Wait for the leading process to publish a result; _MISSING if it fails, dies or times out."""
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(channel)
+        try:
+            # The leader may have finished between our lock attempt and subscribing
+            cached = await self._redis.get(result_key)
+            if cached is not None:
+                return self._decode(cached)
+
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.lock_timeout_seconds
+            while loop.time() < deadline:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is not None:
+                    return self._decode(message['data'])
+                # A leader that died without publishing leaves no lock; take over instead of waiting it out
+                if not await self._redis.exists(lock_key):
+                    cached = await self._redis.get(result_key)
+                    return self._decode(cached) if cached is not None else _MISSING
+            return _MISSING
+        finally:
+            await pubsub.unsubscribe(channel)
+            await pubsub.aclose()
+
+    @staticmethod
+    def _decode(data: bytes) -> Any:
+        message = json.loads(data)
+        return message['result'] if message.get('ok') else _MISSING
@@ -1,12 +1,26 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Header, Response
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Dict, List
+from fastapi.middleware.gzip import GZipMiddleware
+from typing import Dict, List, Optional, Union
+import asyncio
 import os
 from dotenv import load_dotenv
 
 from cloud_providers.aws_provider import AWSProvider
 from cloud_providers.gcp_provider import GCPProvider
 from cloud_providers.azure_provider import AzureProvider
+from cloud_providers.export import (
+    ARROW_STREAM_MEDIA_TYPE,
+    DATASETS,
+    FORMATS,
+    costs_table,
+    inventory_table,
+    to_arrow_stream,
+    to_parquet,
+)
+from cloud_providers.inventory import Inventory
+from cloud_providers.scan_budget import ScanBudget
+from cloud_providers.singleflight import SingleFlight, coalescing_key
 
 load_dotenv()
 
@@ -20,26 +34,66 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 # Initialize cloud providers
 aws = AWSProvider()
 gcp = GCPProvider()
 azure = AzureProvider()
 
+providers = {
+    "aws": aws,
+    "gcp": gcp,
+    "azure": azure,
+}
+
+# Identical concurrent scans share one computation, across processes when REDIS_URL is set
+coalescer = SingleFlight(os.getenv("REDIS_URL"))
+
 @app.get("/")
 async def root():
     return {"message": "Cloud Cost Optimizer API"}
 
+def _budgeted_result(inventory, budget: Optional[ScanBudget]) -> Union[List[Dict], Dict]:
+    """Return plain results, or results with coverage metadata and scan errors when a time budget was given."""
+    if budget is None:
+        return inventory.to_dicts()
+    return {"resources": inventory.to_dicts(), "coverage": inventory.coverage, "errors": inventory.errors}
+
+@app.get("/metrics/coalescing")
+async def get_coalescing_metrics() -> Dict:
+    """Get how often scan requests were served by an identical in-flight scan."""
+    return coalescer.metrics()
+
+async def _scan_all(budget_seconds: Optional[float]) -> Dict:
+    """Scan every provider concurrently."""
+    names = list(providers)
+    budgets = [ScanBudget(budget_seconds) if budget_seconds is not None else None for _ in names]
+    inventories = await asyncio.gather(*(
+        asyncio.to_thread(providers[name].get_unused_resources, budget)
+        for name, budget in zip(names, budgets)
+    ))
+    results = {
+        name: _budgeted_result(inventory, budget)
+        for name, inventory, budget in zip(names, inventories, budgets)
+    }
+    if budget_seconds is not None:
+        results["coverage"] = ScanBudget.combine(budgets).to_dict()
+    return results
+
 @app.get("/optimize/all")
-async def get_all_optimizations() -> Dict:
-    """Get optimization recommendations for all cloud providers."""
+async def get_all_optimizations(
+    budget_seconds: Optional[float] = None,
+    x_tenant_id: str = Header("default")
+) -> Dict:
+    """Get optimization recommendations for all cloud providers.
+
+    With budget_seconds, each provider analyzes its most expensive resources first and
+    returns what it has at the deadline, along with coverage metadata.
+    """
     try:
-        results = {
-            "aws": aws.get_unused_resources(),
-            "gcp": gcp.get_unused_resources(),
-            "azure": azure.get_unused_resources()
-        }
-        return results
+        key = coalescing_key(x_tenant_id, "all", "/optimize", {"budget_seconds": budget_seconds})
+        return await coalescer.do(key, lambda: _scan_all(budget_seconds))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -57,17 +111,26 @@ async def get_all_costs() -> Dict:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/optimize/{provider}")
-async def get_provider_optimizations(provider: str) -> List[Dict]:
-    """Get optimization recommendations for a specific cloud provider."""
+async def get_provider_optimizations(
+    provider: str,
+    budget_seconds: Optional[float] = None,
+    x_tenant_id: str = Header("default")
+) -> Union[List[Dict], Dict]:
+    """Get optimization recommendations for a specific cloud provider.
+
+    With budget_seconds, the most expensive resources are analyzed first and the scan
+    returns what it has at the deadline, along with coverage metadata.
+    """
+    if provider not in providers:
+        raise HTTPException(status_code=400, detail="Invalid provider specified")
+    async def scan() -> Union[List[Dict], Dict]:
+        budget = ScanBudget(budget_seconds) if budget_seconds is not None else None
+        inventory = await asyncio.to_thread(providers[provider].get_unused_resources, budget)
+        return _budgeted_result(inventory, budget)
+
     try:
-        if provider == "aws":
-            return aws.get_unused_resources()
-        elif provider == "gcp":
-            return gcp.get_unused_resources()
-        elif provider == "azure":
-            return azure.get_unused_resources()
-        else:
-            raise HTTPException(status_code=400, detail="Invalid provider specified")
+        key = coalescing_key(x_tenant_id, provider, "/optimize", {"budget_seconds": budget_seconds})
+        return await coalescer.do(key, scan)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -86,6 +149,52 @@ async def get_provider_costs(provider: str) -> Dict:
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/export/{dataset}")
+async def export_dataset(
+    dataset: str,
+    format: str = "arrow",
+    provider: Optional[str] = None,
+    days: int = 30
+) -> Response:
+    """Export recommendations, inventory or daily costs as an Arrow IPC stream or a Parquet file.
+
+    Columns are typed (dictionary-encoded strings, float64 metrics, date32 dates), so
+    notebooks can load the result directly instead of parsing JSON.
+    """
+    if dataset not in DATASETS:
+        raise HTTPException(status_code=400, detail=f"Invalid dataset; expected one of {', '.join(DATASETS)}")
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format; expected one of {', '.join(FORMATS)}")
+    if provider is not None and provider not in providers:
+        raise HTTPException(status_code=400, detail="Invalid provider specified")
+    names = [provider] if provider else list(providers)
+
+    try:
+        if dataset == "costs":
+            rows = await asyncio.gather(*(
+                asyncio.to_thread(providers[name].get_daily_costs, days) for name in names
+            ))
+            table = costs_table(row for provider_rows in rows for row in provider_rows)
+        else:
+            inventories = await asyncio.gather(*(
+                asyncio.to_thread(providers[name].get_unused_resources) for name in names
+            ))
+            inventory = Inventory(record for provider_inventory in inventories for record in provider_inventory)
+            table = inventory_table(inventory, recommendations_only=dataset == "recommendations")
+
+        if format == "parquet":
+            body, media_type = await asyncio.to_thread(to_parquet, table), "application/vnd.apache.parquet"
+        else:
+            body, media_type = await asyncio.to_thread(to_arrow_stream, table), ARROW_STREAM_MEDIA_TYPE
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return Response(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{format}"'}
+    )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,114 @@
+from typing import Any, Dict, List, Optional
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+from app.core.cache import TTLCache
+from app.core.profiling import phase
+from app.core.serialization import STREAM_CHUNK_ITEMS, EncodedList, digest, dumps
+
+
+def item_key(item: Dict) -> str:
+    """Identify a recommendation across result sets."""
+    return f"{item.get('resource_type')}:{item.get('resource_id')}"
+
+
+class ResultVersions:
+    """Recent result sets by version, kept as item key -> item hash for computing deltas.
+
+    Only hashes are kept, so remembering a version costs a few bytes per item rather
+    than a copy of the payload.
+    """
+
+    def __init__(self, ttl_seconds: float = 24 * 3600, maxsize: int = 256):
+        self._versions = TTLCache(ttl_seconds, maxsize=maxsize)
+
+    def __contains__(self, version: str) -> bool:
+        return self._versions.get(version) is not None
+
+    def remember(self, result: EncodedList) -> None:
+        if self._versions.get(result.version) is None:
+            self._versions.set(result.version, {
+                item_key(item): item_hash for item, item_hash in zip(result.items, result.item_hashes)
+            })
+
+    def delta(self, since: str, result: EncodedList) -> Optional[bytes]:
+        """Encode the items added, changed and removed since a version, or None if it is unknown."""
+        previous = self._versions.get(since)
+        if previous is None:
+            return None
+
+        added: List[bytes] = []
+        changed: List[bytes] = []
+        current_keys = set()
+        for item, encoded, item_hash in zip(result.items, result.encoded, result.item_hashes):
+            key = item_key(item)
+            current_keys.add(key)
+            if key not in previous:
+                added.append(encoded)
+            elif previous[key] != item_hash:
+                changed.append(encoded)
+        removed = sorted(key for key in previous if key not in current_keys)
+        return (
+            b'{"version":' + dumps(result.version) + b',"since":' + dumps(since)
+            + b',"added":[' + b','.join(added) + b'],"changed":[' + b','.join(changed)
+            + b'],"removed":' + dumps(removed) + b'}'
+        )
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    candidates = {tag.strip().removeprefix('W/') for tag in header.split(',')}
+    return etag in candidates or '*' in candidates
+
+
+def versioned_response(
+    request: Request,
+    data: Any,
+    versions: Optional[ResultVersions] = None,
+    since: Optional[str] = None
+) -> Response:
+    """Respond with a result tagged by its content version.
+
+    Requests whose If-None-Match carries the current version get an empty 304. For an
+    EncodedList, the pre-encoded items are reused: long lists are streamed in chunks,
+    and with a ResultVersions store ?since=<version> returns only the items added,
+    changed and removed since that version (an unknown or expired version falls back
+    to the full result). A delta is a different representation from the full result,
+    so its ETag names both versions; its body's "version" is the next since.
+    """
+    if isinstance(data, EncodedList):
+        version = data.version
+        if versions is not None:
+            versions.remember(data)
+    else:
+        with phase('serialization'):
+            body = dumps(data)
+            version = digest(body)
+    # Only versions this server issued (hex digests) end up in the delta ETag
+    delta_since = (
+        since if isinstance(data, EncodedList) and versions is not None and since is not None and since in versions
+        else None
+    )
+    etag = f'"{version}"' if delta_since is None else f'"{version}-since-{delta_since}"'
+    # Clients may reuse the response but must revalidate it on every poll
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    if not isinstance(data, EncodedList):
+        return Response(body, media_type='application/json', headers=headers)
+
+    if delta_since is not None:
+        delta = versions.delta(delta_since, data)
+        if delta is not None:
+            return Response(delta, media_type='application/json', headers=headers)
+        # The version expired just now; send the full result under its own ETag
+        headers['ETag'] = f'"{version}"'
+
+    if len(data) >= STREAM_CHUNK_ITEMS:
+        return StreamingResponse(data.chunks(), media_type='application/json', headers=headers)
+    return Response(data.body(), media_type='application/json', headers=headers)
@@ -0,0 +1,273 @@
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+
+class PhaseTimings:
+    """Wall-clock seconds spent per phase of one request, safe to update from worker threads."""
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def to_dict(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                name: {'seconds': round(seconds, 4), 'calls': self.calls[name]}
+                for name, seconds in sorted(self.seconds.items(), key=lambda item: -item[1])
+            }
+
+    def server_timing(self) -> str:
+        """Format the timings as a Server-Timing header, shown by browser devtools."""
+        with self._lock:
+            return ', '.join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.seconds.items())
+
+
+# Timings of the request being handled; copied into asyncio.to_thread workers
+_current_timings: ContextVar[Optional[PhaseTimings]] = ContextVar('phase_timings', default=None)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Attribute the time spent in the block to a named phase of the current request.
+
+    Phases should wrap leaf operations (an API call, an encoding step) rather than nest,
+    so the breakdown adds up. Outside a request this costs one ContextVar lookup.
+    """
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+class SamplingProfiler:
+    """Sample the stacks of every thread at a fixed interval from a background thread.
+
+    Samples are kept as collapsed stacks ('thread;outer;...;inner count'), the input format
+    of flamegraph.pl, speedscope and similar tools. Sampling all threads captures work the
+    request hands to thread pools, at the cost of also capturing concurrent requests.
+    """
+
+    def __init__(self, interval_seconds: float = 0.005):
+        self.interval_seconds = interval_seconds
+        self.samples: Counter = Counter()
+        self.reason = ''
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval_seconds):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return '\n'.join(f"{stack} {count}" for stack, count in self.samples.most_common())
+
+
+class ProfileStore:
+    """Saved profiles on disk: a .folded collapsed-stack file plus a .json summary per profile."""
+
+    def __init__(self, directory: str, max_profiles: int = 200):
+        self.directory = directory
+        self.max_profiles = max_profiles
+
+    def new_id(self, path: str) -> str:
+        """Get a unique, sortable id for a profile of a request path."""
+        slug = re.sub(r'[^A-Za-z0-9]+', '-', path).strip('-') or 'root'
+        return f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{slug}-{uuid.uuid4().hex[:8]}"
+
+    def save(self, summary: Dict, collapsed: str, profile_id: Optional[str] = None) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        profile_id = profile_id or self.new_id(summary['path'])
+        with open(os.path.join(self.directory, f"{profile_id}.folded"), 'w') as f:
+            f.write(collapsed)
+        with open(os.path.join(self.directory, f"{profile_id}.json"), 'w') as f:
+            json.dump({**summary, 'id': profile_id}, f, indent=2)
+        self._prune()
+        return profile_id
+
+    def list(self) -> List[Dict]:
+        """Summaries of the saved profiles, newest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        summaries = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if name.endswith('.json'):
+                with open(os.path.join(self.directory, name)) as f:
+                    summaries.append(json.load(f))
+        return summaries
+
+    def collapsed(self, profile_id: str) -> Optional[str]:
+        """The collapsed stacks of a saved profile, or None if it doesn't exist."""
+        if not re.fullmatch(r'[A-Za-z0-9-]+', profile_id):
+            return None
+        path = os.path.join(self.directory, f"{profile_id}.folded")
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return f.read()
+
+    def _prune(self) -> None:
+        profiles = sorted(name[:-len('.json')] for name in os.listdir(self.directory) if name.endswith('.json'))
+        for profile_id in profiles[:-self.max_profiles]:
+            for extension in ('.json', '.folded'):
+                path = os.path.join(self.directory, profile_id + extension)
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+class ProfilingMiddleware:
+    """Time request phases, profile on demand and capture slow requests.
+
+    Every request gets a phase breakdown in its Server-Timing header. An admin can ask for
+    a full sampling profile with an X-Profile: 1 header or ?profile=1. Requests still
+    running after slow_request_seconds start sampling at that point, so a slow scan leaves
+    a profile of its slow part without profiling the fast majority.
+
+    This is plain ASGI middleware rather than BaseHTTPMiddleware, so timing and profiling
+    last until the last body chunk is sent and include streamed serialization. Server-Timing
+    can only cover the time until the headers; the rest is the profile's response_body phase.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: ProfileStore,
+        is_admin: Callable[[Request], bool],
+        slow_request_seconds: Optional[float] = None,
+        interval_seconds: float = 0.005
+    ):
+        self.app = app
+        self.store = store
+        self.is_admin = is_admin
+        self.slow_request_seconds = slow_request_seconds
+        self.interval_seconds = interval_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        requested = (
+            request.headers.get('x-profile') == '1' or request.query_params.get('profile') == '1'
+        ) and self.is_admin(request)
+
+        timings = PhaseTimings()
+        token = _current_timings.set(timings)
+        profiler: Optional[SamplingProfiler] = None
+        profile_id: Optional[str] = None
+        slow_timer = None
+        status_code = 500
+        started = time.perf_counter()
+        headers_sent_at: Optional[float] = None
+
+        def start_profiler(reason: str) -> None:
+            nonlocal profiler, profile_id
+            if profiler is None:
+                profiler = SamplingProfiler(self.interval_seconds)
+                profiler.start()
+                profiler.reason = reason
+                profile_id = self.store.new_id(request.url.path)
+
+        async def send_timed(message: Message) -> None:
+            nonlocal status_code, headers_sent_at
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+                headers_sent_at = time.perf_counter()
+                headers = MutableHeaders(scope=message)
+                headers.append('Server-Timing', ', '.join(filter(None, [
+                    timings.server_timing(), f"total;dur={(headers_sent_at - started) * 1000:.1f}"
+                ])))
+                if profile_id is not None:
+                    headers.append('X-Profile-Id', profile_id)
+            await send(message)
+
+        if requested:
+            start_profiler('requested')
+        elif self.slow_request_seconds:
+            slow_timer = asyncio.get_running_loop().call_later(
+                self.slow_request_seconds, start_profiler, 'slow_request'
+            )
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            _current_timings.reset(token)
+            if slow_timer is not None:
+                slow_timer.cancel()
+            duration = time.perf_counter() - started
+            if headers_sent_at is not None:
+                timings.add('response_body', time.perf_counter() - headers_sent_at)
+            if profiler is not None:
+                await self._save(profiler, profile_id, request, status_code, duration, timings)
+
+    async def _save(
+        self,
+        profiler: SamplingProfiler,
+        profile_id: str,
+        request: Request,
+        status_code: int,
+        duration: float,
+        timings: PhaseTimings
+    ) -> None:
+        profiler.stop()
+        summary = {
+            'path': request.url.path,
+            'method': request.method,
+            'status_code': status_code,
+            'duration_seconds': round(duration, 4),
+            'reason': profiler.reason,
+            'samples': sum(profiler.samples.values()),
+            'phases': timings.to_dict(),
+        }
+        await asyncio.to_thread(self.store.save, summary, profiler.collapsed(), profile_id)
+        if profiler.reason == 'slow_request':
+            logger.warning(f"Captured profile {profile_id} for slow request {request.method} {request.url.path} ({duration:.1f}s)")
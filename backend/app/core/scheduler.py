@@ -0,0 +1,198 @@
+from collections import deque
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional
+import asyncio
+import time
+
+
+class Priority(IntEnum):
+    """Scheduling class of a scan; lower values are always dispatched first."""
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    """Parse tenant weights written as 'tenant=weight,tenant=weight'; weights must be positive."""
+    weights = {}
+    for entry in spec.split(","):
+        if not entry.strip():
+            continue
+        tenant, _, weight = entry.partition("=")
+        weights[tenant.strip()] = float(weight)
+        if weights[tenant.strip()] <= 0:
+            raise ValueError(f"Tenant weight must be positive: {entry.strip()}")
+    return weights
+
+
+class _Waiter:
+    __slots__ = ('tenant', 'priority', 'cost', 'future', 'enqueued_at')
+
+    def __init__(self, tenant: str, priority: Priority, cost: float, future: asyncio.Future, enqueued_at: float):
+        self.tenant = tenant
+        self.priority = priority
+        self.cost = cost
+        self.future = future
+        self.enqueued_at = enqueued_at
+
+
+class _TenantState:
+    __slots__ = ('queues', 'running', 'virtual_time', 'granted', 'wait_seconds_total', 'wait_seconds_max')
+
+    def __init__(self):
+        self.queues: Dict[Priority, Deque[_Waiter]] = {priority: deque() for priority in Priority}
+        self.running = 0
+        self.virtual_time = 0.0
+        self.granted = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+
+class FairShareScheduler:
+    """Share scan slots and cloud API tokens fairly between tenants.
+
+    Every scan waits in its tenant's queue for one of `slots` worker slots and for `cost`
+    API tokens (an estimate of the cloud API calls it makes) from a bucket refilled at
+    tokens_per_second. Interactive scans are always dispatched before background ones;
+    within a class, tenants are served by start-time fair queuing, so each gets slots and
+    tokens in proportion to its weight however many scans it submits. A tenant never
+    runs more than max_concurrent_per_tenant scans at once.
+    """
+
+    def __init__(
+        self,
+        slots: int,
+        max_concurrent_per_tenant: int,
+        tokens_per_second: float = 0,
+        burst_tokens: Optional[float] = None,
+        weights: Optional[Dict[str, float]] = None
+    ):
+        self.slots = slots
+        self.max_concurrent_per_tenant = max_concurrent_per_tenant
+        self.tokens_per_second = tokens_per_second
+        self.burst_tokens = burst_tokens if burst_tokens is not None else tokens_per_second
+        self.weights = weights or {}
+        self._tenants: Dict[str, _TenantState] = {}
+        self._free_slots = slots
+        self._tokens = self.burst_tokens
+        self._refilled_at = time.monotonic()
+        # Virtual start time of the last dispatched scan; idle tenants rejoin here, not behind
+        self._virtual_clock = 0.0
+        self._refill_timer: Optional[asyncio.TimerHandle] = None
+
+    async def run(
+        self,
+        tenant: str,
+        fn: Callable[[], Awaitable[Any]],
+        priority: Priority = Priority.INTERACTIVE,
+        cost: float = 1.0
+    ) -> Any:
+        """Wait for the tenant's turn, then run fn holding a slot."""
+        async with self.slot(tenant, priority, cost):
+            return await fn()
+
+    @asynccontextmanager
+    async def slot(self, tenant: str, priority: Priority = Priority.INTERACTIVE, cost: float = 1.0) -> AsyncIterator[None]:
+        state = self._tenants.setdefault(tenant, _TenantState())
+        waiter = _Waiter(tenant, priority, cost, asyncio.get_running_loop().create_future(), time.monotonic())
+        state.queues[priority].append(waiter)
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted just as the caller gave up
+                self._release(tenant)
+            elif waiter in state.queues[priority]:
+                state.queues[priority].remove(waiter)
+            raise
+        try:
+            yield
+        finally:
+            self._release(tenant)
+
+    def metrics(self) -> Dict:
+        """Get free capacity and per-tenant queue depth, running scans and wait times."""
+        self._refill()
+        return {
+            'slots': self.slots,
+            'free_slots': self._free_slots,
+            'tokens': round(self._tokens, 2) if self.tokens_per_second else None,
+            'tenants': {
+                tenant: {
+                    'queued': {priority.name.lower(): len(queue) for priority, queue in state.queues.items()},
+                    'running': state.running,
+                    'granted': state.granted,
+                    'avg_wait_seconds': round(state.wait_seconds_total / state.granted, 4) if state.granted else 0.0,
+                    'max_wait_seconds': round(state.wait_seconds_max, 4),
+                    'weight': self.weights.get(tenant, 1.0),
+                }
+                for tenant, state in sorted(self._tenants.items())
+            },
+        }
+
+    def _release(self, tenant: str) -> None:
+        self._tenants[tenant].running -= 1
+        self._free_slots += 1
+        self._dispatch()
+
+    def _refill(self) -> None:
+        if not self.tokens_per_second:
+            return
+        now = time.monotonic()
+        self._tokens = min(self.burst_tokens, self._tokens + (now - self._refilled_at) * self.tokens_per_second)
+        self._refilled_at = now
+
+    def _next_waiter(self) -> Optional[_Waiter]:
+        """The head of the eligible tenant queue with the earliest virtual start time."""
+        for priority in Priority:
+            best = None
+            best_start = None
+            for tenant, state in self._tenants.items():
+                queue = state.queues[priority]
+                if not queue or state.running >= self.max_concurrent_per_tenant:
+                    continue
+                start = max(state.virtual_time, self._virtual_clock)
+                if best is None or (start, tenant) < (best_start, best.tenant):
+                    best, best_start = queue[0], start
+            if best is not None:
+                return best
+        return None
+
+    def _dispatch(self) -> None:
+        while self._free_slots > 0:
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            if waiter.future.cancelled():
+                # Its caller gave up; it finds the waiter already gone when it resumes
+                self._tenants[waiter.tenant].queues[waiter.priority].popleft()
+                continue
+
+            # A scan costing more than the whole bucket only waits for a full bucket
+            cost = min(waiter.cost, self.burst_tokens) if self.tokens_per_second else 0
+            self._refill()
+            if self._tokens < cost:
+                if self._refill_timer is None:
+                    delay = (cost - self._tokens) / self.tokens_per_second
+                    self._refill_timer = asyncio.get_running_loop().call_later(delay, self._on_refill)
+                return
+            self._tokens -= cost
+
+            state = self._tenants[waiter.tenant]
+            state.queues[waiter.priority].popleft()
+            start = max(state.virtual_time, self._virtual_clock)
+            state.virtual_time = start + waiter.cost / self.weights.get(waiter.tenant, 1.0)
+            self._virtual_clock = start
+            state.running += 1
+            self._free_slots -= 1
+
+            waited = time.monotonic() - waiter.enqueued_at
+            state.granted += 1
+            state.wait_seconds_total += waited
+            state.wait_seconds_max = max(state.wait_seconds_max, waited)
+            waiter.future.set_result(None)
+
+    def _on_refill(self) -> None:
+        self._refill_timer = None
+        self._dispatch()
@@ -0,0 +1,75 @@
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, List, Optional, Type
+import hashlib
+import json
+
+from pydantic import BaseModel
+
+from app.core.profiling import phase
+
+# Optional faster JSON encoder
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Lists at least this long are streamed in chunks of this many items
+STREAM_CHUNK_ITEMS = 1000
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode='json')
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        # numpy scalars
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(data: Any) -> bytes:
+    """Encode data as compact JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(data, default=_default, separators=(',', ':')).encode()
+
+
+def digest(encoded: bytes) -> str:
+    return hashlib.blake2b(encoded, digest_size=12).hexdigest()
+
+
+class EncodedList:
+    """A result list validated against its response model and encoded once, when it is produced.
+
+    Each item is validated and normalized through the model, then encoded to JSON bytes
+    and hashed. Responses reuse the bytes, so serving a cached 50k-item result costs a
+    join or a chunked stream instead of per-request validation and encoding, and the
+    item hashes give ETags and delta responses for free.
+    """
+
+    __slots__ = ('items', 'encoded', 'item_hashes', 'version')
+
+    def __init__(self, items: List[Dict], model: Optional[Type[BaseModel]] = None):
+        with phase('serialization'):
+            if model is not None:
+                items = [model.model_validate(item).model_dump() for item in items]
+            self.items = items
+            self.encoded = [dumps(item) for item in items]
+            self.item_hashes = [digest(encoded) for encoded in self.encoded]
+            self.version = digest(''.join(self.item_hashes).encode())
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def body(self) -> bytes:
+        """The whole list as a JSON array."""
+        return b'[' + b','.join(self.encoded) + b']'
+
+    def chunks(self, chunk_items: int = STREAM_CHUNK_ITEMS) -> Iterator[bytes]:
+        """The JSON array in pieces of chunk_items items, for streaming responses."""
+        yield b'['
+        for start in range(0, len(self.encoded), chunk_items):
+            prefix = b',' if start else b''
+            yield prefix + b','.join(self.encoded[start:start + chunk_items])
+        yield b']'
@@ -1,13 +1,42 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import PlainTextResponse
 from datetime import datetime, timedelta
-from typing import List, Dict
+from typing import List, Dict, Optional, Union
+import asyncio
 import logging
 
 from app.services.aws_service import AWSService
+from app.services.cost_allocation import CostAllocationIndex
+from app.core.cache import TTLCache
 from app.core.config import Settings
-from app.core.security import get_current_user
-from app.schemas.optimization import OptimizationResponse, CostAnalysisResponse
+from app.core.http_cache import ResultVersions, versioned_response
+from app.core.profiling import ProfileStore, ProfilingMiddleware
+from app.core.scheduler import FairShareScheduler, Priority, parse_weights
+from app.core.serialization import EncodedList
+from app.core.scan_budget import ScanBudget
+from app.core.security import get_current_admin, get_current_user, is_admin_request
+from app.core.singleflight import SingleFlight, coalescing_key
+from app.services.policy_backtest import backtest_policies, expand_policy_grid
+from app.services.scan_coordinator import ScanCoordinator
+from app.schemas.optimization import (
+    BudgetedOptimizationResponse,
+    CostAllocationResponse,
+    CostAnalysisResponse,
+    CostCenterRequest,
+    DashboardResponse,
+    DataTransferResponse,
+    OptimizationResponse,
+    PolicyBacktestRequest,
+    PolicyBacktestResult,
+    S3StorageAnalysisResponse,
+    ShutdownOverrideRequest,
+    UnderutilizedResource,
+    UntaggedSpendResponse,
+    UtilizationSeriesResponse,
+    UtilizationSummary,
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -30,31 +59,201 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Server-Timing", "X-Profile-Id"],
+)
+
+# Large JSON result sets compress roughly 10:1
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+# Per-phase Server-Timing on every response; sampling profiles on admin request or for slow requests
+profile_store = ProfileStore(settings.PROFILE_DIR)
+app.add_middleware(
+    ProfilingMiddleware,
+    store=profile_store,
+    is_admin=is_admin_request,
+    slow_request_seconds=settings.SLOW_REQUEST_SECONDS or None,
+    interval_seconds=settings.PROFILE_SAMPLE_INTERVAL_MS / 1000,
 )
 
 # Initialize AWS service
 aws_service = AWSService()
 
+# Full scans are sharded across worker processes or Celery workers unless running inline
+scan_coordinator = ScanCoordinator() if settings.SCAN_EXECUTOR != "inline" else None
+
+# Recent recommendation result sets, for ?since=<version> delta responses
+recommendation_versions = ResultVersions()
+
+# Identical concurrent scans share one computation, across API workers when enabled
+coalescer = SingleFlight(
+    f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}/{settings.COALESCING_REDIS_DB}"
+    if settings.COALESCE_ACROSS_WORKERS else None
+)
+
+# Scans wait here for a fair share of scan slots and cloud API tokens across tenants
+scheduler = FairShareScheduler(
+    slots=settings.SCHEDULER_SLOTS,
+    max_concurrent_per_tenant=settings.TENANT_MAX_CONCURRENT_SCANS,
+    tokens_per_second=settings.SCHEDULER_API_TOKENS_PER_SECOND,
+    burst_tokens=settings.SCHEDULER_API_TOKEN_BURST,
+    weights=parse_weights(settings.TENANT_WEIGHTS)
+)
+# Scheduler cost of each kind of scan, in estimated cloud API calls
+RECOMMENDATION_SCAN_COST = 50
+COST_ANALYSIS_COST = 1
+COST_ALLOCATION_COST = 20
+
+# Recent scan and cost results shared by the dashboard and the individual endpoints
+result_cache = TTLCache(settings.DASHBOARD_CACHE_TTL_SECONDS)
+# Coalesces cache fills (including encoding) within this process
+local_flight = SingleFlight()
+
+# Number of recommendations and underutilized resources listed on the dashboard
+DASHBOARD_TOP_N = 10
+
+def _tenant(current_user: dict) -> str:
+    """Get the tenant whose cloud accounts a user's requests scan."""
+    return current_user.get("tenant") or current_user["username"]
+
+def _priority(request: Request) -> Priority:
+    """Get a request's scheduling class; clients mark periodic refreshes with X-Scan-Priority: background."""
+    if request.headers.get("x-scan-priority", "").lower() == "background":
+        return Priority.BACKGROUND
+    return Priority.INTERACTIVE
+
+async def _run_scan(coroutine):
+    """Run an AWSService scan in a worker thread so concurrent requests can join it.
+
+    AWSService makes blocking boto3 calls; awaiting it directly would stall the event loop
+    and serialize requests that could otherwise coalesce.
+    """
+    return await asyncio.to_thread(asyncio.run, coroutine)
+
+async def _shared(key: str, compute):
+    """Get a recently computed result, or compute it once for all concurrent callers."""
+    result = result_cache.get(key)
+    if result is None:
+        result = await local_flight.do(key, compute)
+        result_cache.set(key, result)
+    return result
+
+async def _recommendations(current_user: dict, priority: Priority = Priority.INTERACTIVE) -> EncodedList:
+    """Get the tenant's recommendations from the shared cache, scanning on a miss.
+
+    Results are validated against OptimizationResponse and encoded once here, so
+    responses serve the cached bytes.
+    """
+    key = coalescing_key(_tenant(current_user), "aws", "/optimization/recommendations", {"budget_seconds": None})
+
+    async def produce() -> EncodedList:
+        recommendations = await coalescer.do(key, lambda: scheduler.run(
+            _tenant(current_user), lambda: _scan_recommendations(None), priority, RECOMMENDATION_SCAN_COST
+        ))
+        return await asyncio.to_thread(EncodedList, recommendations, OptimizationResponse)
+
+    return await _shared(key, produce)
+
+async def _cost_analysis(
+    current_user: dict,
+    start_date: datetime,
+    end_date: datetime,
+    priority: Priority = Priority.INTERACTIVE
+) -> Dict:
+    """Get the tenant's cost analysis for a period from the shared cache."""
+    key = coalescing_key(
+        _tenant(current_user), "aws", "/costs",
+        {"start": start_date.strftime('%Y-%m-%d'), "end": end_date.strftime('%Y-%m-%d')}
+    )
+    return await _shared(key, lambda: coalescer.do(key, lambda: scheduler.run(
+        _tenant(current_user),
+        lambda: _run_scan(aws_service.get_cost_analysis(start_date, end_date)),
+        priority,
+        COST_ANALYSIS_COST
+    )))
+
+async def _allocation_index(
+    current_user: dict,
+    days: int,
+    priority: Priority = Priority.INTERACTIVE
+) -> CostAllocationIndex:
+    """Get the tenant's cost allocation index for the last days, building it once per process."""
+    end_date = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    start_date = end_date - timedelta(days=days)
+    key = coalescing_key(
+        _tenant(current_user), "aws", "/costs/allocation",
+        {"start": start_date.strftime('%Y-%m-%d'), "end": end_date.strftime('%Y-%m-%d')}
+    )
+    return await local_flight.do(key, lambda: scheduler.run(
+        _tenant(current_user),
+        lambda: asyncio.to_thread(aws_service.get_cost_allocation_index, start_date, end_date),
+        priority,
+        COST_ALLOCATION_COST
+    ))
+
+def _parse_tag_filters(filters: List[str]) -> Dict[str, Optional[str]]:
+    """Parse 'key=value' filters; 'key=*' matches any value and 'key=' a missing tag."""
+    parsed = {}
+    for entry in filters:
+        key, separator, value = entry.partition("=")
+        if not key or not separator:
+            raise HTTPException(status_code=400, detail=f"Invalid tag filter: {entry}")
+        parsed[key] = value or None
+    return parsed
+
 @app.get("/api/v1/health")
 async def health_check():
     """Health check endpoint."""
     return {"status": "healthy", "timestamp": datetime.utcnow()}
 
+@app.get("/api/v1/metrics/coalescing")
+async def get_coalescing_metrics(current_user: dict = Depends(get_current_user)):
+    """Get how often scan requests were served by an identical in-flight scan."""
+    return coalescer.metrics()
+
+@app.get("/api/v1/metrics/scheduler")
+async def get_scheduler_metrics(current_user: dict = Depends(get_current_user)):
+    """Get scan queue depth, running scans and wait times per tenant."""
+    return scheduler.metrics()
+
+@app.get("/api/v1/admin/profiles")
+async def list_profiles(current_user: dict = Depends(get_current_admin)):
+    """List captured profiles with their phase breakdowns, newest first."""
+    return await asyncio.to_thread(profile_store.list)
+
+@app.get("/api/v1/admin/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str, current_user: dict = Depends(get_current_admin)):
+    """Get a captured profile as collapsed stacks, for flamegraph.pl or speedscope."""
+    collapsed = await asyncio.to_thread(profile_store.collapsed, profile_id)
+    if collapsed is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(collapsed)
+
+@app.post("/api/v1/admin/shutdown/overrides")
+async def set_shutdown_override(override: ShutdownOverrideRequest, current_user: dict = Depends(get_current_admin)):
+    """Hold an instance running or stopped until a time, overriding its shutdown schedule."""
+    if not settings.SHUTDOWN_SCHEDULES_PATH:
+        raise HTTPException(status_code=404, detail="Scheduled shutdowns are not enabled")
+    # Imported lazily so the API only needs Celery when shutdowns are enabled
+    from app.worker import shutdown_override
+    task = shutdown_override.delay(override.resource_id, override.state, override.until.isoformat())
+    return {"task_id": task.id}
+
 @app.get("/api/v1/costs/current", response_model=CostAnalysisResponse)
-async def get_current_costs(current_user: dict = Depends(get_current_user)):
+async def get_current_costs(request: Request, current_user: dict = Depends(get_current_user)):
     """Get current month's cost analysis."""
     try:
         end_date = datetime.utcnow()
         start_date = end_date.replace(day=1)  # Start of current month
         
-        cost_data = await aws_service.get_cost_and_usage(start_date, end_date)
-        return cost_data
+        cost_data = await _cost_analysis(current_user, start_date, end_date, _priority(request))
+        return versioned_response(request, CostAnalysisResponse.model_validate(cost_data))
     except Exception as e:
         logger.error(f"Error getting current costs: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/v1/costs/historical")
+@app.get("/api/v1/costs/historical", response_model=CostAnalysisResponse)
 async def get_historical_costs(
+    request: Request,
     days: int = 30,
     current_user: dict = Depends(get_current_user)
 ):
@@ -63,42 +262,291 @@ async def get_historical_costs(
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(days=days)
         
-        cost_data = await aws_service.get_cost_and_usage(start_date, end_date)
-        return cost_data
+        cost_data = await _cost_analysis(current_user, start_date, end_date, _priority(request))
+        return versioned_response(request, CostAnalysisResponse.model_validate(cost_data))
     except Exception as e:
         logger.error(f"Error getting historical costs: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/v1/optimization/recommendations", response_model=List[OptimizationResponse])
-async def get_optimization_recommendations(current_user: dict = Depends(get_current_user)):
-    """Get cost optimization recommendations."""
+@app.get("/api/v1/costs/allocation", response_model=CostAllocationResponse)
+async def get_cost_allocation(
+    request: Request,
+    group_by: List[str] = Query([]),
+    filter: List[str] = Query([]),
+    days: int = 14,
+    current_user: dict = Depends(get_current_user)
+):
+    """Break down spend by any combination of tag keys, e.g. ?group_by=team&group_by=env&filter=env=prod.
+
+    Answered from the allocation index, so new breakdowns make no cloud API calls.
+    """
+    filters = _parse_tag_filters(filter)
+    try:
+        index = await _allocation_index(current_user, days, _priority(request))
+        return {
+            "start_date": index.start_date,
+            "end_date": index.end_date,
+            "source": index.source,
+            "total_cost": round(index.total_cost, 2),
+            "unattributed_cost": round(index.unattributed, 2),
+            "groups": index.breakdown(group_by, filters),
+        }
+    except Exception as e:
+        logger.error(f"Error getting cost allocation: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/v1/costs/allocation/untagged", response_model=UntaggedSpendResponse)
+async def get_untagged_spend(
+    request: Request,
+    keys: List[str] = Query(...),
+    days: int = 14,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get spend on resources missing any of the given tag keys."""
+    try:
+        index = await _allocation_index(current_user, days, _priority(request))
+        return index.untagged(keys)
+    except Exception as e:
+        logger.error(f"Error getting untagged spend: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/v1/costs/allocation/cost-centers", response_model=Dict[str, float])
+async def allocate_cost_centers(
+    allocation: CostCenterRequest,
+    request: Request,
+    current_user: dict = Depends(get_current_user)
+):
+    """Map spend to cost centers with ordered tag-matching rules; the first match wins."""
     try:
-        recommendations = await aws_service.get_optimization_recommendations()
+        index = await _allocation_index(current_user, allocation.days, _priority(request))
+        return index.allocate([rule.model_dump() for rule in allocation.rules], allocation.default)
+    except Exception as e:
+        logger.error(f"Error allocating cost centers: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/v1/storage/s3/recommendations", response_model=S3StorageAnalysisResponse)
+async def get_s3_storage_recommendations(current_user: dict = Depends(get_current_user)):
+    """Recommend S3 lifecycle transitions from the latest S3 Inventory reports in S3_INVENTORY_DIR."""
+    if not settings.S3_INVENTORY_DIR:
+        raise HTTPException(status_code=404, detail="S3 Inventory analysis is not configured")
+    try:
+        key = coalescing_key(_tenant(current_user), "aws", "/storage/s3/recommendations", {})
+        return await _shared(key, lambda: asyncio.to_thread(aws_service.analyze_s3_inventory))
+    except Exception as e:
+        logger.error(f"Error analyzing S3 Inventory: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/v1/costs/data-transfer", response_model=DataTransferResponse)
+async def get_data_transfer_costs(current_user: dict = Depends(get_current_user)):
+    """Attribute data transfer costs to resource pairs from the VPC flow logs in FLOW_LOGS_DIR."""
+    if not settings.FLOW_LOGS_DIR:
+        raise HTTPException(status_code=404, detail="Flow log analysis is not configured")
+    try:
+        key = coalescing_key(_tenant(current_user), "aws", "/costs/data-transfer", {})
+        return await _shared(key, lambda: asyncio.to_thread(aws_service.analyze_flow_logs))
+    except Exception as e:
+        logger.error(f"Error analyzing flow logs: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def _scan_recommendations(budget_seconds: Optional[float]):
+    """Scan for recommendations, sharded across workers when configured."""
+    budget = ScanBudget(budget_seconds) if budget_seconds is not None else None
+    if scan_coordinator is not None and budget is None:
+        regions = await asyncio.to_thread(aws_service._get_regions)
+        recommendations, failed = await asyncio.to_thread(scan_coordinator.run, regions, aws_service.utilization_store)
+        if failed:
+            logger.warning(f"Sharded scan returned partial results; failed shards: {failed}")
         return recommendations
+    recommendations = await _run_scan(aws_service.get_optimization_recommendations(budget))
+    if budget is not None:
+        return {"recommendations": recommendations, "coverage": budget.to_dict()}
+    return recommendations
+
+@app.get(
+    "/api/v1/optimization/recommendations",
+    response_model=Union[List[OptimizationResponse], BudgetedOptimizationResponse]
+)
+async def get_optimization_recommendations(
+    request: Request,
+    budget_seconds: Optional[float] = None,
+    since: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get cost optimization recommendations.
+
+    With budget_seconds, the most expensive resources are analyzed first and the response
+    carries what was found by the deadline plus coverage metadata. With since, set to the
+    ETag of an earlier response, only added, changed and removed recommendations are returned.
+    """
+    try:
+        if budget_seconds is None:
+            recommendations = await _recommendations(current_user, _priority(request))
+            return versioned_response(request, recommendations, recommendation_versions, since)
+
+        key = coalescing_key(
+            _tenant(current_user), "aws", "/optimization/recommendations", {"budget_seconds": budget_seconds}
+        )
+        result = await coalescer.do(key, lambda: scheduler.run(
+            _tenant(current_user), lambda: _scan_recommendations(budget_seconds), _priority(request), RECOMMENDATION_SCAN_COST
+        ))
+        return versioned_response(request, BudgetedOptimizationResponse.model_validate(result))
     except Exception as e:
         logger.error(f"Error getting optimization recommendations: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/v1/resources/underutilized")
-async def get_underutilized_resources(current_user: dict = Depends(get_current_user)):
+@app.post("/api/v1/optimization/whatif", response_model=List[PolicyBacktestResult])
+async def backtest_optimization_policies(
+    request: PolicyBacktestRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Evaluate a grid of rightsizing policies against stored utilization history."""
+    policies = expand_policy_grid(
+        request.thresholds, request.statistics, request.actions, request.peak_limits
+    )
+    if len(policies) > settings.MAX_BACKTEST_POLICIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Policy grid has {len(policies)} combinations; the limit is {settings.MAX_BACKTEST_POLICIES}"
+        )
+    try:
+        return await asyncio.to_thread(
+            backtest_policies,
+            aws_service.utilization_store,
+            policies,
+            metric=request.metric,
+            resource_type=request.resource_type,
+            max_resources=request.max_resources
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error backtesting optimization policies: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/v1/resources/underutilized", response_model=List[UnderutilizedResource])
+async def get_underutilized_resources(request: Request, current_user: dict = Depends(get_current_user)):
     """Get list of underutilized resources."""
     try:
-        resources = await aws_service.get_underutilized_resources()
+        recommendations = (await _recommendations(current_user, _priority(request))).items
+        resources = await aws_service.get_underutilized_resources(recommendations)
         return resources
     except Exception as e:
         logger.error(f"Error getting underutilized resources: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/v1/resources/utilization", response_model=UtilizationSummary)
+async def get_resource_utilization(request: Request, current_user: dict = Depends(get_current_user)):
+    """Get fleet-average utilization over the last day."""
+    try:
+        recommendations = (await _recommendations(current_user, _priority(request))).items
+        return await asyncio.to_thread(aws_service.get_utilization_summary, recommendations)
+    except Exception as e:
+        logger.error(f"Error getting resource utilization: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/v1/resources/utilization/series", response_model=UtilizationSeriesResponse)
+async def get_utilization_series(
+    metric: str = "cpu",
+    resource_id: List[str] = Query([]),
+    resource_type: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    days: int = 7,
+    aggregate: str = "mean",
+    points: int = 300,
+    method: str = "lttb",
+    current_user: dict = Depends(get_current_user)
+):
+    """Get utilization history for charts, downsampled to at most `points` points.
+
+    Resources are reduced to one series with aggregate=mean|sum|min|max|p95 (any
+    percentile), or charted separately with aggregate=none. The range defaults to the
+    last `days` days; method=minmax keeps spikes that lttb may smooth over.
+    """
+    if start is None:
+        start = (end or datetime.utcnow()) - timedelta(days=days)
+    try:
+        return await asyncio.to_thread(
+            aws_service.get_utilization_series,
+            metric, resource_id, resource_type, start, end, aggregate, points, method
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error getting utilization series: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/v1/savings/forecast")
-async def get_savings_forecast(current_user: dict = Depends(get_current_user)):
+async def get_savings_forecast(request: Request, current_user: dict = Depends(get_current_user)):
     """Get savings forecast based on optimization recommendations."""
     try:
-        forecast = await aws_service.get_savings_forecast()
-        return forecast
+        recommendations = (await _recommendations(current_user, _priority(request))).items
+        forecast = await aws_service.get_savings_forecast(recommendations)
+        return versioned_response(request, forecast)
     except Exception as e:
         logger.error(f"Error getting savings forecast: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/v1/dashboard", response_model=DashboardResponse)
+async def get_dashboard(request: Request, current_user: dict = Depends(get_current_user)):
+    """Get every dashboard panel in one response.
+
+    Costs for this and the previous month and the recommendation scan are fetched
+    concurrently from the shared result cache, and the savings, underutilization and
+    utilization panels are derived from them. A failing panel is reported in errors
+    instead of failing the whole dashboard.
+    """
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = today.replace(day=1)
+    end = today + timedelta(days=1)  # Cost Explorer end dates are exclusive
+    previous_start = (start - timedelta(days=1)).replace(day=1)
+    previous_end = min(previous_start + (end - start), start)
+
+    priority = _priority(request)
+    current_costs, previous_costs, recommendations = await asyncio.gather(
+        _cost_analysis(current_user, start, end, priority),
+        _cost_analysis(current_user, previous_start, previous_end, priority),
+        _recommendations(current_user, priority),
+        return_exceptions=True
+    )
+
+    dashboard = {"generated_at": datetime.utcnow(), "errors": {}}
+    if isinstance(current_costs, Exception):
+        logger.error(f"Error getting dashboard costs: {str(current_costs)}")
+        dashboard["errors"]["costs"] = str(current_costs)
+    else:
+        previous_total = 0.0 if isinstance(previous_costs, Exception) else previous_costs["total_cost"]
+        dashboard["costs"] = {
+            "total_cost": current_costs["total_cost"],
+            "trend_percentage": round(
+                100 * (current_costs["total_cost"] - previous_total) / previous_total, 1
+            ) if previous_total else 0.0,
+            "daily_costs": current_costs["daily_costs"],
+            "service_costs": current_costs["breakdown_by_service"],
+        }
+
+    if isinstance(recommendations, Exception):
+        logger.error(f"Error getting dashboard recommendations: {str(recommendations)}")
+        dashboard["errors"]["recommendations"] = str(recommendations)
+        recommendations = None
+    else:
+        recommendations = recommendations.items
+        underutilized = await aws_service.get_underutilized_resources(recommendations)
+        dashboard["savings"] = await aws_service.get_savings_forecast(recommendations)
+        dashboard["top_recommendations"] = sorted(
+            recommendations, key=lambda item: -item["estimated_savings"]
+        )[:DASHBOARD_TOP_N]
+        dashboard["underutilized"] = underutilized[:DASHBOARD_TOP_N]
+        dashboard["underutilized_count"] = len(underutilized)
+
+    try:
+        dashboard["utilization"] = await asyncio.to_thread(aws_service.get_utilization_summary, recommendations)
+    except Exception as e:
+        logger.error(f"Error getting dashboard utilization: {str(e)}")
+        dashboard["errors"]["utilization"] = str(e)
+
+    return versioned_response(request, DashboardResponse.model_validate(dashboard))
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -1,26 +1,55 @@
 from pydantic import BaseModel
-from typing import Dict, List, Optional
+from typing import Dict, List, Literal, Optional
 from datetime import datetime
 
 class ResourceMetrics(BaseModel):
     cpu_utilization: Dict[str, float]
-    memory_utilization: Optional[Dict[str, float]]
-    storage_utilization: Optional[Dict[str, float]]
+    memory_utilization: Optional[Dict[str, float]] = None
+    storage_utilization: Optional[Dict[str, float]] = None
+    connections: Optional[Dict[str, float]] = None
+    commitment: Optional[Dict[str, float]] = None
 
 class OptimizationResponse(BaseModel):
     resource_id: str
     resource_type: str
+    region: Optional[str] = None
     current_config: str
     recommended_config: str
     reason: str
     estimated_savings: float
+    memory_data_available: Optional[bool] = None
     metrics: ResourceMetrics
 
+class SkippedResource(BaseModel):
+    resource_id: str
+    resource_type: str
+    estimated_monthly_cost: float
+
+class ScanCoverage(BaseModel):
+    budget_seconds: Optional[float] = None
+    deadline_reached: bool
+    resources_total: int
+    resources_analyzed: int
+    fraction_resources: float
+    estimated_spend_total: float
+    estimated_spend_analyzed: float
+    fraction_spend: float
+    skipped_count: int
+    skipped: List[SkippedResource]
+
+class BudgetedOptimizationResponse(BaseModel):
+    recommendations: List[OptimizationResponse]
+    coverage: ScanCoverage
+
 class CostBreakdown(BaseModel):
     service: str
     cost: float
     usage: float
 
+class DailyCost(BaseModel):
+    date: str
+    cost: float
+
 class CostAnalysisResponse(BaseModel):
     total_cost: float
     start_date: datetime
@@ -28,6 +57,115 @@ class CostAnalysisResponse(BaseModel):
     currency: str = "USD"
     breakdown_by_service: List[CostBreakdown]
     breakdown_by_tag: Dict[str, float]
+    daily_costs: List[DailyCost] = []
+
+class CostAllocationGroup(BaseModel):
+    tags: Dict[str, Optional[str]]
+    cost: float
+    resources: int
+
+class CostAllocationResponse(BaseModel):
+    start_date: datetime
+    end_date: datetime
+    source: str
+    total_cost: float
+    unattributed_cost: float
+    groups: List[CostAllocationGroup]
+
+class UntaggedResourceCost(BaseModel):
+    resource_id: str
+    cost: float
+
+class UntaggedSpendResponse(BaseModel):
+    keys: List[str]
+    cost: float
+    resources: int
+    unattributed_cost: float
+    fraction_of_spend: float
+    top_resources: List[UntaggedResourceCost]
+
+class CostCenterRule(BaseModel):
+    name: str
+    match: Dict[str, Optional[str]]
+
+class CostCenterRequest(BaseModel):
+    rules: List[CostCenterRule]
+    default: str = "unallocated"
+    days: int = 14
+
+class S3ObjectTotals(BaseModel):
+    objects: int
+    bytes: int
+
+class S3PrefixSummary(BaseModel):
+    bucket: str
+    prefix: str
+    objects: int
+    bytes: int
+    monthly_cost: float
+    by_storage_class: Dict[str, S3ObjectTotals]
+    age_histogram: Dict[str, S3ObjectTotals]
+
+class S3LifecycleTransition(BaseModel):
+    days: int
+    storage_class: str
+
+class S3LifecycleRecommendation(BaseModel):
+    bucket: str
+    prefix: str
+    action: str
+    transitions: List[S3LifecycleTransition]
+    reason: str
+    objects_affected: int
+    bytes_affected: int
+    current_monthly_cost: float
+    estimated_savings: float
+    transition_cost: float
+
+class S3StorageAnalysisResponse(BaseModel):
+    files_analyzed: int
+    objects: int
+    bytes: int
+    monthly_cost: float
+    estimated_savings: float
+    groups: List[S3PrefixSummary]
+    recommendations: List[S3LifecycleRecommendation]
+
+class DataTransferTotals(BaseModel):
+    bytes: int
+    cost: float
+
+class DataTransferFlow(BaseModel):
+    source: str
+    source_az: Optional[str] = None
+    destination: str
+    destination_az: Optional[str] = None
+    flow_class: str
+    bytes: int
+    cost: float
+    monthly_cost: float
+
+class DataTransferRecommendation(BaseModel):
+    resources: List[str]
+    availability_zones: List[str]
+    flow_class: str
+    action: str
+    reason: str
+    monthly_bytes: int
+    estimated_savings: float
+
+class DataTransferResponse(BaseModel):
+    files_analyzed: int
+    window_start: Optional[datetime] = None
+    window_end: Optional[datetime] = None
+    window_hours: float
+    bytes: int
+    unindexed_bytes: int
+    estimated_cost: float
+    estimated_monthly_cost: float
+    by_class: Dict[str, DataTransferTotals]
+    top_flows: List[DataTransferFlow]
+    recommendations: List[DataTransferRecommendation]
 
 class SavingsForecast(BaseModel):
     total_potential_savings: float
@@ -41,4 +179,70 @@ class UnderutilizedResource(BaseModel):
     average_utilization: float
     peak_utilization: float
     cost_per_month: float
-    last_used: datetime
+    last_used: Optional[datetime] = None
+    estimated_savings: Optional[float] = None
+
+class UtilizationSummary(BaseModel):
+    cpu_usage: Optional[float] = None
+    memory_usage: Optional[float] = None
+    storage_usage: Optional[float] = None
+    total_memory: Optional[float] = None
+    total_storage: Optional[float] = None
+    resources_reporting: int = 0
+
+class UtilizationSeries(BaseModel):
+    name: str
+    # Epoch seconds, parallel to values
+    timestamps: List[int]
+    values: List[float]
+
+class UtilizationSeriesResponse(BaseModel):
+    metric: str
+    aggregate: str
+    method: str
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    resources: int
+    hours: int
+    series: List[UtilizationSeries]
+
+class DashboardCosts(BaseModel):
+    total_cost: float
+    trend_percentage: float
+    daily_costs: List[DailyCost]
+    service_costs: List[CostBreakdown]
+
+class DashboardResponse(BaseModel):
+    generated_at: datetime
+    costs: Optional[DashboardCosts] = None
+    savings: Optional[SavingsForecast] = None
+    top_recommendations: List[OptimizationResponse] = []
+    underutilized: List[UnderutilizedResource] = []
+    underutilized_count: int = 0
+    utilization: Optional[UtilizationSummary] = None
+    # Panels that failed, by name, so one failing data source doesn't blank the dashboard
+    errors: Dict[str, str] = {}
+
+class ShutdownOverrideRequest(BaseModel):
+    resource_id: str
+    state: Literal["running", "stopped"]
+    until: datetime
+
+class PolicyBacktestRequest(BaseModel):
+    thresholds: List[float]
+    statistics: List[str] = ["mean"]
+    actions: List[str] = ["downsize"]
+    peak_limits: List[float] = [50.0]
+    metric: str = "cpu"
+    resource_type: Optional[str] = None
+    max_resources: int = 100
+
+class PolicyBacktestResult(BaseModel):
+    threshold: float
+    statistic: str
+    action: str
+    peak_limit: float
+    affected_count: int
+    estimated_savings: float
+    peak_risk_count: int
+    affected_resources: List[str]
@@ -4,142 +4,1003 @@ from typing import Dict, List, Optional
 import logging
 from botocore.exceptions import ClientError
 
+import numpy as np
+
+from app.core.cache import TTLCache
+from app.core.config import Settings
+from app.core.profiling import phase
+from app.core.scan_budget import ScanBudget
+from app.core.snapshot import Snapshot, shared_snapshot, snapshot_client
+from app.services.commitment_optimizer import CommitmentOptimizer
+from app.services.cost_allocation import CostAllocationIndex
+from app.services.flow_logs import FlowLogAnalyzer, FlowLogIndex, find_flow_log_files
+from app.services.s3_inventory import S3InventoryAnalyzer, find_manifests
+from app.services.timeseries import query_series
+
+from app.services.pricing import (
+    EC2_HOURLY_PRICING,
+    HOURS_PER_MONTH,
+    RDS_HOURLY_PRICING,
+    RDS_INSTANCE_CLASSES,
+    ec2_monthly_cost,
+    rds_monthly_cost,
+    split_rds_class,
+)
+from app.services.utilization_store import UtilizationStore
+
 logger = logging.getLogger(__name__)
+settings = Settings()
+
+# GetMetricData accepts at most 500 queries per request
+METRIC_DATA_BATCH_SIZE = 500
+# Each DB instance needs four metric queries
+RDS_INSTANCES_PER_BATCH = METRIC_DATA_BATCH_SIZE // 4
+# Ids per describe call when listing given instances; DescribeDBInstances takes at most 100 filter values
+INVENTORY_FILTER_VALUES = 100
+# CPU above this counts as activity when reporting when a resource was last used
+ACTIVE_CPU_PERCENT = 5.0
+# Cost Explorer keeps resource-level costs for the last 14 days only
+RESOURCE_COST_DAYS = 14
+# Services whose resource-level costs are joined with tags for cost allocation
+RESOURCE_COST_SERVICES = [
+    'Amazon Elastic Compute Cloud - Compute',
+    'Amazon Relational Database Service',
+    'Amazon Simple Storage Service',
+    'Amazon ElastiCache',
+    'Amazon OpenSearch Service',
+    'AWS Lambda',
+]
+# Resource-level cost groups that don't belong to a resource
+NO_RESOURCE_IDS = {'', 'NoResourceId'}
+
+
+def _resource_id(arn_or_id: str) -> str:
+    """Normalize an ARN to the id scans and Cost Explorer use (i-..., vol-..., a DB identifier)."""
+    if not arn_or_id.startswith('arn:'):
+        return arn_or_id
+    resource = arn_or_id.split(':', 5)[-1]
+    return resource.rsplit('/', 1)[-1].rsplit(':', 1)[-1]
+
+def _id_filters(name: str, resource_ids: Optional[List[str]]) -> List[Dict]:
+    """Describe-call arguments listing everything, or the given ids in chunks.
+
+    Ids are passed as a filter rather than by id, so resources deleted since they were
+    listed are simply missing instead of failing the call.
+    """
+    if resource_ids is None:
+        return [{}]
+    return [
+        {'Filters': [{'Name': name, 'Values': resource_ids[start:start + INVENTORY_FILTER_VALUES]}]}
+        for start in range(0, len(resource_ids), INVENTORY_FILTER_VALUES)
+    ]
 
 class AWSService:
-    def __init__(self):
-        self.ec2 = boto3.client('ec2')
-        self.cloudwatch = boto3.client('cloudwatch')
-        self.cost_explorer = boto3.client('ce')
-        self.rds = boto3.client('rds')
+    def __init__(
+        self,
+        session: Optional[boto3.Session] = None,
+        regions: Optional[List[str]] = None,
+        utilization_store: Optional[UtilizationStore] = None,
+        snapshot_scope: str = '',
+        snapshot: Optional[Snapshot] = None
+    ):
+        self.session = session or boto3.Session()
+        # API responses are captured to or replayed from a snapshot when SCAN_SNAPSHOT_MODE is set;
+        # the scope keeps different accounts' calls apart
+        self._snapshot = snapshot or shared_snapshot(settings.SCAN_SNAPSHOT_MODE, settings.SCAN_SNAPSHOT_PATH)
+        self._snapshot_scope = snapshot_scope
+        self.ec2 = self._client('ec2')
+        self.cloudwatch = self._client('cloudwatch')
+        self.cost_explorer = self._client('ce')
+        self.rds = self._client('rds')
+        self._regions = regions
+        self._regional_clients: Dict[tuple, object] = {}
+        # (namespace, region) -> {metric name: {instance id: dimensions}}
+        self._metric_availability = TTLCache(settings.METRIC_DISCOVERY_TTL_SECONDS)
+        # (start date, end date) -> CostAllocationIndex
+        self._allocation_indexes = TTLCache(settings.COST_ALLOCATION_TTL_SECONDS, maxsize=16)
+        # Commitment recommendations; the hourly spend behind them is billed per query and changes slowly
+        self._commitment_recommendations = TTLCache(settings.COMMITMENT_CACHE_TTL_SECONDS, maxsize=1)
+        # Network interfaces and subnets of every region, for classifying flow logs
+        self._flow_log_indexes = TTLCache(settings.FLOW_LOG_INDEX_TTL_SECONDS, maxsize=1)
+        # Hourly history of every metric fetched by scans, used for what-if policy backtests
+        self.utilization_store = utilization_store or UtilizationStore(
+            retention_hours=settings.UTILIZATION_RETENTION_DAYS * 24,
+            path=settings.UTILIZATION_STORE_PATH
+        )
+        # Recent chart queries, keyed with the store version so new datapoints invalidate them
+        self._series_queries = TTLCache(settings.UTILIZATION_QUERY_CACHE_TTL_SECONDS, maxsize=256)
+
+    def _client(self, service: str, region: Optional[str] = None):
+        """Create a boto3 client, wrapped for snapshot capture or replay when enabled."""
+        name = '.'.join(part for part in ('aws', self._snapshot_scope, service, region) if part)
+        if region is None:
+            return snapshot_client(name, lambda: self.session.client(service), self._snapshot)
+        return snapshot_client(name, lambda: self.session.client(service, region_name=region), self._snapshot)
+
+    def _regional_client(self, service: str, region: str):
+        """Get a cached boto3 client for a service in a specific region."""
+        key = (service, region)
+        if key not in self._regional_clients:
+            self._regional_clients[key] = self._client(service, region)
+        return self._regional_clients[key]
+
+    def _get_metric_availability(self, namespace: str, region: str) -> Dict[str, Dict[str, List[Dict]]]:
+        """Discover which instances publish metrics in a namespace, with one paginated ListMetrics call.
+
+        Returns a mapping of metric name to instance id to the exact dimensions the metric is
+        published with. Results are cached per namespace and region for the configured TTL.
+        If ListMetrics is denied or throttled, nothing is returned and nothing cached, so the
+        scan continues with CPU only and retries discovery next time.
+        """
+        key = (namespace, region)
+        availability = self._metric_availability.get(key)
+        if availability is not None:
+            return availability
+
+        availability = {}
+        paginator = self._regional_client('cloudwatch', region).get_paginator('list_metrics')
+        try:
+            with phase('metrics'):
+                for page in paginator.paginate(Namespace=namespace):
+                    for metric in page['Metrics']:
+                        dimensions = metric.get('Dimensions', [])
+                        instance_id = next((d['Value'] for d in dimensions if d['Name'] == 'InstanceId'), None)
+                        if instance_id is None:
+                            continue
+                        # Keep the first dimension set seen; agents publish one set per instance
+                        availability.setdefault(metric['MetricName'], {}).setdefault(instance_id, dimensions)
+        except ClientError as e:
+            logger.warning(f"Could not list {namespace} metrics in {region}: {str(e)}")
+            return {}
+
+        self._metric_availability.set(key, availability)
+        return availability
+
+    def get_memory_dimensions(self, region: str) -> Dict[str, List[Dict]]:
+        """Get the dimensions of each instance in a region publishing CloudWatch agent memory metrics."""
+        return self._get_metric_availability('CWAgent', region).get('mem_used_percent', {})
+
+    def list_resource_ids(self, resource_kind: str, region: str) -> List[str]:
+        """List the ids of a region's EC2 instances ('ec2') or available DB instances ('rds')."""
+        if resource_kind == 'ec2':
+            return [instance['InstanceId'] for instance in self._list_instances(region)]
+        if resource_kind == 'rds':
+            return [instance['DBInstanceIdentifier'] for instance in self._list_db_instances(region)]
+        raise ValueError(f"Unknown resource kind: {resource_kind}")
+
+    def _get_regions(self) -> List[str]:
+        """Get the regions enabled for this account."""
+        if self._regions is None:
+            with phase('inventory'):
+                response = self.ec2.describe_regions(
+                    Filters=[{'Name': 'opt-in-status', 'Values': ['opt-in-not-required', 'opted-in']}]
+                )
+            self._regions = sorted(region['RegionName'] for region in response['Regions'])
+        return self._regions
 
     async def get_cost_and_usage(self, start_date: datetime, end_date: datetime) -> Dict:
         """Get detailed cost and usage data from AWS Cost Explorer."""
         try:
-            response = self.cost_explorer.get_cost_and_usage(
-                TimePeriod={
-                    'Start': start_date.strftime('%Y-%m-%d'),
-                    'End': end_date.strftime('%Y-%m-%d')
-                },
-                Granularity='DAILY',
-                Metrics=['UnblendedCost', 'UsageQuantity'],
-                GroupBy=[
-                    {'Type': 'DIMENSION', 'Key': 'SERVICE'},
-                    {'Type': 'TAG', 'Key': 'Environment'}
-                ]
-            )
+            with phase('cost_explorer'):
+                response = self.cost_explorer.get_cost_and_usage(
+                    TimePeriod={
+                        'Start': start_date.strftime('%Y-%m-%d'),
+                        'End': end_date.strftime('%Y-%m-%d')
+                    },
+                    Granularity='DAILY',
+                    Metrics=['UnblendedCost', 'UsageQuantity'],
+                    GroupBy=[
+                        {'Type': 'DIMENSION', 'Key': 'SERVICE'},
+                        {'Type': 'TAG', 'Key': 'Environment'}
+                    ]
+                )
             return response
         except ClientError as e:
             logger.error(f"Error getting cost and usage: {str(e)}")
             raise
 
-    async def get_optimization_recommendations(self) -> List[Dict]:
-        """Get cost optimization recommendations."""
+    async def get_cost_analysis(self, start_date: datetime, end_date: datetime) -> Dict:
+        """Summarize Cost Explorer data into totals by day, service and Environment tag."""
+        response = await self.get_cost_and_usage(start_date, end_date)
+
+        daily_costs = []
+        by_service: Dict[str, Dict[str, float]] = {}
+        by_tag: Dict[str, float] = {}
+        for result in response['ResultsByTime']:
+            day_total = 0.0
+            for group in result.get('Groups', []):
+                service, tag = group['Keys']
+                cost = float(group['Metrics']['UnblendedCost']['Amount'])
+                usage = float(group['Metrics']['UsageQuantity']['Amount'])
+                day_total += cost
+                totals = by_service.setdefault(service, {'cost': 0.0, 'usage': 0.0})
+                totals['cost'] += cost
+                totals['usage'] += usage
+                # Tag keys come back as 'Environment$<value>', with no value when untagged
+                environment = tag.split('$', 1)[-1] or 'untagged'
+                by_tag[environment] = by_tag.get(environment, 0.0) + cost
+            daily_costs.append({'date': result['TimePeriod']['Start'], 'cost': round(day_total, 2)})
+
+        return {
+            'total_cost': round(sum(day['cost'] for day in daily_costs), 2),
+            'start_date': start_date,
+            'end_date': end_date,
+            'currency': 'USD',
+            'breakdown_by_service': sorted(
+                (
+                    {'service': service, 'cost': round(totals['cost'], 2), 'usage': round(totals['usage'], 2)}
+                    for service, totals in by_service.items()
+                ),
+                key=lambda item: -item['cost']
+            ),
+            'breakdown_by_tag': {tag: round(cost, 2) for tag, cost in by_tag.items()},
+            'daily_costs': daily_costs
+        }
+
+    def get_cost_allocation_index(self, start_date: datetime, end_date: datetime) -> CostAllocationIndex:
+        """Get a cached allocation index joining resource-level costs with resource tags.
+
+        Building it takes one paginated tagging call per region and one paginated Cost
+        Explorer query; every breakdown after that is answered locally.
+        """
+        key = (start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
+        return self._allocation_indexes.get_or_set(key, lambda: self._build_cost_allocation_index(start_date, end_date))
+
+    def _build_cost_allocation_index(self, start_date: datetime, end_date: datetime) -> CostAllocationIndex:
+        tags: Dict[str, Dict[str, str]] = {}
+        for region in self._get_regions():
+            tags.update(self._get_resource_tags(region))
+
+        start_date = max(start_date, end_date - timedelta(days=RESOURCE_COST_DAYS))
+        try:
+            costs, unattributed = self._get_resource_costs(start_date, end_date)
+            source = 'cost_explorer'
+        except ClientError as e:
+            # Resource-level data is opt-in; fall back to the costs scans estimated
+            logger.warning(f"Resource-level costs unavailable, using estimated costs: {str(e)}")
+            days = max((end_date - start_date).total_seconds() / 86400, 1 / 24)
+            costs = {
+                resource_id: monthly_cost * days * 24 / HOURS_PER_MONTH
+                for resource_id, monthly_cost in self.utilization_store.estimated_costs().items()
+            }
+            unattributed = 0.0
+            source = 'estimate'
+
+        logger.info(f"Built cost allocation index: {len(costs)} resources, {len(tags)} tagged")
+        return CostAllocationIndex(costs, tags, start_date, end_date, unattributed=unattributed, source=source)
+
+    def _get_resource_tags(self, region: str) -> Dict[str, Dict[str, str]]:
+        """Get the tags of every tagged resource in a region with the Resource Groups Tagging API."""
+        tags = {}
+        paginator = self._regional_client('resourcegroupstaggingapi', region).get_paginator('get_resources')
+        with phase('inventory'):
+            for page in paginator.paginate(ResourcesPerPage=100):
+                for mapping in page['ResourceTagMappingList']:
+                    tags[_resource_id(mapping['ResourceARN'])] = {
+                        tag['Key']: tag['Value'] for tag in mapping.get('Tags', [])
+                    }
+        return tags
+
+    def _get_resource_costs(self, start_date: datetime, end_date: datetime) -> tuple:
+        """Get unblended cost per resource, and the cost not attributed to any resource."""
+        costs: Dict[str, float] = {}
+        unattributed = 0.0
+        request = {
+            'TimePeriod': {'Start': start_date.strftime('%Y-%m-%d'), 'End': end_date.strftime('%Y-%m-%d')},
+            'Granularity': 'MONTHLY',
+            'Metrics': ['UnblendedCost'],
+            'Filter': {'Dimensions': {'Key': 'SERVICE', 'Values': RESOURCE_COST_SERVICES}},
+            'GroupBy': [{'Type': 'DIMENSION', 'Key': 'RESOURCE_ID'}],
+        }
+        with phase('cost_explorer'):
+            while True:
+                response = self.cost_explorer.get_cost_and_usage_with_resources(**request)
+                for result in response['ResultsByTime']:
+                    for group in result.get('Groups', []):
+                        amount = float(group['Metrics']['UnblendedCost']['Amount'])
+                        resource_id = _resource_id(group['Keys'][0])
+                        if resource_id in NO_RESOURCE_IDS:
+                            unattributed += amount
+                        else:
+                            costs[resource_id] = costs.get(resource_id, 0.0) + amount
+                if not response.get('NextPageToken'):
+                    break
+                request['NextPageToken'] = response['NextPageToken']
+        return costs, unattributed
+
+    def analyze_s3_inventory(self, manifest_paths: Optional[List[str]] = None) -> Dict:
+        """Recommend S3 lifecycle transitions from S3 Inventory reports on local disk.
+
+        Defaults to the latest report of every inventory configuration under
+        S3_INVENTORY_DIR. Reports are read locally, so no S3 API calls are made.
+        """
+        if manifest_paths is None:
+            if not settings.S3_INVENTORY_DIR:
+                raise ValueError("S3_INVENTORY_DIR is not configured")
+            manifest_paths = find_manifests(settings.S3_INVENTORY_DIR)
+        analyzer = S3InventoryAnalyzer(
+            prefix_depth=settings.S3_INVENTORY_PREFIX_DEPTH,
+            workers=settings.S3_INVENTORY_WORKERS,
+            min_monthly_savings=settings.S3_MIN_MONTHLY_SAVINGS
+        )
+        with phase('s3_inventory'):
+            return analyzer.analyze(manifest_paths)
+
+    def get_flow_log_index(self) -> FlowLogIndex:
+        """Get a cached index of every network interface and subnet in the enabled regions."""
+        return self._flow_log_indexes.get_or_set('fleet', self._build_flow_log_index)
+
+    def _build_flow_log_index(self) -> FlowLogIndex:
+        index = FlowLogIndex()
+        for region in self._get_regions():
+            ec2 = self._regional_client('ec2', region)
+            with phase('inventory'):
+                for page in ec2.get_paginator('describe_network_interfaces').paginate():
+                    for interface in page['NetworkInterfaces']:
+                        index.add_interface(interface, region)
+                for page in ec2.get_paginator('describe_subnets').paginate():
+                    for subnet in page['Subnets']:
+                        index.add_subnet(subnet, region)
+        logger.info(f"Built flow log index: {len(index)} interfaces and subnets")
+        return index.compile()
+
+    def analyze_flow_logs(self, paths: Optional[List[str]] = None) -> Dict:
+        """Attribute data transfer costs to resources from VPC flow logs on local disk.
+
+        Defaults to every flow log file under FLOW_LOGS_DIR.
+        """
+        if paths is None:
+            if not settings.FLOW_LOGS_DIR:
+                raise ValueError("FLOW_LOGS_DIR is not configured")
+            paths = find_flow_log_files(settings.FLOW_LOGS_DIR)
+        analyzer = FlowLogAnalyzer(
+            self.get_flow_log_index(),
+            workers=settings.FLOW_LOG_WORKERS,
+            min_monthly_savings=settings.FLOW_LOG_MIN_MONTHLY_SAVINGS
+        )
+        with phase('flow_logs'):
+            return analyzer.analyze(paths)
+
+    async def get_optimization_recommendations(self, budget: Optional[ScanBudget] = None) -> List[Dict]:
+        """Get cost optimization recommendations.
+
+        With a budget, the most expensive resources are analyzed first and the scan returns
+        what it has at the deadline; the budget then records coverage and skipped resources.
+        """
         recommendations = []
         
         # Check EC2 instances
-        ec2_recommendations = await self._get_ec2_recommendations()
+        ec2_recommendations = await self._get_ec2_recommendations(budget)
         recommendations.extend(ec2_recommendations)
         
         # Check RDS instances
-        rds_recommendations = await self._get_rds_recommendations()
+        rds_recommendations = await self._get_rds_recommendations(budget)
         recommendations.extend(rds_recommendations)
         
+        # Check Savings Plan / RI commitment coverage
+        if settings.COMMITMENT_ANALYSIS_ENABLED and not (budget is not None and budget.expired()):
+            commitment_recommendations = await self._get_commitment_recommendations()
+            recommendations.extend(commitment_recommendations)
+        
+        self.utilization_store.save()
+        
         return recommendations
 
-    async def _get_ec2_recommendations(self) -> List[Dict]:
-        """Analyze EC2 instances for optimization opportunities."""
-        try:
-            instances = self.ec2.describe_instances()
-            recommendations = []
+    async def get_shard_recommendations(
+        self,
+        resource_kind: str,
+        region: Optional[str],
+        resource_ids: Optional[List[str]] = None,
+        memory_dimensions: Optional[Dict[str, List[Dict]]] = None
+    ) -> List[Dict]:
+        """Get recommendations for one slice of a sharded scan.
 
-            for reservation in instances['Reservations']:
-                for instance in reservation['Instances']:
-                    instance_id = instance['InstanceId']
-                    
-                    # Get CPU utilization
-                    cpu_metrics = await self._get_instance_cpu_metrics(instance_id)
-                    
-                    # Get memory utilization
-                    memory_metrics = await self._get_instance_memory_metrics(instance_id)
-                    
-                    if cpu_metrics['average'] < 20 and memory_metrics['average'] < 20:
-                        current_type = instance['InstanceType']
-                        recommended_type = self._suggest_instance_type(current_type, cpu_metrics, memory_metrics)
-                        
-                        if recommended_type != current_type:
-                            recommendations.append({
-                                'resource_id': instance_id,
-                                'resource_type': 'EC2',
-                                'current_config': current_type,
-                                'recommended_config': recommended_type,
-                                'reason': 'Low utilization',
-                                'estimated_savings': await self._calculate_ec2_savings(current_type, recommended_type),
-                                'metrics': {
-                                    'cpu_utilization': cpu_metrics,
-                                    'memory_utilization': memory_metrics
-                                }
-                            })
+        resource_kind is 'ec2', 'rds' or 'commitments'; resource_ids are the ids this shard
+        owns within the region and memory_dimensions the memory metrics discovered for them,
+        both listed once by the coordinator.
+        """
+        regions = [region] if region else None
+        if resource_kind == 'ec2':
+            recommendations = await self._get_ec2_recommendations(
+                regions=regions, instance_ids=resource_ids, memory_dimensions=memory_dimensions
+            )
+        elif resource_kind == 'rds':
+            recommendations = await self._get_rds_recommendations(regions=regions, instance_ids=resource_ids)
+        elif resource_kind == 'commitments':
+            recommendations = await self._get_commitment_recommendations()
+        else:
+            raise ValueError(f"Unknown resource kind: {resource_kind}")
 
-            return recommendations
-        except ClientError as e:
-            logger.error(f"Error analyzing EC2 instances: {str(e)}")
-            raise
+        self.utilization_store.save()
+        return recommendations
+
+    async def get_savings_forecast(self, recommendations: Optional[List[Dict]] = None) -> Dict:
+        """Get a savings forecast based on optimization recommendations.
+
+        Scans for recommendations unless the results of an earlier scan are given.
+        """
+        if recommendations is None:
+            recommendations = await self.get_optimization_recommendations()
+
+        breakdown_by_service: Dict[str, float] = {}
+        for recommendation in recommendations:
+            service = recommendation['resource_type']
+            breakdown_by_service[service] = round(
+                breakdown_by_service.get(service, 0) + recommendation['estimated_savings'], 2
+            )
+
+        monthly_savings = round(sum(breakdown_by_service.values()), 2)
+        return {
+            'total_potential_savings': monthly_savings,
+            'recommendations_count': len(recommendations),
+            'breakdown_by_service': breakdown_by_service,
+            'implementation_timeline': {
+                f"month_{months}": round(monthly_savings * months, 2) for months in (1, 3, 6, 12)
+            }
+        }
+
+    async def get_underutilized_resources(self, recommendations: Optional[List[Dict]] = None) -> List[Dict]:
+        """Get resources whose average CPU is below the rightsizing threshold, largest savings first.
+
+        last_used is the latest hour in the stored history with CPU above ACTIVE_CPU_PERCENT.
+        """
+        if recommendations is None:
+            recommendations = await self.get_optimization_recommendations()
+
+        underutilized = [
+            recommendation for recommendation in recommendations
+            if recommendation['metrics'].get('cpu_utilization')
+            and recommendation['metrics']['cpu_utilization'].get('datapoints', 1)
+            and recommendation['metrics']['cpu_utilization'].get('average', 100) < settings.RIGHTSIZING_CPU_THRESHOLD
+        ]
+        ids = [recommendation['resource_id'] for recommendation in underutilized]
+        costs = dict(zip(ids, self.utilization_store.monthly_costs(ids)))
+        last_used = self._last_active_hours(ids)
+
+        return sorted(
+            (
+                {
+                    'resource_id': recommendation['resource_id'],
+                    'resource_type': recommendation['resource_type'],
+                    'average_utilization': recommendation['metrics']['cpu_utilization']['average'],
+                    'peak_utilization': recommendation['metrics']['cpu_utilization'].get('maximum', 0.0),
+                    'cost_per_month': round(float(costs[recommendation['resource_id']]), 2),
+                    'last_used': last_used.get(recommendation['resource_id']),
+                    'estimated_savings': recommendation['estimated_savings'],
+                }
+                for recommendation in underutilized
+            ),
+            key=lambda item: -item['estimated_savings']
+        )
+
+    def _last_active_hours(self, resource_ids: List[str]) -> Dict[str, datetime]:
+        """Get the latest hour each resource's stored CPU was above ACTIVE_CPU_PERCENT."""
+        ids, hours, values = self.utilization_store.matrix('cpu', resource_ids)
+        if not ids:
+            return {}
+        with np.errstate(invalid='ignore'):
+            active = values >= ACTIVE_CPU_PERCENT
+        # Index of the last active column per row, or -1 when never active
+        last = np.where(active.any(axis=1), active.shape[1] - 1 - np.argmax(active[:, ::-1], axis=1), -1)
+        return {
+            rid: datetime.utcfromtimestamp(int(hours[index]) * 3600)
+            for rid, index in zip(ids, last) if index >= 0
+        }
+
+    def get_utilization_summary(self, recommendations: Optional[List[Dict]] = None, hours: int = 24) -> Dict:
+        """Get fleet-average CPU and memory (percent) over recent hours, plus storage (GB) of analyzed databases."""
+        start = datetime.utcnow() - timedelta(hours=hours)
+        summary = {'resources_reporting': 0}
+        for metric, field in (('cpu', 'cpu_usage'), ('memory', 'memory_usage')):
+            ids, _, values = self.utilization_store.matrix(metric, start=start)
+            reporting = ~np.isnan(values).all(axis=1) if len(ids) else np.zeros(0, dtype=bool)
+            summary[field] = round(float(np.nanmean(values[reporting])), 2) if reporting.any() else None
+            summary['resources_reporting'] = max(summary['resources_reporting'], int(reporting.sum()))
+
+        storage = [
+            recommendation['metrics']['storage_utilization'] for recommendation in recommendations or []
+            if (recommendation['metrics'].get('storage_utilization') or {}).get('allocated_gb')
+        ]
+        total_storage = sum(item['allocated_gb'] for item in storage)
+        used_storage = sum(item['allocated_gb'] - item['free_gb'] for item in storage)
+        # Usage is reported against a total: percentages of 100 for memory, GB for storage
+        summary['total_memory'] = 100.0 if summary['memory_usage'] is not None else None
+        summary['storage_usage'] = round(used_storage, 2) if total_storage else None
+        summary['total_storage'] = round(total_storage, 2) if total_storage else None
+        return summary
 
-    async def _get_rds_recommendations(self) -> List[Dict]:
-        """Analyze RDS instances for optimization opportunities."""
+    def get_utilization_series(
+        self,
+        metric: str,
+        resource_ids: Optional[List[str]] = None,
+        resource_type: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        aggregate: str = 'mean',
+        points: int = 300,
+        method: str = 'lttb'
+    ) -> Dict:
+        """Get a downsampled utilization time series for charts from stored history (cached)."""
+        # History is hourly, so times within the same hour give the same result
+        start = start.replace(minute=0, second=0, microsecond=0) if start else None
+        end = end.replace(minute=0, second=0, microsecond=0) if end else None
+        key = (
+            self.utilization_store.version, metric, tuple(resource_ids or ()), resource_type,
+            start, end, aggregate, points, method,
+        )
+        return self._series_queries.get_or_set(key, lambda: query_series(
+            self.utilization_store, metric, resource_ids, resource_type, start, end, aggregate, points, method
+        ))
+
+    async def _get_ec2_recommendations(
+        self,
+        budget: Optional[ScanBudget] = None,
+        regions: Optional[List[str]] = None,
+        instance_ids: Optional[List[str]] = None,
+        memory_dimensions: Optional[Dict[str, List[Dict]]] = None
+    ) -> List[Dict]:
+        """Analyze EC2 instances in every region for optimization opportunities, most expensive first.
+
+        regions and instance_ids restrict the scan when the work is split across workers;
+        memory_dimensions, when given, replaces per-region memory metric discovery.
+        """
         try:
-            instances = self.rds.describe_db_instances()
             recommendations = []
 
-            for instance in instances['DBInstances']:
-                instance_id = instance['DBInstanceIdentifier']
+            inventory = [
+                (region, instance)
+                for region in (regions or self._get_regions())
+                for instance in self._list_instances(region, instance_ids)
+            ]
+            with phase('pricing'):
+                monthly_costs = {
+                    instance['InstanceId']: ec2_monthly_cost(instance['InstanceType'], region)
+                    for region, instance in inventory
+                }
+            inventory.sort(key=lambda item: -monthly_costs[item[1]['InstanceId']])
+
+            # Only instances running the CloudWatch agent publish memory metrics
+            if memory_dimensions is None:
+                memory_dimensions = {}
+                for region in sorted({region for region, _ in inventory}):
+                    memory_dimensions.update(self.get_memory_dimensions(region))
+
+            for region, instance in inventory:
+                instance_id = instance['InstanceId']
+                if budget is not None and budget.expired():
+                    budget.add(instance_id, monthly_costs[instance_id], analyzed=False, resource_type='EC2')
+                    continue
+                self.utilization_store.set_resource(instance_id, 'EC2', monthly_costs[instance_id])
                 
                 # Get CPU utilization
-                cpu_metrics = await self._get_rds_cpu_metrics(instance_id)
+                cpu_metrics = await self._get_instance_cpu_metrics(instance_id, region)
+                
+                # Get memory utilization
+                memory_data_available = instance_id in memory_dimensions
+                if memory_data_available:
+                    memory_metrics = await self._get_instance_memory_metrics(
+                        instance_id, memory_dimensions[instance_id], region
+                    )
+                else:
+                    memory_metrics = {'average': 0, 'maximum': 0}
                 
-                # Get storage utilization
-                storage_metrics = await self._get_rds_storage_metrics(instance_id)
+                if budget is not None:
+                    budget.add(instance_id, monthly_costs[instance_id], analyzed=True, resource_type='EC2')
                 
-                if cpu_metrics['average'] < 20:
-                    current_class = instance['DBInstanceClass']
-                    recommended_class = self._suggest_rds_class(current_class, cpu_metrics)
+                if (cpu_metrics['average'] < settings.RIGHTSIZING_CPU_THRESHOLD
+                        and memory_metrics['average'] < settings.RIGHTSIZING_CPU_THRESHOLD):
+                    current_type = instance['InstanceType']
+                    with phase('analysis'):
+                        recommended_type = self._suggest_instance_type(current_type, cpu_metrics, memory_metrics)
                     
-                    if recommended_class != current_class:
+                    if recommended_type != current_type:
                         recommendations.append({
                             'resource_id': instance_id,
-                            'resource_type': 'RDS',
-                            'current_config': current_class,
-                            'recommended_config': recommended_class,
-                            'reason': 'Low CPU utilization',
-                            'estimated_savings': await self._calculate_rds_savings(current_class, recommended_class),
+                            'resource_type': 'EC2',
+                            'region': region,
+                            'current_config': current_type,
+                            'recommended_config': recommended_type,
+                            'reason': 'Low utilization',
+                            'estimated_savings': await self._calculate_ec2_savings(current_type, recommended_type),
+                            'memory_data_available': memory_data_available,
                             'metrics': {
                                 'cpu_utilization': cpu_metrics,
-                                'storage_utilization': storage_metrics
+                                'memory_utilization': memory_metrics
                             }
                         })
 
+            return recommendations
+        except ClientError as e:
+            logger.error(f"Error analyzing EC2 instances: {str(e)}")
+            raise
+
+    async def _get_rds_recommendations(
+        self,
+        budget: Optional[ScanBudget] = None,
+        regions: Optional[List[str]] = None,
+        instance_ids: Optional[List[str]] = None
+    ) -> List[Dict]:
+        """Analyze RDS instances in every region for optimization opportunities.
+
+        Regions with the highest estimated spend go first, and within a region the most
+        expensive databases are fetched in the first metric batches. regions and
+        instance_ids restrict the scan when the work is split across workers.
+        """
+        try:
+            recommendations = []
+
+            inventory = {
+                region: self._list_db_instances(region, instance_ids)
+                for region in (regions or self._get_regions())
+            }
+            with phase('pricing'):
+                monthly_costs = {
+                    (region, instance['DBInstanceIdentifier']): rds_monthly_cost(instance['DBInstanceClass'], region)
+                    for region, instances in inventory.items() for instance in instances
+                }
+            regions = sorted(
+                (region for region in inventory if inventory[region]),
+                key=lambda region: -sum(monthly_costs[(region, i['DBInstanceIdentifier'])] for i in inventory[region])
+            )
+
+            for region in regions:
+                instances = sorted(
+                    inventory[region], key=lambda i: -monthly_costs[(region, i['DBInstanceIdentifier'])]
+                )
+
+                for start in range(0, len(instances), RDS_INSTANCES_PER_BATCH):
+                    batch = instances[start:start + RDS_INSTANCES_PER_BATCH]
+                    if budget is not None and budget.expired():
+                        for instance in batch:
+                            instance_id = instance['DBInstanceIdentifier']
+                            budget.add(instance_id, monthly_costs[(region, instance_id)], analyzed=False, resource_type='RDS')
+                        continue
+
+                    metric_data = await self._get_rds_metric_data(region, batch)
+
+                    for instance in batch:
+                        instance_id = instance['DBInstanceIdentifier']
+                        if budget is not None:
+                            budget.add(instance_id, monthly_costs[(region, instance_id)], analyzed=True, resource_type='RDS')
+                        with phase('analysis'):
+                            recommendation = await self._analyze_db_instance(region, instance, metric_data)
+                        if recommendation is not None:
+                            recommendations.append(recommendation)
+
             return recommendations
         except ClientError as e:
             logger.error(f"Error analyzing RDS instances: {str(e)}")
             raise
 
-    async def _get_instance_cpu_metrics(self, instance_id: str) -> Dict:
+    async def _analyze_db_instance(self, region: str, instance: Dict, metric_data: Dict[str, Dict]) -> Optional[Dict]:
+        """Build a recommendation for a DB instance from its batched metrics, if it has one."""
+        instance_id = instance['DBInstanceIdentifier']
+        current_class = instance['DBInstanceClass']
+
+        cpu_metrics = self._get_rds_cpu_metrics(metric_data, instance_id)
+        storage_metrics = self._get_rds_storage_metrics(metric_data, instance)
+        connection_metrics = self._get_rds_connection_metrics(metric_data, instance_id)
+        metrics = {
+            'cpu_utilization': cpu_metrics,
+            'storage_utilization': storage_metrics,
+            'connections': connection_metrics
+        }
+
+        if connection_metrics['datapoints'] and connection_metrics['maximum'] == 0:
+            return {
+                'resource_id': instance_id,
+                'resource_type': 'RDS',
+                'region': region,
+                'current_config': current_class,
+                'recommended_config': 'stopped',
+                'reason': 'No database connections in the last 7 days',
+                'estimated_savings': await self._calculate_rds_savings(current_class, None),
+                'metrics': metrics
+            }
+
+        if cpu_metrics['datapoints'] and cpu_metrics['average'] < settings.RIGHTSIZING_CPU_THRESHOLD:
+            recommended_class = self._suggest_rds_class(current_class, cpu_metrics)
+
+            if recommended_class != current_class:
+                return {
+                    'resource_id': instance_id,
+                    'resource_type': 'RDS',
+                    'region': region,
+                    'current_config': current_class,
+                    'recommended_config': recommended_class,
+                    'reason': 'Low CPU utilization',
+                    'estimated_savings': await self._calculate_rds_savings(current_class, recommended_class),
+                    'metrics': metrics
+                }
+
+        return None
+
+    def _list_instances(self, region: str, instance_ids: Optional[List[str]] = None) -> List[Dict]:
+        """List the EC2 instances in a region, or only the given ones, following pagination."""
+        paginator = self._regional_client('ec2', region).get_paginator('describe_instances')
+        instances = []
+        with phase('inventory'):
+            for request in _id_filters('instance-id', instance_ids):
+                for page in paginator.paginate(**request):
+                    for reservation in page['Reservations']:
+                        instances.extend(reservation['Instances'])
+        return instances
+
+    def _list_db_instances(self, region: str, instance_ids: Optional[List[str]] = None) -> List[Dict]:
+        """List the available DB instances in a region, or only the given ones, following pagination."""
+        paginator = self._regional_client('rds', region).get_paginator('describe_db_instances')
+        instances = []
+        with phase('inventory'):
+            for request in _id_filters('db-instance-id', instance_ids):
+                for page in paginator.paginate(**request):
+                    instances.extend(
+                        instance for instance in page['DBInstances']
+                        if instance.get('DBInstanceStatus') == 'available'
+                    )
+        return instances
+
+    async def _get_rds_metric_data(self, region: str, instances: List[Dict]) -> Dict[str, Dict]:
+        """Fetch CPU, free storage and connection metrics for all DB instances in a region.
+
+        Returns a mapping of DB instance identifier to metric name to list of values.
+        """
+        queries = []
+        query_index = {}
+        for instance in instances:
+            instance_id = instance['DBInstanceIdentifier']
+            for metric_name, stat in (
+                ('CPUUtilization', 'Average'),
+                ('CPUUtilization', 'Maximum'),
+                ('FreeStorageSpace', 'Minimum'),
+                ('DatabaseConnections', 'Maximum'),
+            ):
+                query_id = f"q{len(queries)}"
+                query_index[query_id] = (instance_id, f"{metric_name}:{stat}")
+                queries.append({
+                    'Id': query_id,
+                    'MetricStat': {
+                        'Metric': {
+                            'Namespace': 'AWS/RDS',
+                            'MetricName': metric_name,
+                            'Dimensions': [{'Name': 'DBInstanceIdentifier', 'Value': instance_id}]
+                        },
+                        'Period': 3600,
+                        'Stat': stat
+                    },
+                    'ReturnData': True
+                })
+
+        end_time = datetime.utcnow()
+        start_time = end_time - timedelta(days=7)
+        results = await self._get_metric_data(
+            self._regional_client('cloudwatch', region), queries, start_time, end_time
+        )
+
+        metric_data: Dict[str, Dict] = {}
+        for query_id, (instance_id, metric_key) in query_index.items():
+            result = results.get(query_id, {'timestamps': [], 'values': []})
+            metric_data.setdefault(instance_id, {})[metric_key] = result['values']
+            if metric_key == 'CPUUtilization:Average':
+                self.utilization_store.record(instance_id, 'cpu', result['timestamps'], result['values'])
+
+        for instance in instances:
+            self.utilization_store.set_resource(
+                instance['DBInstanceIdentifier'], 'RDS', rds_monthly_cost(instance['DBInstanceClass'], region)
+            )
+        return metric_data
+
+    async def _get_metric_data(self, cloudwatch, queries: List[Dict], start_time: datetime, end_time: datetime) -> Dict[str, Dict]:
+        """Run GetMetricData in batches of up to 500 queries.
+
+        Returns a mapping of query id to its timestamps and values.
+        """
+        results: Dict[str, Dict] = {}
+        paginator = cloudwatch.get_paginator('get_metric_data')
+        for i in range(0, len(queries), METRIC_DATA_BATCH_SIZE):
+            pages = paginator.paginate(
+                MetricDataQueries=queries[i:i + METRIC_DATA_BATCH_SIZE],
+                StartTime=start_time,
+                EndTime=end_time,
+                ScanBy='TimestampAscending'
+            )
+            with phase('metrics'):
+                for page in pages:
+                    for result in page['MetricDataResults']:
+                        entry = results.setdefault(result['Id'], {'timestamps': [], 'values': []})
+                        entry['timestamps'].extend(result['Timestamps'])
+                        entry['values'].extend(result['Values'])
+        return results
+
+    def _get_rds_cpu_metrics(self, metric_data: Dict[str, Dict], instance_id: str) -> Dict:
+        """Get CPU utilization metrics for a DB instance from batched metric data.
+
+        datapoints is 0 for instances without CPU data (new, stopped or not reporting),
+        whose zero average must not be read as idle.
+        """
+        instance_data = metric_data.get(instance_id, {})
+        averages = instance_data.get('CPUUtilization:Average', [])
+        maximums = instance_data.get('CPUUtilization:Maximum', [])
+        if not averages:
+            return {'average': 0, 'maximum': 0, 'datapoints': 0}
+
+        return {
+            'average': sum(averages) / len(averages),
+            'maximum': max(maximums) if maximums else max(averages),
+            'datapoints': len(averages)
+        }
+
+    def _get_rds_storage_metrics(self, metric_data: Dict[str, Dict], instance: Dict) -> Dict:
+        """Get storage utilization metrics for a DB instance from batched metric data."""
+        allocated_gb = float(instance.get('AllocatedStorage', 0))
+        free_bytes = metric_data.get(instance['DBInstanceIdentifier'], {}).get('FreeStorageSpace:Minimum', [])
+        if not free_bytes or not allocated_gb:
+            return {'allocated_gb': allocated_gb, 'free_gb': 0, 'used_percent': 0}
+
+        free_gb = min(free_bytes) / 1024 ** 3
+        return {
+            'allocated_gb': allocated_gb,
+            'free_gb': round(free_gb, 2),
+            'used_percent': round(max(0.0, 100 * (1 - free_gb / allocated_gb)), 2)
+        }
+
+    def _get_rds_connection_metrics(self, metric_data: Dict[str, Dict], instance_id: str) -> Dict:
+        """Get database connection metrics for a DB instance from batched metric data."""
+        connections = metric_data.get(instance_id, {}).get('DatabaseConnections:Maximum', [])
+        return {
+            'maximum': max(connections) if connections else 0,
+            'datapoints': len(connections)
+        }
+
+    def _suggest_rds_class(self, current_class: str, cpu_metrics: Dict) -> str:
+        """Suggest a DB instance class based on CPU utilization."""
+        parts = split_rds_class(current_class)
+        if parts is None or parts[0] not in RDS_INSTANCE_CLASSES:
+            return current_class
+
+        family, size = parts
+        sizes = RDS_INSTANCE_CLASSES[family]
+        if size not in sizes:
+            return current_class
+        current_index = sizes.index(size)
+
+        # Halving the instance roughly doubles CPU, so only step down when the peak leaves headroom
+        if cpu_metrics['maximum'] < settings.RIGHTSIZING_PEAK_THRESHOLD and current_index > 0:
+            return f"{family}.{sizes[current_index - 1]}"
+
+        return current_class
+
+    async def _calculate_rds_savings(self, current_class: str, recommended_class: Optional[str]) -> float:
+        """Calculate estimated monthly savings from a DB class change, or from stopping it if no class is given."""
+        current_price = RDS_HOURLY_PRICING.get(current_class, 0)
+        recommended_price = RDS_HOURLY_PRICING.get(recommended_class, 0) if recommended_class else 0
+
+        monthly_savings = (current_price - recommended_price) * HOURS_PER_MONTH
+
+        return round(monthly_savings, 2)
+
+    async def _get_commitment_recommendations(self) -> List[Dict]:
+        """Recommend Savings Plan commitments from hourly on-demand EC2 spend.
+
+        Results are cached for COMMITMENT_CACHE_TTL_SECONDS rather than recomputed per scan.
+        """
+        cached = self._commitment_recommendations.get('account')
+        if cached is not None:
+            return cached
+        try:
+            keys, hourly_spend = await self._get_hourly_on_demand_spend(settings.COMMITMENT_LOOKBACK_DAYS)
+        except ClientError as e:
+            # Hourly granularity must be enabled in the Cost Explorer preferences
+            logger.warning(f"Skipping commitment analysis: {str(e)}")
+            return []
+
+        recommendations = []
+        with phase('analysis'):
+            results = CommitmentOptimizer(settings.COMMITMENT_TERM).optimize(keys, hourly_spend)
+        for result in results:
+            if result['annual_savings'] <= 0:
+                continue
+            if result['key'] is None:
+                # Compute Savings Plans cover every family and region
+                resource_id, region = 'account', None
+            else:
+                family, region = result['key']
+                resource_id = f"{family}/{region}"
+            recommendations.append({
+                'resource_id': resource_id,
+                'resource_type': 'Commitment',
+                'region': region,
+                'current_config': 'On-Demand',
+                'recommended_config': f"{result['offering']} ${result['hourly_commitment']:.4f}/hour",
+                'reason': (
+                    f"{result['utilization']:.0%} expected utilization covering "
+                    f"{result['coverage']:.0%} of on-demand spend"
+                ),
+                'estimated_savings': round(result['annual_savings'] / 12, 2),
+                'metrics': {
+                    'cpu_utilization': {},
+                    'commitment': {
+                        'hourly_commitment': result['hourly_commitment'],
+                        'covered_on_demand_per_hour': result['covered_on_demand_per_hour'],
+                        'annual_on_demand_spend': result['annual_on_demand_spend'],
+                        'annual_savings': result['annual_savings'],
+                        'utilization': result['utilization'],
+                        'coverage': result['coverage']
+                    }
+                }
+            })
+
+        self._commitment_recommendations.set('account', recommendations)
+        return recommendations
+
+    async def _get_hourly_on_demand_spend(self, days: int) -> tuple:
+        """Get hourly on-demand EC2 spend per instance family and region from Cost Explorer.
+
+        Returns the (family, region) keys and a matrix with one row per key and one column per hour.
+        """
+        end_time = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        start_time = end_time - timedelta(days=days)
+        hours = int((end_time - start_time).total_seconds() // 3600)
+
+        series: Dict[tuple, np.ndarray] = {}
+        request = {
+            'TimePeriod': {
+                'Start': start_time.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'End': end_time.strftime('%Y-%m-%dT%H:%M:%SZ')
+            },
+            'Granularity': 'HOURLY',
+            'Metrics': ['UnblendedCost'],
+            'Filter': {'And': [
+                {'Dimensions': {'Key': 'SERVICE', 'Values': ['Amazon Elastic Compute Cloud - Compute']}},
+                {'Dimensions': {'Key': 'PURCHASE_TYPE', 'Values': ['On Demand Instances']}}
+            ]},
+            'GroupBy': [
+                {'Type': 'DIMENSION', 'Key': 'INSTANCE_TYPE_FAMILY'},
+                {'Type': 'DIMENSION', 'Key': 'REGION'}
+            ]
+        }
+        while True:
+            with phase('cost_explorer'):
+                response = self.cost_explorer.get_cost_and_usage(**request)
+            for result in response['ResultsByTime']:
+                period_start = datetime.strptime(result['TimePeriod']['Start'], '%Y-%m-%dT%H:%M:%SZ')
+                hour = int((period_start - start_time).total_seconds() // 3600)
+                if not 0 <= hour < hours:
+                    continue
+                for group in result['Groups']:
+                    key = tuple(group['Keys'])
+                    if key not in series:
+                        series[key] = np.zeros(hours)
+                    series[key][hour] += float(group['Metrics']['UnblendedCost']['Amount'])
+
+            if not response.get('NextPageToken'):
+                break
+            request['NextPageToken'] = response['NextPageToken']
+
+        keys = sorted(series)
+        matrix = np.vstack([series[key] for key in keys]) if keys else np.zeros((0, hours))
+        return keys, matrix
+
+    async def _get_instance_cpu_metrics(self, instance_id: str, region: Optional[str] = None) -> Dict:
         """Get CPU utilization metrics for an EC2 instance."""
         end_time = datetime.utcnow()
         start_time = end_time - timedelta(days=7)
+        cloudwatch = self.cloudwatch if region is None else self._regional_client('cloudwatch', region)
         
-        response = self.cloudwatch.get_metric_statistics(
-            Namespace='AWS/EC2',
-            MetricName='CPUUtilization',
-            Dimensions=[{'Name': 'InstanceId', 'Value': instance_id}],
-            StartTime=start_time,
-            EndTime=end_time,
-            Period=3600,
-            Statistics=['Average', 'Maximum']
-        )
+        with phase('metrics'):
+            response = cloudwatch.get_metric_statistics(
+                Namespace='AWS/EC2',
+                MetricName='CPUUtilization',
+                Dimensions=[{'Name': 'InstanceId', 'Value': instance_id}],
+                StartTime=start_time,
+                EndTime=end_time,
+                Period=3600,
+                Statistics=['Average', 'Maximum']
+            )
         
         datapoints = response['Datapoints']
+        self.utilization_store.record(
+            instance_id, 'cpu', [d['Timestamp'] for d in datapoints], [d['Average'] for d in datapoints]
+        )
         if not datapoints:
             return {'average': 0, 'maximum': 0}
             
@@ -148,24 +1009,38 @@ class AWSService:
             'maximum': max(d['Maximum'] for d in datapoints)
         }
 
-    async def _get_instance_memory_metrics(self, instance_id: str) -> Dict:
-        """Get memory utilization metrics for an EC2 instance."""
+    async def _get_instance_memory_metrics(
+        self,
+        instance_id: str,
+        dimensions: Optional[List[Dict]] = None,
+        region: Optional[str] = None
+    ) -> Dict:
+        """Get memory utilization metrics for an EC2 instance.
+
+        Pass the dimensions discovered by ListMetrics: the CloudWatch agent often publishes
+        mem_used_percent with extra dimensions such as ImageId and InstanceType.
+        """
         # Note: This requires CloudWatch agent to be installed on the instance
         end_time = datetime.utcnow()
         start_time = end_time - timedelta(days=7)
+        cloudwatch = self.cloudwatch if region is None else self._regional_client('cloudwatch', region)
         
         try:
-            response = self.cloudwatch.get_metric_statistics(
-                Namespace='CWAgent',
-                MetricName='mem_used_percent',
-                Dimensions=[{'Name': 'InstanceId', 'Value': instance_id}],
-                StartTime=start_time,
-                EndTime=end_time,
-                Period=3600,
-                Statistics=['Average', 'Maximum']
-            )
+            with phase('metrics'):
+                response = cloudwatch.get_metric_statistics(
+                    Namespace='CWAgent',
+                    MetricName='mem_used_percent',
+                    Dimensions=dimensions or [{'Name': 'InstanceId', 'Value': instance_id}],
+                    StartTime=start_time,
+                    EndTime=end_time,
+                    Period=3600,
+                    Statistics=['Average', 'Maximum']
+                )
             
             datapoints = response['Datapoints']
+            self.utilization_store.record(
+                instance_id, 'memory', [d['Timestamp'] for d in datapoints], [d['Average'] for d in datapoints]
+            )
             if not datapoints:
                 return {'average': 0, 'maximum': 0}
                 
@@ -199,7 +1074,8 @@ class AWSService:
         current_index = sizes.index(current_size)
         
         # If utilization is very low, suggest going down one size
-        if cpu_metrics['maximum'] < 50 and memory_metrics['maximum'] < 50 and current_index > 0:
+        if (cpu_metrics['maximum'] < settings.RIGHTSIZING_PEAK_THRESHOLD
+                and memory_metrics['maximum'] < settings.RIGHTSIZING_PEAK_THRESHOLD and current_index > 0):
             return f"{current_family}.{sizes[current_index - 1]}"
             
         return current_type
@@ -212,20 +1088,10 @@ class AWSService:
         # 3. Account for regional price differences
         # 4. Include potential savings from reduced EBS costs
         
-        # Placeholder pricing dictionary (USD per hour)
-        pricing = {
-            't3.micro': 0.0104,
-            't3.small': 0.0208,
-            't3.medium': 0.0416,
-            't3.large': 0.0832,
-            't3.xlarge': 0.1664,
-            't3.2xlarge': 0.3328
-        }
-        
-        current_price = pricing.get(current_type, 0)
-        recommended_price = pricing.get(recommended_type, 0)
+        current_price = EC2_HOURLY_PRICING.get(current_type, 0)
+        recommended_price = EC2_HOURLY_PRICING.get(recommended_type, 0)
         
         # Calculate monthly savings (assuming 730 hours per month)
-        monthly_savings = (current_price - recommended_price) * 730
+        monthly_savings = (current_price - recommended_price) * HOURS_PER_MONTH
         
         return round(monthly_savings, 2)
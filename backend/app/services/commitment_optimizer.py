@@ -0,0 +1,135 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+HOURS_PER_YEAR = 8760
+
+# Average effective discount versus on-demand for no-upfront commitments, by term.
+# Override per deployment when negotiated rates differ.
+COMMITMENT_OFFERINGS = {
+    '1yr': {'compute_savings_plan': 0.27, 'ec2_instance_savings_plan': 0.37},
+    '3yr': {'compute_savings_plan': 0.48, 'ec2_instance_savings_plan': 0.58},
+}
+
+# Rows of the spend matrix processed at a time; bounds memory to a few tens of MB
+# regardless of how many family/region pairs are optimized.
+CHUNK_ROWS = 64
+
+
+def _best_commitment(spend: np.ndarray, rate: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Sweep every observed hourly spend level of each row as a commitment billed at rate.
+
+    Sorting each row once turns the cost of every candidate into prefix/suffix sums, so a
+    row is evaluated in O(H log H). Returns per row the best level (on-demand spend covered
+    per hour, 0 when nothing saves money), its savings and the on-demand spend it covers.
+    """
+    rows, hours = spend.shape
+    levels = np.sort(spend, axis=1)
+    total = levels.sum(axis=1)
+    # prefix[:, i] = sum of the i smallest hours, suffix[:, i] = sum of the rest
+    prefix = np.concatenate([np.zeros((rows, 1)), np.cumsum(levels, axis=1)[:, :-1]], axis=1)
+    suffix = total[:, None] - prefix
+    hours_above = hours - np.arange(hours)
+
+    # On-demand spend not covered when committing to cover `levels[:, i]` per hour
+    overflow = suffix - levels * hours_above
+    savings = total[:, None] - (hours * rate * levels + overflow)
+
+    row_ids = np.arange(rows)
+    index = savings.argmax(axis=1)
+    best = savings[row_ids, index]
+    saves = best > 0
+    level = np.where(saves, levels[row_ids, index], 0.0)
+    covered = np.where(saves, prefix[row_ids, index] + levels[row_ids, index] * hours_above[index], 0.0)
+    return level, np.where(saves, best, 0.0), covered
+
+
+class CommitmentOptimizer:
+    """Find the savings-maximizing Savings Plan commitments of one term for hourly on-demand spend.
+
+    Spend is a matrix with one row per family/region pair and one column per hour. An EC2
+    Instance Savings Plan only applies to its family and region, so it is sized per row; a
+    Compute Savings Plan applies to EC2 usage anywhere in the account, so it is sized against
+    account-wide hourly spend. Two plans are compared: EC2 Instance Savings Plans per row with
+    a Compute Savings Plan over the spend they leave uncovered (the order AWS applies them in),
+    and a Compute Savings Plan alone. Terms aren't compared, since a 3-year plan always
+    discounts more; the term is the buyer's choice.
+    """
+
+    def __init__(self, term: str = '1yr', offerings: Optional[Dict[str, float]] = None):
+        if offerings is None:
+            if term not in COMMITMENT_OFFERINGS:
+                raise ValueError(f"Unknown commitment term: {term}; use {', '.join(COMMITMENT_OFFERINGS)}")
+            offerings = COMMITMENT_OFFERINGS[term]
+        self.term = term
+        self.offerings = offerings
+
+    def optimize(self, keys: Sequence[tuple], hourly_spend: np.ndarray) -> List[Dict]:
+        """Get the commitments to buy for an hourly on-demand spend matrix.
+
+        Returns one result per commitment, with its key (None for an account-wide Compute
+        Savings Plan), the hourly commitment, the on-demand spend it covers, annualized
+        savings, expected utilization and coverage. Keys where no commitment saves money
+        are left out.
+        """
+        spend = np.asarray(hourly_spend, dtype=np.float64)
+        if spend.ndim != 2 or spend.shape[0] != len(keys):
+            raise ValueError("hourly_spend must be a 2-D array with one row per key")
+        rows, hours = spend.shape
+        if not rows or not hours:
+            return []
+        instance_rate = 1 - self.offerings['ec2_instance_savings_plan']
+        compute_rate = 1 - self.offerings['compute_savings_plan']
+
+        account = np.zeros(hours)
+        residual = np.zeros(hours)
+        parts = []
+        for start in range(0, rows, CHUNK_ROWS):
+            chunk = np.nan_to_num(np.clip(spend[start:start + CHUNK_ROWS], 0, None))
+            level, savings, covered = _best_commitment(chunk, instance_rate)
+            account += chunk.sum(axis=0)
+            residual += np.clip(chunk - level[:, None], 0, None).sum(axis=0)
+            parts.append((level, savings, covered, chunk.sum(axis=1)))
+        level, savings, covered, totals = (np.concatenate(columns) for columns in zip(*parts))
+
+        layered = _best_commitment(residual[None, :], compute_rate)
+        compute_only = _best_commitment(account[None, :], compute_rate)
+        annualize = HOURS_PER_YEAR / hours
+        account_total = account.sum()
+
+        results = []
+        # On a tie the Compute Savings Plan wins, since it also covers future family and region changes
+        if compute_only[1][0] >= savings.sum() + layered[1][0]:
+            compute = compute_only
+        else:
+            compute = layered
+            for row in np.flatnonzero(savings > 0):
+                results.append(self._result(
+                    keys[row], 'ec2_instance_savings_plan', level[row], savings[row], covered[row], totals[row], hours, annualize
+                ))
+        if compute[1][0] > 0:
+            results.append(self._result(
+                None, 'compute_savings_plan', compute[0][0], compute[1][0], compute[2][0], account_total, hours, annualize
+            ))
+        return results
+
+    def _result(
+        self,
+        key: Optional[tuple],
+        offering: str,
+        level: float,
+        savings: float,
+        covered: float,
+        total: float,
+        hours: int,
+        annualize: float
+    ) -> Dict:
+        return {
+            'key': key,
+            'offering': f"{offering}_{self.term}",
+            'hourly_commitment': round(float(level * (1 - self.offerings[offering])), 4),
+            'covered_on_demand_per_hour': round(float(level), 4),
+            'annual_on_demand_spend': round(float(total * annualize), 2),
+            'annual_savings': round(float(savings * annualize), 2),
+            'utilization': round(float(covered / (level * hours)), 4),
+            'coverage': round(float(covered / total), 4) if total else 0.0,
+        }
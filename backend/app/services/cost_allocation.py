@@ -0,0 +1,166 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+
+# Filter value matching any resource that has the tag key, whatever its value
+ANY_VALUE = '*'
+# Group label for resources missing a tag key
+UNTAGGED = 'untagged'
+
+
+class CostAllocationIndex:
+    """Per-resource costs joined with resource tags, for local cost breakdowns by any tag.
+
+    Each tag key is stored as a dictionary-encoded column: an int32 code per resource
+    (-1 when the resource lacks the key) plus the key's distinct values. That column is
+    the inverted index: the resource bitmap of any key/value pair is one vectorized
+    comparison, filters are ANDed bitmaps, and group-bys over any combination of keys
+    are a single bincount weighted by cost. Nothing here calls a cloud API.
+
+    Spend that Cost Explorer doesn't attribute to a resource (support, some data
+    transfer, tax) is kept as `unattributed` and reported by untagged().
+    """
+
+    def __init__(
+        self,
+        costs: Dict[str, float],
+        tags: Dict[str, Dict[str, str]],
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        unattributed: float = 0.0,
+        source: str = 'cost_explorer'
+    ):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.source = source
+        self.unattributed = float(unattributed)
+        self.resource_ids = np.array(sorted(costs), dtype=object)
+        self.costs = np.array([costs[rid] for rid in self.resource_ids], dtype=np.float64)
+
+        self.values: Dict[str, List[str]] = {}
+        self.columns: Dict[str, np.ndarray] = {}
+        value_codes: Dict[str, Dict[str, int]] = {}
+        for position, resource_id in enumerate(self.resource_ids):
+            for key, value in tags.get(resource_id, {}).items():
+                codes = value_codes.setdefault(key, {})
+                if key not in self.columns:
+                    self.columns[key] = np.full(len(self.resource_ids), -1, dtype=np.int32)
+                    self.values[key] = []
+                code = codes.get(value)
+                if code is None:
+                    code = codes[value] = len(self.values[key])
+                    self.values[key].append(value)
+                self.columns[key][position] = code
+        self._codes = value_codes
+
+    def __len__(self) -> int:
+        return len(self.resource_ids)
+
+    @property
+    def total_cost(self) -> float:
+        return float(self.costs.sum()) + self.unattributed
+
+    def tag_keys(self) -> List[str]:
+        return sorted(self.columns)
+
+    def bitmap(self, key: str, value: Optional[str] = ANY_VALUE) -> np.ndarray:
+        """Resources with a tag value; ANY_VALUE matches any value and None matches a missing key."""
+        column = self.columns.get(key)
+        if column is None:
+            return np.full(len(self), value is None)
+        if value is None:
+            return column < 0
+        if value == ANY_VALUE:
+            return column >= 0
+        code = self._codes[key].get(value)
+        if code is None:
+            return np.zeros(len(self), dtype=bool)
+        return column == code
+
+    def mask(self, filters: Optional[Dict[str, Optional[str]]] = None) -> np.ndarray:
+        """AND together the bitmaps of every key/value filter."""
+        selected = np.ones(len(self), dtype=bool)
+        for key, value in (filters or {}).items():
+            selected &= self.bitmap(key, value)
+        return selected
+
+    def breakdown(
+        self,
+        group_by: Sequence[str],
+        filters: Optional[Dict[str, Optional[str]]] = None
+    ) -> List[Dict]:
+        """Cost and resource count per combination of tag values, most expensive first.
+
+        A missing tag shows up as None in the group's tags.
+        """
+        selected = self.mask(filters)
+        if not group_by:
+            return [{'tags': {}, 'cost': round(float(self.costs[selected].sum()), 2), 'resources': int(selected.sum())}]
+
+        # Mixed-radix group id from each key's code, shifted so a missing tag is 0
+        group_ids = np.zeros(len(self), dtype=np.int64)
+        for key in group_by:
+            cardinality = len(self.values.get(key, [])) + 1
+            column = self.columns.get(key)
+            codes = column + 1 if column is not None else np.zeros(len(self), dtype=np.int32)
+            group_ids = group_ids * cardinality + codes
+        groups, inverse = np.unique(group_ids[selected], return_inverse=True)
+        costs = np.bincount(inverse, weights=self.costs[selected], minlength=len(groups))
+        counts = np.bincount(inverse, minlength=len(groups))
+
+        results = []
+        for group, cost, count in zip(groups, costs, counts):
+            labels = {}
+            for key in reversed(group_by):
+                cardinality = len(self.values.get(key, [])) + 1
+                group, code = divmod(int(group), cardinality)
+                labels[key] = self.values[key][code - 1] if code else None
+            results.append({
+                'tags': {key: labels[key] for key in group_by},
+                'cost': round(float(cost), 2),
+                'resources': int(count),
+            })
+        results.sort(key=lambda item: -item['cost'])
+        return results
+
+    def by_tag(self, key: str) -> Dict[str, float]:
+        """Cost per value of one tag key, with resources missing it under UNTAGGED."""
+        return {
+            (group['tags'][key] if group['tags'][key] is not None else UNTAGGED): group['cost']
+            for group in self.breakdown([key])
+        }
+
+    def untagged(self, keys: Sequence[str], top: int = 20) -> Dict:
+        """Spend on resources missing any of the given tag keys, with the most expensive of them."""
+        missing = np.zeros(len(self), dtype=bool)
+        for key in keys:
+            missing |= self.bitmap(key, None)
+        cost = float(self.costs[missing].sum())
+        total = self.total_cost
+        order = np.argsort(-self.costs[missing], kind='stable')[:top]
+        return {
+            'keys': list(keys),
+            'cost': round(cost, 2),
+            'resources': int(missing.sum()),
+            'unattributed_cost': round(self.unattributed, 2),
+            'fraction_of_spend': round((cost + self.unattributed) / total, 4) if total else 0.0,
+            'top_resources': [
+                {'resource_id': str(rid), 'cost': round(float(c), 2)}
+                for rid, c in zip(self.resource_ids[missing][order], self.costs[missing][order])
+            ],
+        }
+
+    def allocate(self, rules: Sequence[Dict], default: str = 'unallocated') -> Dict[str, float]:
+        """Map spend to cost centers with ordered rules; the first rule a resource matches wins.
+
+        Each rule is {'name': 'platform', 'match': {'team': 'infra', 'env': '*'}}. Resources
+        matching no rule, and unattributed spend, go to the default cost center.
+        """
+        remaining = np.ones(len(self), dtype=bool)
+        allocation: Dict[str, float] = {}
+        for rule in rules:
+            matched = remaining & self.mask(rule.get('match', {}))
+            allocation[rule['name']] = allocation.get(rule['name'], 0.0) + float(self.costs[matched].sum())
+            remaining &= ~matched
+        allocation[default] = allocation.get(default, 0.0) + float(self.costs[remaining].sum()) + self.unattributed
+        return {name: round(cost, 2) for name, cost in allocation.items()}
@@ -0,0 +1,470 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import Dict, Iterator, List, Optional, Tuple
+import gzip
+import logging
+import os
+
+import numpy as np
+
+# Optional: only needed to analyze VPC flow logs
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+
+from app.services.pricing import DATA_TRANSFER_PRICING, HOURS_PER_MONTH
+
+logger = logging.getLogger(__name__)
+
+# Version 2 fields, for files delivered without a header line
+DEFAULT_FIELDS = (
+    'version', 'account-id', 'interface-id', 'srcaddr', 'dstaddr', 'srcport', 'dstport',
+    'protocol', 'packets', 'bytes', 'start', 'end', 'action', 'log-status',
+)
+REQUIRED_FIELDS = ('interface-id', 'srcaddr', 'dstaddr', 'bytes')
+
+# Flow classes, by code; the code order is also the order they are reported in
+FLOW_CLASSES = ('intra_az', 'cross_az', 'cross_region', 'internet', 'unknown')
+INTRA_AZ, CROSS_AZ, CROSS_REGION, INTERNET, UNKNOWN = range(len(FLOW_CLASSES))
+# Destination codes for flows that don't end at an indexed location
+INTERNET_LOCATION = -2
+UNKNOWN_LOCATION = -1
+
+# Non-routable IPv4 ranges; unindexed destinations in them are unknown rather than internet
+PRIVATE_RANGES = (
+    ('10.0.0.0', 8),
+    ('172.16.0.0', 12),
+    ('192.168.0.0', 16),
+    ('100.64.0.0', 10),
+    ('169.254.0.0', 16),
+)
+
+CSV_BLOCK_BYTES = 64 * 2**20
+BYTES_PER_GB = 1024 ** 3
+
+
+def _ipv4_int(address: str) -> int:
+    a, b, c, d = (int(part) for part in address.split('.'))
+    return (a << 24) | (b << 16) | (c << 8) | d
+
+
+def _cidr_range(cidr: str) -> Tuple[int, int]:
+    address, bits = cidr.split('/')
+    start = _ipv4_int(address)
+    return start, start + (1 << (32 - int(bits))) - 1
+
+
+_PRIVATE_STARTS = np.array([_ipv4_int(address) for address, _ in PRIVATE_RANGES], dtype=np.int64)
+_PRIVATE_MASKS = np.array([(0xFFFFFFFF << (32 - bits)) & 0xFFFFFFFF for _, bits in PRIVATE_RANGES], dtype=np.int64)
+
+
+def _ipv4_ints(addresses) -> Tuple[np.ndarray, np.ndarray]:
+    """Convert an Arrow string array of addresses to integers, with a mask of valid IPv4 ones.
+
+    IPv6 addresses (and nulls) are invalid and come back as 0.
+    """
+    addresses = addresses.combine_chunks() if isinstance(addresses, pa.ChunkedArray) else addresses
+    parts = pc.split_pattern(pc.fill_null(addresses, ''), '.')
+    valid = pc.equal(pc.list_value_length(parts), 4)
+    ints = np.zeros(len(addresses), dtype=np.int64)
+    valid_mask = valid.to_numpy(zero_copy_only=False)
+    if valid_mask.any():
+        octets = pc.list_flatten(parts.filter(valid)).cast(pa.int64()).to_numpy().reshape(-1, 4)
+        ints[valid_mask] = octets @ np.array([1 << 24, 1 << 16, 1 << 8, 1], dtype=np.int64)
+    return ints, valid_mask
+
+
+def _is_private(ips: np.ndarray) -> np.ndarray:
+    return ((ips[:, None] & _PRIVATE_MASKS) == _PRIVATE_STARTS).any(axis=1)
+
+
+def _lookup_exact(keys: np.ndarray, locations: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """Location of each query key in a sorted key array, or -1."""
+    if not len(keys):
+        return np.full(len(query), -1, dtype=np.int64)
+    positions = np.minimum(np.searchsorted(keys, query), len(keys) - 1)
+    return np.where(keys[positions] == query, locations[positions], -1)
+
+
+def _lookup_range(starts: np.ndarray, ends: np.ndarray, locations: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """Location of the range (sorted by start) containing each query, or -1."""
+    if not len(starts):
+        return np.full(len(query), -1, dtype=np.int64)
+    positions = np.searchsorted(starts, query, side='right') - 1
+    clipped = np.maximum(positions, 0)
+    return np.where((positions >= 0) & (query <= ends[clipped]), locations[clipped], -1)
+
+
+class FlowLogIndex:
+    """Where every IP address of a fleet lives, for classifying flow log records.
+
+    Locations are network interfaces (with the resource they belong to) and subnets,
+    each with a VPC, availability zone and region. Lookups are vectorized binary
+    searches over sorted int64 keys: first the interface IPs of the recording
+    interface's VPC, then its subnet CIDRs, then any VPC (peering, transit gateways)
+    and the fleet's public IPs. Private IPs repeat across VPCs, which is why the VPC of
+    the interface that recorded a flow is part of the key.
+    """
+
+    def __init__(self):
+        # {'resource_id', 'interface_id', 'subnet_id', 'vpc_id', 'az', 'region'}
+        self.locations: List[Dict] = []
+        self._interfaces: Dict[str, int] = {}
+        self._vpcs: Dict[str, int] = {}
+        self._private: List[Tuple[int, int, int]] = []
+        self._public: List[Tuple[int, int]] = []
+        self._subnets: List[Tuple[int, int, int, int]] = []
+
+    def __len__(self) -> int:
+        return len(self.locations)
+
+    def _vpc_code(self, vpc_id: str) -> int:
+        return self._vpcs.setdefault(vpc_id, len(self._vpcs))
+
+    def _add_location(self, **location) -> int:
+        self.locations.append(location)
+        return len(self.locations) - 1
+
+    def add_interface(self, interface: Dict, region: str) -> None:
+        """Index a network interface from DescribeNetworkInterfaces."""
+        vpc = self._vpc_code(interface.get('VpcId', ''))
+        location = self._add_location(
+            resource_id=(
+                interface.get('Attachment', {}).get('InstanceId')
+                or interface.get('Description')
+                or interface['NetworkInterfaceId']
+            ),
+            interface_id=interface['NetworkInterfaceId'],
+            subnet_id=interface.get('SubnetId'),
+            vpc_id=interface.get('VpcId'),
+            az=interface.get('AvailabilityZone'),
+            region=region,
+        )
+        self._interfaces[interface['NetworkInterfaceId']] = location
+        for address in interface.get('PrivateIpAddresses', []):
+            self._private.append((vpc, _ipv4_int(address['PrivateIpAddress']), location))
+            public_ip = address.get('Association', {}).get('PublicIp')
+            if public_ip:
+                self._public.append((_ipv4_int(public_ip), location))
+
+    def add_subnet(self, subnet: Dict, region: str) -> None:
+        """Index a subnet from DescribeSubnets, for addresses no indexed interface holds."""
+        start, end = _cidr_range(subnet['CidrBlock'])
+        location = self._add_location(
+            resource_id=subnet['SubnetId'],
+            interface_id=None,
+            subnet_id=subnet['SubnetId'],
+            vpc_id=subnet.get('VpcId'),
+            az=subnet.get('AvailabilityZone'),
+            region=region,
+        )
+        self._subnets.append((self._vpc_code(subnet.get('VpcId', '')), start, end, location))
+
+    def compile(self) -> 'FlowLogIndex':
+        """Build the sorted lookup arrays; call after adding every interface and subnet."""
+        regions: Dict[str, int] = {}
+        azs: Dict[str, int] = {}
+        self.location_vpc = np.array([self._vpcs.get(loc['vpc_id'] or '', -1) for loc in self.locations], dtype=np.int64)
+        self.location_region = np.array([regions.setdefault(loc['region'], len(regions)) for loc in self.locations], dtype=np.int64)
+        self.location_az = np.array([azs.setdefault(loc['az'], len(azs)) for loc in self.locations], dtype=np.int64)
+
+        private = np.array(sorted(self._private), dtype=np.int64).reshape(-1, 3)
+        self._private_keys = (private[:, 0] << 32) | private[:, 1]
+        self._private_locations = private[:, 2]
+        by_ip = private[np.lexsort((private[:, 0], private[:, 1]))]
+        self._any_private_ips, first = np.unique(by_ip[:, 1], return_index=True)
+        self._any_private_locations = by_ip[first, 2]
+
+        public = np.array(sorted(self._public), dtype=np.int64).reshape(-1, 2)
+        self._public_ips, first = np.unique(public[:, 0], return_index=True)
+        self._public_locations = public[first, 1]
+
+        subnets = np.array(sorted(self._subnets), dtype=np.int64).reshape(-1, 4)
+        self._subnet_starts = (subnets[:, 0] << 32) | subnets[:, 1]
+        self._subnet_ends = (subnets[:, 0] << 32) | subnets[:, 2]
+        self._subnet_locations = subnets[:, 3]
+        by_start = subnets[np.argsort(subnets[:, 1], kind='stable')]
+        self._any_subnet_starts = by_start[:, 1]
+        self._any_subnet_ends = by_start[:, 2]
+        self._any_subnet_locations = by_start[:, 3]
+        return self
+
+    def interface_locations(self, interface_ids: List[Optional[str]]) -> np.ndarray:
+        return np.array([self._interfaces.get(interface_id, -1) for interface_id in interface_ids], dtype=np.int64)
+
+    def locate(self, vpcs: np.ndarray, ips: np.ndarray) -> np.ndarray:
+        """Location of each IPv4 address as seen from a VPC (-1 for none), most specific first."""
+        keys = (vpcs << 32) | ips
+        found = _lookup_exact(self._private_keys, self._private_locations, keys)
+        for lookup in (
+            lambda query_keys, query_ips: _lookup_range(self._subnet_starts, self._subnet_ends, self._subnet_locations, query_keys),
+            lambda query_keys, query_ips: _lookup_exact(self._any_private_ips, self._any_private_locations, query_ips),
+            lambda query_keys, query_ips: _lookup_exact(self._public_ips, self._public_locations, query_ips),
+            lambda query_keys, query_ips: _lookup_range(self._any_subnet_starts, self._any_subnet_ends, self._any_subnet_locations, query_ips),
+        ):
+            missing = found < 0
+            if not missing.any():
+                break
+            found[missing] = lookup(keys[missing], ips[missing])
+        return found
+
+
+def find_flow_log_files(directory: str) -> List[str]:
+    """Find every gzipped flow log file (as delivered to S3) under a directory."""
+    return sorted(
+        os.path.join(root, name)
+        for root, _, files in os.walk(directory)
+        for name in files if name.endswith('.log.gz')
+    )
+
+
+def _read_header(path: str) -> Tuple[List[str], bool]:
+    """Get a file's field names, and whether its first line is a header naming them."""
+    with gzip.open(path, 'rt') as f:
+        first = f.readline().split()
+    if 'srcaddr' in first:
+        return first, True
+    return list(DEFAULT_FIELDS), False
+
+
+def _iter_batches(path: str) -> Iterator:
+    fields, has_header = _read_header(path)
+    missing = [field for field in REQUIRED_FIELDS if field not in fields]
+    if missing:
+        raise ValueError(f"Flow log {path} lacks fields {missing}")
+    columns = [field for field in REQUIRED_FIELDS + ('start', 'end', 'action') if field in fields]
+    reader = pa_csv.open_csv(
+        path,
+        read_options=pa_csv.ReadOptions(column_names=fields, skip_rows=int(has_header), block_size=CSV_BLOCK_BYTES),
+        parse_options=pa_csv.ParseOptions(delimiter=' '),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=columns,
+            column_types={
+                'interface-id': pa.string(),
+                'srcaddr': pa.string(),
+                'dstaddr': pa.string(),
+                'bytes': pa.int64(),
+                'start': pa.int64(),
+                'end': pa.int64(),
+                'action': pa.string(),
+            },
+            # NODATA and SKIPDATA records have '-' in every field
+            null_values=['-'],
+            strings_can_be_null=True,
+        ),
+    )
+    for batch in reader:
+        yield batch
+
+
+def _classify_batch(index: FlowLogIndex, batch, totals: Dict[Tuple[int, int, int], int]) -> int:
+    """Add one batch's sent bytes to totals by (source, destination, class); returns unindexed bytes.
+
+    Records are first grouped by (interface, source, destination) with Arrow, so the
+    lookups run once per conversation rather than once per record.
+    """
+    table = pa.Table.from_batches([batch])
+    if 'action' in table.column_names:
+        table = table.filter(pc.equal(table['action'], 'ACCEPT'))
+    if not table.num_rows:
+        return 0
+    grouped = table.group_by(['interface-id', 'srcaddr', 'dstaddr']).aggregate([('bytes', 'sum')])
+    sent = pc.fill_null(grouped['bytes_sum'], 0).to_numpy()
+
+    encoded = grouped['interface-id'].combine_chunks().dictionary_encode()
+    interface_codes = pc.fill_null(encoded.indices, -1).to_numpy(zero_copy_only=False).astype(np.int64)
+    interface_locations = np.append(index.interface_locations(encoded.dictionary.to_pylist()), -1)[interface_codes]
+    indexed = interface_locations >= 0
+    unindexed_bytes = int(sent[~indexed].sum())
+    vpcs = np.where(indexed, index.location_vpc[np.maximum(interface_locations, 0)], -1)
+
+    src_ips, src_valid = _ipv4_ints(grouped['srcaddr'])
+    sources = np.where(src_valid, index.locate(vpcs, src_ips), -1)
+    # Each flow is counted once, on the interface that sent it
+    outbound = indexed & (sources == interface_locations)
+    if not outbound.any():
+        return unindexed_bytes
+
+    dst_ips, dst_valid = _ipv4_ints(grouped['dstaddr'].filter(pa.array(outbound)))
+    sources, vpcs, sent = sources[outbound], vpcs[outbound], sent[outbound]
+    destinations = np.where(dst_valid, index.locate(vpcs, dst_ips), UNKNOWN_LOCATION)
+    public = dst_valid & (destinations < 0) & ~_is_private(dst_ips)
+    destinations[public] = INTERNET_LOCATION
+
+    known = destinations >= 0
+    known_destinations = np.maximum(destinations, 0)
+    classes = np.where(
+        index.location_region[sources] != index.location_region[known_destinations], CROSS_REGION,
+        np.where(index.location_az[sources] != index.location_az[known_destinations], CROSS_AZ, INTRA_AZ)
+    )
+    classes = np.where(known, classes, np.where(public, INTERNET, UNKNOWN))
+
+    # One int64 key per (source, destination, class); destinations are offset past the negative codes
+    keys = (sources << 34) | ((destinations + 2) << 3) | classes
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    sums = np.bincount(inverse, weights=sent, minlength=len(unique_keys))
+    for key, total in zip(unique_keys.tolist(), sums.tolist()):
+        group = (key >> 34, ((key >> 3) & (2**31 - 1)) - 2, key & 7)
+        totals[group] = totals.get(group, 0) + int(total)
+    return unindexed_bytes
+
+
+_worker_index: Optional[FlowLogIndex] = None
+
+
+def _init_worker(index: FlowLogIndex) -> None:
+    """Receive the index once per worker process instead of once per file."""
+    global _worker_index
+    _worker_index = index
+
+
+def analyze_flow_log_file(path: str, index: Optional[FlowLogIndex] = None) -> Dict:
+    """Aggregate one flow log file's sent bytes by (source, destination, class); runs in a process pool."""
+    index = index or _worker_index
+    totals: Dict[Tuple[int, int, int], int] = {}
+    unindexed = 0
+    first_start, last_end = None, None
+    for batch in _iter_batches(path):
+        unindexed += _classify_batch(index, batch, totals)
+        if 'start' in batch.schema.names and batch.num_rows:
+            start, end = pc.min(batch.column('start')).as_py(), pc.max(batch.column('end')).as_py()
+            if start is not None:
+                first_start = start if first_start is None else min(first_start, start)
+                last_end = end if last_end is None else max(last_end, end)
+    return {'totals': totals, 'unindexed_bytes': unindexed, 'start': first_start, 'end': last_end}
+
+
+class FlowLogAnalyzer:
+    """Attribute data transfer charges to the resources that cause them, from VPC flow logs.
+
+    Cost Explorer reports data transfer as part of "EC2-Other"; flow logs say which
+    interface sent how many bytes where. Each gzipped file is streamed in Arrow blocks,
+    grouped per conversation, classified with a FlowLogIndex as intra-AZ, cross-AZ,
+    cross-region or internet, and reduced to bytes per (source, destination, class).
+    Files are spread across a process pool that receives the index once per worker.
+    """
+
+    def __init__(self, index: FlowLogIndex, workers: int = 0, min_monthly_savings: float = 1.0, top: int = 50):
+        if pa is None:
+            raise RuntimeError("pyarrow is required to analyze VPC flow logs")
+        self.index = index
+        self.workers = workers or os.cpu_count() or 1
+        self.min_monthly_savings = min_monthly_savings
+        self.top = top
+
+    def analyze(self, paths: List[str]) -> Dict:
+        if self.workers == 1 or len(paths) <= 1:
+            partials = list(map(partial(analyze_flow_log_file, index=self.index), paths))
+        else:
+            with ProcessPoolExecutor(
+                max_workers=min(self.workers, len(paths)), initializer=_init_worker, initargs=(self.index,)
+            ) as executor:
+                partials = list(executor.map(analyze_flow_log_file, paths, chunksize=4))
+
+        totals: Dict[Tuple[int, int, int], int] = {}
+        for part in partials:
+            for group, sent in part['totals'].items():
+                totals[group] = totals.get(group, 0) + sent
+        starts = [part['start'] for part in partials if part['start'] is not None]
+        ends = [part['end'] for part in partials if part['end'] is not None]
+        window_start = datetime.utcfromtimestamp(min(starts)) if starts else None
+        window_end = datetime.utcfromtimestamp(max(ends)) if ends else None
+        window_hours = (max(ends) - min(starts)) / 3600 if starts and ends else 0.0
+        logger.info(f"Analyzed {len(paths)} flow log files covering {window_hours:.1f} hours")
+
+        summary = self._summarize(totals, window_hours)
+        summary.update({
+            'files_analyzed': len(paths),
+            'window_start': window_start,
+            'window_end': window_end,
+            'window_hours': round(window_hours, 2),
+            'unindexed_bytes': sum(part['unindexed_bytes'] for part in partials),
+        })
+        return summary
+
+    def _label(self, location: int) -> str:
+        if location == INTERNET_LOCATION:
+            return 'internet'
+        if location == UNKNOWN_LOCATION:
+            return 'unknown'
+        return self.index.locations[location]['resource_id']
+
+    def _summarize(self, totals: Dict[Tuple[int, int, int], int], window_hours: float) -> Dict:
+        # Scale the logged window to a month; an empty window reports the logged cost as is
+        monthly = HOURS_PER_MONTH / window_hours if window_hours else 1.0
+        by_class = {name: {'bytes': 0, 'cost': 0.0} for name in FLOW_CLASSES}
+        flows: Dict[Tuple[str, str, str], Dict] = {}
+        for (source, destination, code), sent in totals.items():
+            flow_class = FLOW_CLASSES[code]
+            cost = sent / BYTES_PER_GB * DATA_TRANSFER_PRICING[flow_class]
+            by_class[flow_class]['bytes'] += sent
+            by_class[flow_class]['cost'] += cost
+            key = (self._label(source), self._label(destination), flow_class)
+            flow = flows.setdefault(key, {
+                'source': key[0],
+                'source_az': self.index.locations[source]['az'],
+                'destination': key[1],
+                'destination_az': self.index.locations[destination]['az'] if destination >= 0 else None,
+                'flow_class': flow_class,
+                'bytes': 0,
+                'cost': 0.0,
+            })
+            flow['bytes'] += sent
+            flow['cost'] += cost
+
+        for flow in flows.values():
+            flow['monthly_cost'] = round(flow['cost'] * monthly, 2)
+            flow['cost'] = round(flow['cost'], 4)
+        ranked = sorted(flows.values(), key=lambda flow: (-flow['cost'], -flow['bytes']))
+        for totals_by_class in by_class.values():
+            totals_by_class['cost'] = round(totals_by_class['cost'], 4)
+
+        total_cost = sum(item['cost'] for item in by_class.values())
+        return {
+            'bytes': sum(item['bytes'] for item in by_class.values()),
+            'estimated_cost': round(total_cost, 4),
+            'estimated_monthly_cost': round(total_cost * monthly, 2),
+            'by_class': by_class,
+            'top_flows': ranked[:self.top],
+            'recommendations': self._recommend(ranked, monthly),
+        }
+
+    def _recommend(self, flows: List[Dict], monthly: float) -> List[Dict]:
+        """Suggest co-locating resource pairs whose cross-AZ or cross-region traffic costs the most."""
+        # Addresses only placed by their subnet aren't a resource that can move
+        subnets = {location['resource_id'] for location in self.index.locations if location['interface_id'] is None}
+        pairs: Dict[Tuple, Dict] = {}
+        for flow in flows:
+            if flow['flow_class'] not in ('cross_az', 'cross_region') or flow['destination'] in subnets:
+                continue
+            key = (tuple(sorted((flow['source'], flow['destination']))), flow['flow_class'])
+            pair = pairs.setdefault(key, {
+                'resources': list(key[0]),
+                'availability_zones': sorted({flow['source_az'], flow['destination_az']} - {None}),
+                'flow_class': flow['flow_class'],
+                'monthly_bytes': 0,
+                'estimated_savings': 0.0,
+            })
+            pair['monthly_bytes'] += int(flow['bytes'] * monthly)
+            pair['estimated_savings'] += flow['monthly_cost']
+
+        recommendations = []
+        for pair in pairs.values():
+            if pair['estimated_savings'] < self.min_monthly_savings:
+                continue
+            first, second = pair['resources']
+            gb = pair['monthly_bytes'] / BYTES_PER_GB
+            if pair['flow_class'] == 'cross_az':
+                pair['action'] = 'co_locate'
+                pair['reason'] = f"{first} and {second} exchange {gb:,.0f} GB/month across availability zones; place them in the same AZ"
+            else:
+                pair['action'] = 'regional_replica'
+                pair['reason'] = f"{first} and {second} exchange {gb:,.0f} GB/month across regions; serve the traffic from the same region"
+            pair['estimated_savings'] = round(pair['estimated_savings'], 2)
+            recommendations.append(pair)
+        recommendations.sort(key=lambda item: -item['estimated_savings'])
+        return recommendations
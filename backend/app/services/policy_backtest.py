@@ -0,0 +1,122 @@
+from itertools import product
+from typing import Dict, List, Optional, Sequence
+import warnings
+import numpy as np
+
+from app.services.utilization_store import UtilizationStore
+
+# Share of a resource's monthly cost saved by each action. Downsizing moves one size
+# down, which halves the price within every family in the catalog.
+ACTION_SAVINGS_FACTOR = {
+    'stop': 1.0,
+    'downsize': 0.5,
+}
+
+# Policies evaluated per block; bounds the (policies x resources) masks in memory
+POLICY_CHUNK = 64
+
+def expand_policy_grid(
+    thresholds: Sequence[float],
+    statistics: Sequence[str],
+    actions: Sequence[str],
+    peak_limits: Sequence[float]
+) -> List[Dict]:
+    """Expand threshold, statistic, action and peak-limit choices into every combination."""
+    return [
+        {'threshold': float(threshold), 'statistic': statistic, 'action': action, 'peak_limit': float(peak_limit)}
+        for threshold, statistic, action, peak_limit in product(thresholds, statistics, actions, peak_limits)
+    ]
+
+
+def _statistic_vectors(values: np.ndarray, statistics: Sequence[str]) -> Dict[str, np.ndarray]:
+    """Compute each requested per-resource statistic once over the history matrix.
+
+    Supported statistics are 'mean', 'max' and percentiles written as 'p50', 'p95', ...
+    All percentiles are computed in a single nanpercentile call.
+    """
+    vectors: Dict[str, np.ndarray] = {}
+    percentiles = sorted({s for s in statistics if s.startswith('p')})
+    for statistic in set(statistics) - set(percentiles):
+        if statistic == 'mean':
+            vectors[statistic] = np.nanmean(values, axis=1)
+        elif statistic == 'max':
+            vectors[statistic] = np.nanmax(values, axis=1)
+        else:
+            raise ValueError(f"Unsupported statistic: {statistic}")
+
+    if percentiles:
+        try:
+            qs = [float(p[1:]) for p in percentiles]
+        except ValueError:
+            raise ValueError(f"Unsupported statistic in {percentiles}")
+        if any(not 0 <= q <= 100 for q in qs):
+            raise ValueError("Percentiles must be between p0 and p100")
+        stacked = np.nanpercentile(values, qs, axis=1)
+        for statistic, vector in zip(percentiles, stacked):
+            vectors[statistic] = vector
+
+    return vectors
+
+
+def backtest_policies(
+    store: UtilizationStore,
+    policies: List[Dict],
+    metric: str = 'cpu',
+    resource_type: Optional[str] = None,
+    max_resources: int = 100
+) -> List[Dict]:
+    """Evaluate rightsizing policies against the stored utilization history in one vectorized pass.
+
+    A resource is affected by a policy when the policy's statistic of its history is below the
+    threshold. An affected resource is a peak risk when its observed peak is at or above the
+    policy's peak limit, i.e. the action would likely have hurt it at some point in the window.
+    """
+    for policy in policies:
+        if policy['action'] not in ACTION_SAVINGS_FACTOR:
+            raise ValueError(f"Unsupported action: {policy['action']}")
+
+    resource_ids = store.resource_ids(metric, resource_type)
+    ids, _, values = store.matrix(metric, resource_ids)
+    costs = store.monthly_costs(ids)
+
+    if not ids:
+        return [
+            dict(policy, affected_count=0, estimated_savings=0.0, peak_risk_count=0, affected_resources=[])
+            for policy in policies
+        ]
+
+    with warnings.catch_warnings():
+        # Resources without datapoints raise 'Mean of empty slice' and similar warnings
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        vectors = _statistic_vectors(values, [p['statistic'] for p in policies] + ['max'])
+    peak = vectors['max']
+    # Resources without datapoints have NaN statistics, which never compare below a threshold
+    order = np.argsort(-costs, kind='stable')
+
+    results = []
+    for start in range(0, len(policies), POLICY_CHUNK):
+        chunk = policies[start:start + POLICY_CHUNK]
+        stats = np.vstack([vectors[p['statistic']] for p in chunk])
+        thresholds = np.array([p['threshold'] for p in chunk])[:, None]
+        peak_limits = np.array([p['peak_limit'] for p in chunk])[:, None]
+        factors = np.array([ACTION_SAVINGS_FACTOR[p['action']] for p in chunk])
+
+        with np.errstate(invalid='ignore'):
+            affected = stats < thresholds
+            at_risk = affected & (peak[None, :] >= peak_limits)
+        savings = (affected @ costs) * factors
+        affected_counts = affected.sum(axis=1)
+        risk_counts = at_risk.sum(axis=1)
+
+        for row, policy in enumerate(chunk):
+            top = order[affected[row, order]][:max_resources]
+            results.append(dict(
+                policy,
+                affected_count=int(affected_counts[row]),
+                estimated_savings=round(float(savings[row]), 2),
+                peak_risk_count=int(risk_counts[row]),
+                affected_resources=[ids[i] for i in top]
+            ))
+
+    return results
+
@@ -0,0 +1,192 @@
+from typing import Dict, List, Optional
+
+# On-demand hourly prices (USD, us-east-1, Linux).
+# These are list prices used for estimates only; they are not fetched from the Pricing API.
+EC2_HOURLY_PRICING = {
+    't3.nano': 0.0052,
+    't3.micro': 0.0104,
+    't3.small': 0.0208,
+    't3.medium': 0.0416,
+    't3.large': 0.0832,
+    't3.xlarge': 0.1664,
+    't3.2xlarge': 0.3328,
+    't4g.nano': 0.0042,
+    't4g.micro': 0.0084,
+    't4g.small': 0.0168,
+    't4g.medium': 0.0336,
+    't4g.large': 0.0672,
+    't4g.xlarge': 0.1344,
+    't4g.2xlarge': 0.2688,
+    'm5.large': 0.096,
+    'm5.xlarge': 0.192,
+    'm5.2xlarge': 0.384,
+    'm5.4xlarge': 0.768,
+    'm5.8xlarge': 1.536,
+    'm5.12xlarge': 2.304,
+    'm5.16xlarge': 3.072,
+    'c5.large': 0.085,
+    'c5.xlarge': 0.17,
+    'c5.2xlarge': 0.34,
+    'c5.4xlarge': 0.68,
+    'c5.9xlarge': 1.53,
+    'c5.12xlarge': 2.04,
+    'c5.18xlarge': 3.06,
+}
+
+# On-demand hourly prices (USD, us-east-1, single-AZ MySQL/PostgreSQL).
+# These are list prices used for estimates only; they are not fetched from the Pricing API.
+RDS_HOURLY_PRICING = {
+    'db.t3.micro': 0.017,
+    'db.t3.small': 0.034,
+    'db.t3.medium': 0.068,
+    'db.t3.large': 0.136,
+    'db.t3.xlarge': 0.272,
+    'db.t3.2xlarge': 0.544,
+    'db.t4g.micro': 0.016,
+    'db.t4g.small': 0.032,
+    'db.t4g.medium': 0.065,
+    'db.t4g.large': 0.129,
+    'db.t4g.xlarge': 0.258,
+    'db.t4g.2xlarge': 0.517,
+    'db.m5.large': 0.171,
+    'db.m5.xlarge': 0.342,
+    'db.m5.2xlarge': 0.684,
+    'db.m5.4xlarge': 1.368,
+    'db.m5.8xlarge': 2.736,
+    'db.m5.12xlarge': 4.104,
+    'db.m5.16xlarge': 5.472,
+    'db.m5.24xlarge': 8.208,
+    'db.m6g.large': 0.152,
+    'db.m6g.xlarge': 0.304,
+    'db.m6g.2xlarge': 0.608,
+    'db.m6g.4xlarge': 1.216,
+    'db.m6g.8xlarge': 2.432,
+    'db.m6g.12xlarge': 3.648,
+    'db.m6g.16xlarge': 4.864,
+    'db.r5.large': 0.25,
+    'db.r5.xlarge': 0.50,
+    'db.r5.2xlarge': 1.00,
+    'db.r5.4xlarge': 2.00,
+    'db.r5.8xlarge': 4.00,
+    'db.r5.12xlarge': 6.00,
+    'db.r5.16xlarge': 8.00,
+    'db.r5.24xlarge': 12.00,
+    'db.r6g.large': 0.225,
+    'db.r6g.xlarge': 0.45,
+    'db.r6g.2xlarge': 0.899,
+    'db.r6g.4xlarge': 1.798,
+    'db.r6g.8xlarge': 3.597,
+    'db.r6g.12xlarge': 5.395,
+    'db.r6g.16xlarge': 7.194,
+}
+
+# Ordered sizes per DB instance family, smallest first. Derived from the price list so
+# that every downsizing target has a known price.
+RDS_INSTANCE_CLASSES: Dict[str, List[str]] = {}
+for _db_class in sorted(RDS_HOURLY_PRICING, key=RDS_HOURLY_PRICING.get):
+    _family, _size = _db_class.rsplit('.', 1)
+    RDS_INSTANCE_CLASSES.setdefault(_family, []).append(_size)
+
+HOURS_PER_MONTH = 730
+
+# Rough on-demand price per vCPU-hour (USD) for types missing from the price lists above
+PRICE_PER_VCPU_HOUR = 0.048
+
+# vCPUs per size name; 'NxLarge' sizes have 4 * N vCPUs
+SIZE_VCPUS = {
+    'nano': 0.5,
+    'micro': 0.5,
+    'small': 0.5,
+    'medium': 2,
+    'large': 2,
+    'xlarge': 4,
+    'metal': 96,
+}
+
+# Relative price of AWS regions versus us-east-1, by prefix
+REGION_PRICE_MULTIPLIERS = (
+    ('sa-', 1.55),
+    ('ap-', 1.25),
+    ('me-', 1.2),
+    ('af-', 1.2),
+    ('eu-', 1.1),
+    ('ca-', 1.05),
+)
+
+
+def split_rds_class(db_class: str) -> Optional[tuple]:
+    """Split a DB instance class such as 'db.m5.large' into ('db.m5', 'large')."""
+    if db_class.count('.') < 2:
+        return None
+    family, size = db_class.rsplit('.', 1)
+    return family, size
+
+
+def region_price_multiplier(region: Optional[str]) -> float:
+    """Get the relative price level of an AWS region."""
+    for prefix, multiplier in REGION_PRICE_MULTIPLIERS:
+        if (region or '').startswith(prefix):
+            return multiplier
+    return 1.0
+
+
+def _estimate_hourly_price(size: str) -> float:
+    """Estimate an hourly price from a size name such as 'large' or '12xlarge'."""
+    if size in SIZE_VCPUS:
+        return SIZE_VCPUS[size] * PRICE_PER_VCPU_HOUR
+    multiplier = size[:-len('xlarge')] if size.endswith('xlarge') else ''
+    if multiplier.isdigit():
+        return 4 * int(multiplier) * PRICE_PER_VCPU_HOUR
+    return 2 * PRICE_PER_VCPU_HOUR
+
+
+def ec2_monthly_cost(instance_type: str, region: Optional[str] = None) -> float:
+    """Estimated monthly on-demand cost of an EC2 instance type, used to prioritize scans."""
+    hourly = EC2_HOURLY_PRICING.get(instance_type)
+    if hourly is None:
+        hourly = _estimate_hourly_price(instance_type.rsplit('.', 1)[-1])
+    return hourly * region_price_multiplier(region) * HOURS_PER_MONTH
+
+
+def rds_monthly_cost(db_class: str, region: Optional[str] = None) -> float:
+    """Estimated monthly on-demand cost of a DB instance class, used to prioritize scans."""
+    hourly = RDS_HOURLY_PRICING.get(db_class)
+    if hourly is None:
+        # DB instances cost roughly 1.8x the matching EC2 instance
+        hourly = 1.8 * _estimate_hourly_price(db_class.rsplit('.', 1)[-1])
+    return hourly * region_price_multiplier(region) * HOURS_PER_MONTH
+
+# S3 storage price per GB-month (USD, us-east-1, first 50 TB tier)
+S3_STORAGE_PRICING = {
+    'STANDARD': 0.023,
+    'INTELLIGENT_TIERING': 0.023,
+    'STANDARD_IA': 0.0125,
+    'ONEZONE_IA': 0.01,
+    'GLACIER_IR': 0.004,
+    'GLACIER': 0.0036,
+    'DEEP_ARCHIVE': 0.00099,
+    'REDUCED_REDUNDANCY': 0.024,
+}
+
+# Lifecycle transition request price per 1,000 objects (USD), by target storage class
+S3_TRANSITION_PRICING = {
+    'STANDARD_IA': 0.01,
+    'ONEZONE_IA': 0.01,
+    'GLACIER_IR': 0.02,
+    'GLACIER': 0.03,
+    'DEEP_ARCHIVE': 0.05,
+}
+
+# IA and Glacier Instant Retrieval bill smaller objects as this size, so lifecycle rules skip them
+S3_MIN_BILLABLE_OBJECT_BYTES = 128 * 1024
+
+# Data transfer price per GB (USD) by flow class, charged on bytes recorded at the sending
+# interface. Cross-AZ transfer is billed $0.01/GB in each direction, so both halves are
+# charged to the sender; internet egress uses the first 10 TB tier.
+DATA_TRANSFER_PRICING = {
+    'intra_az': 0.0,
+    'cross_az': 0.02,
+    'cross_region': 0.02,
+    'internet': 0.09,
+    'unknown': 0.0,
+}
@@ -0,0 +1,325 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+import json
+import logging
+import os
+import re
+
+import numpy as np
+
+# Optional: only needed to analyze S3 Inventory reports
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+from app.services.pricing import S3_MIN_BILLABLE_OBJECT_BYTES, S3_STORAGE_PRICING, S3_TRANSITION_PRICING
+
+logger = logging.getLogger(__name__)
+
+# Lower edge of each object age bin, in days
+AGE_BINS_DAYS = (0, 30, 90, 180, 365, 730)
+AGE_BIN_LABELS = tuple(
+    f"{low}-{high}d" for low, high in zip(AGE_BINS_DAYS, AGE_BINS_DAYS[1:])
+) + (f"{AGE_BINS_DAYS[-1]}d+",)
+
+# Lifecycle transitions recommended for Standard data, by minimum object age in days.
+# Conservative tiers that keep millisecond access; deeper archive classes need knowledge
+# of retrieval patterns an inventory doesn't have.
+LIFECYCLE_TIERS = (
+    (30, 'STANDARD_IA'),
+    (90, 'GLACIER_IR'),
+)
+TRANSITION_SOURCE_CLASSES = ('STANDARD', 'STANDARD_IA')
+
+# Rows per Parquet batch and bytes per CSV block; bounds memory per worker
+BATCH_ROWS = 1_000_000
+CSV_BLOCK_BYTES = 64 * 2**20
+
+# Inventory columns the analyzer reads, by normalized name (lowercase, no separators)
+COLUMNS = ('bucket', 'key', 'size', 'lastmodifieddate', 'storageclass')
+BYTES_PER_GB = 1024 ** 3
+MS_PER_DAY = 86_400_000
+
+
+def _normalized(name: str) -> str:
+    """'LastModifiedDate' and 'last_modified_date' -> 'lastmodifieddate'."""
+    return re.sub(r'[^a-z0-9]', '', name.lower())
+
+
+def read_manifest(path: str) -> Dict:
+    """Read an S3 Inventory manifest.json and resolve its data files on local disk.
+
+    Data file keys are relative to the destination bucket, so each is looked up under
+    every ancestor of the manifest's directory, then in the inventory's data/ directory.
+    """
+    with open(path) as f:
+        manifest = json.load(f)
+    manifest_dir = os.path.dirname(os.path.abspath(path))
+    ancestors = [manifest_dir]
+    while os.path.dirname(ancestors[-1]) != ancestors[-1]:
+        ancestors.append(os.path.dirname(ancestors[-1]))
+
+    files = []
+    for entry in manifest['files']:
+        candidates = [os.path.join(ancestor, entry['key']) for ancestor in ancestors]
+        candidates.append(os.path.join(os.path.dirname(manifest_dir), 'data', os.path.basename(entry['key'])))
+        local = next((candidate for candidate in candidates if os.path.exists(candidate)), None)
+        if local is None:
+            raise FileNotFoundError(f"Inventory file {entry['key']} from {path} not found on disk")
+        files.append(local)
+
+    created_ms = int(manifest.get('creationTimestamp') or os.path.getmtime(path) * 1000)
+    return {
+        'source_bucket': manifest.get('sourceBucket', ''),
+        'format': manifest.get('fileFormat', 'CSV').upper(),
+        'schema': [name.strip() for name in manifest.get('fileSchema', '').split(',') if name.strip()],
+        'files': files,
+        'created_at_ms': created_ms,
+    }
+
+
+def find_manifests(directory: str) -> List[str]:
+    """Find the latest manifest.json of every inventory configuration under a directory.
+
+    Reports are laid out as <config>/<YYYY-MM-DDTHH-MMZ>/manifest.json, so the latest is
+    the last timestamp directory in sort order.
+    """
+    latest: Dict[str, str] = {}
+    for root, _, files in os.walk(directory):
+        if 'manifest.json' in files:
+            config = os.path.dirname(root)
+            if config not in latest or root > os.path.dirname(latest[config]):
+                latest[config] = os.path.join(root, 'manifest.json')
+    return sorted(latest.values())
+
+
+def _iter_batches(path: str, file_format: str, schema: List[str]) -> Iterator:
+    """Stream one inventory file as Arrow batches holding only the analyzed columns."""
+    if file_format == 'CSV':
+        # CSV reports have no header; the manifest's fileSchema names the columns
+        names = [_normalized(name) for name in schema]
+        reader = pa_csv.open_csv(
+            path,
+            read_options=pa_csv.ReadOptions(column_names=names, block_size=CSV_BLOCK_BYTES),
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=[name for name in COLUMNS if name in names],
+                column_types={
+                    'size': pa.int64(),
+                    'lastmodifieddate': pa.timestamp('ms', tz='UTC'),
+                    'storageclass': pa.string(),
+                },
+                strings_can_be_null=True,
+            ),
+        )
+        for batch in reader:
+            yield batch
+    elif file_format == 'PARQUET':
+        parquet = pq.ParquetFile(path)
+        columns = [name for name in parquet.schema_arrow.names if _normalized(name) in COLUMNS]
+        for batch in parquet.iter_batches(batch_size=BATCH_ROWS, columns=columns):
+            yield batch.rename_columns([_normalized(name) for name in batch.schema.names])
+    elif file_format == 'ORC':
+        from pyarrow import orc
+        reader = orc.ORCFile(path)
+        columns = [name for name in reader.schema.names if _normalized(name) in COLUMNS]
+        for stripe in range(reader.nstripes):
+            batch = reader.read_stripe(stripe, columns=columns)
+            yield batch.rename_columns([_normalized(name) for name in batch.schema.names])
+    else:
+        raise ValueError(f"Unsupported S3 Inventory format: {file_format}")
+
+
+def _aggregate_batch(batch, as_of_ms: int, prefix_pattern: str):
+    """Group one batch by (bucket, prefix, storage class, age bin) with Arrow kernels."""
+    size = pc.fill_null(batch.column('size'), 0).cast(pa.int64())
+    modified = batch.column('lastmodifieddate')
+    if not pa.types.is_timestamp(modified.type):
+        modified = pc.cast(modified, pa.timestamp('ms', tz='UTC'))
+    modified_ms = pc.fill_null(modified.cast(pa.timestamp('ms', tz='UTC')).cast(pa.int64()), as_of_ms).to_numpy(zero_copy_only=False)
+    age_days = (as_of_ms - modified_ms) // MS_PER_DAY
+    age_bin = np.searchsorted(np.array(AGE_BINS_DAYS), age_days, side='right') - 1
+    small = pc.less(size, S3_MIN_BILLABLE_OBJECT_BYTES)
+
+    storage_class = batch.column('storageclass') if 'storageclass' in batch.schema.names else pa.nulls(len(batch), pa.string())
+    table = pa.table({
+        'bucket': batch.column('bucket'),
+        'prefix': pc.struct_field(pc.extract_regex(batch.column('key'), prefix_pattern), [0]),
+        'storage_class': pc.fill_null(storage_class, 'STANDARD'),
+        'age_bin': pa.array(np.clip(age_bin, 0, None).astype(np.int8)),
+        'size': size,
+        'small': small.cast(pa.int64()),
+        'small_size': pc.if_else(small, size, 0),
+    })
+    return table.group_by(['bucket', 'prefix', 'storage_class', 'age_bin']).aggregate([
+        ('size', 'count'), ('size', 'sum'), ('small', 'sum'), ('small_size', 'sum'),
+    ])
+
+
+def analyze_inventory_file(args: Tuple[str, str, List[str], int, int]) -> Dict[Tuple, List[int]]:
+    """Aggregate one inventory file; module-level so it can run in a process pool.
+
+    Returns (bucket, prefix, storage class, age bin) -> [objects, bytes, small objects, small bytes].
+    """
+    path, file_format, schema, as_of_ms, prefix_depth = args
+    # Up to prefix_depth leading path components, e.g. 'logs/2024/' for depth 2
+    prefix_pattern = rf'^(?P<prefix>(?:[^/]*/){{0,{prefix_depth}}})'
+    totals: Dict[Tuple, List[int]] = {}
+    for batch in _iter_batches(path, file_format, schema):
+        if not len(batch):
+            continue
+        grouped = _aggregate_batch(batch, as_of_ms, prefix_pattern)
+        for row in grouped.to_pylist():
+            key = (row['bucket'], row['prefix'], row['storage_class'], row['age_bin'])
+            counts = totals.setdefault(key, [0, 0, 0, 0])
+            counts[0] += row['size_count']
+            counts[1] += row['size_sum'] or 0
+            counts[2] += row['small_sum'] or 0
+            counts[3] += row['small_size_sum'] or 0
+    return totals
+
+
+class S3InventoryAnalyzer:
+    """Storage-class and lifecycle analysis of S3 Inventory reports on local disk.
+
+    Report files are streamed batch by batch (Parquet row batches, ORC stripes, CSV
+    blocks) and reduced with Arrow group-by kernels to per-(bucket, prefix, storage class,
+    age bin) totals, so memory depends on the number of prefixes, not objects. Files are
+    spread across a process pool and their partial totals merged, which keeps a
+    billion-row inventory within one machine's memory and scales with its cores.
+    """
+
+    def __init__(self, prefix_depth: int = 1, workers: int = 0, min_monthly_savings: float = 1.0):
+        if pa is None:
+            raise RuntimeError("pyarrow is required to analyze S3 Inventory reports")
+        self.prefix_depth = prefix_depth
+        self.workers = workers or os.cpu_count() or 1
+        self.min_monthly_savings = min_monthly_savings
+
+    def analyze(self, manifest_paths: List[str]) -> Dict:
+        """Aggregate every report file of the given manifests and recommend lifecycle rules."""
+        tasks = []
+        for path in manifest_paths:
+            manifest = read_manifest(path)
+            tasks.extend(
+                (file, manifest['format'], manifest['schema'], manifest['created_at_ms'], self.prefix_depth)
+                for file in manifest['files']
+            )
+
+        totals: Dict[Tuple, List[int]] = {}
+        if self.workers == 1 or len(tasks) <= 1:
+            partials = map(analyze_inventory_file, tasks)
+            self._merge(totals, partials)
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(tasks))) as executor:
+                self._merge(totals, executor.map(analyze_inventory_file, tasks))
+        logger.info(f"Analyzed {len(tasks)} S3 Inventory files from {len(manifest_paths)} manifests")
+        return self._summarize(totals, len(tasks))
+
+    @staticmethod
+    def _merge(totals: Dict[Tuple, List[int]], partials) -> None:
+        for partial in partials:
+            for key, counts in partial.items():
+                merged = totals.setdefault(key, [0, 0, 0, 0])
+                for i, value in enumerate(counts):
+                    merged[i] += value
+
+    def _summarize(self, totals: Dict[Tuple, List[int]], files: int) -> Dict:
+        prefixes: Dict[Tuple[str, str], Dict] = {}
+        for (bucket, prefix, storage_class, age_bin), (objects, size, small_objects, small_size) in totals.items():
+            summary = prefixes.setdefault((bucket, prefix), {
+                'bucket': bucket,
+                'prefix': prefix,
+                'objects': 0,
+                'bytes': 0,
+                'monthly_cost': 0.0,
+                'by_storage_class': {},
+                'age_histogram': {label: {'objects': 0, 'bytes': 0} for label in AGE_BIN_LABELS},
+                '_transitions': {},
+            })
+            summary['objects'] += objects
+            summary['bytes'] += size
+            summary['monthly_cost'] += size / BYTES_PER_GB * S3_STORAGE_PRICING.get(storage_class, S3_STORAGE_PRICING['STANDARD'])
+            by_class = summary['by_storage_class'].setdefault(storage_class, {'objects': 0, 'bytes': 0})
+            by_class['objects'] += objects
+            by_class['bytes'] += size
+            histogram = summary['age_histogram'][AGE_BIN_LABELS[age_bin]]
+            histogram['objects'] += objects
+            histogram['bytes'] += size
+
+            # Objects under the minimum billable size stay put; lifecycle rules skip them
+            target = self._target_class(storage_class, AGE_BINS_DAYS[age_bin])
+            if target is not None:
+                moved = summary['_transitions'].setdefault(target, [0, 0, 0.0])
+                moved[0] += objects - small_objects
+                moved[1] += size - small_size
+                moved[2] += (size - small_size) / BYTES_PER_GB * (
+                    S3_STORAGE_PRICING[storage_class] - S3_STORAGE_PRICING[target]
+                )
+
+        groups = []
+        recommendations = []
+        for summary in sorted(prefixes.values(), key=lambda item: -item['monthly_cost']):
+            transitions = summary.pop('_transitions')
+            summary['monthly_cost'] = round(summary['monthly_cost'], 2)
+            groups.append(summary)
+            recommendation = self._recommend(summary, transitions)
+            if recommendation is not None:
+                recommendations.append(recommendation)
+        recommendations.sort(key=lambda item: -item['estimated_savings'])
+
+        return {
+            'files_analyzed': files,
+            'objects': sum(group['objects'] for group in groups),
+            'bytes': sum(group['bytes'] for group in groups),
+            'monthly_cost': round(sum(group['monthly_cost'] for group in groups), 2),
+            'estimated_savings': round(sum(item['estimated_savings'] for item in recommendations), 2),
+            'groups': groups,
+            'recommendations': recommendations,
+        }
+
+    @staticmethod
+    def _target_class(storage_class: str, age_days: int) -> Optional[str]:
+        """The cheapest lifecycle tier an object of this class and age qualifies for."""
+        if storage_class not in TRANSITION_SOURCE_CLASSES:
+            return None
+        target = None
+        for min_age, tier in LIFECYCLE_TIERS:
+            if age_days >= min_age:
+                target = tier
+        if target is None or S3_STORAGE_PRICING[target] >= S3_STORAGE_PRICING[storage_class]:
+            return None
+        return target
+
+    def _recommend(self, summary: Dict, transitions: Dict[str, List]) -> Optional[Dict]:
+        savings = sum(moved[2] for moved in transitions.values())
+        if savings < self.min_monthly_savings:
+            return None
+        transition_cost = sum(
+            moved[0] / 1000 * S3_TRANSITION_PRICING[target] for target, moved in transitions.items()
+        )
+        rules = [
+            {'days': min_age, 'storage_class': tier}
+            for min_age, tier in LIFECYCLE_TIERS if tier in transitions
+        ]
+        location = f"s3://{summary['bucket']}/{summary['prefix']}"
+        return {
+            'bucket': summary['bucket'],
+            'prefix': summary['prefix'],
+            'action': 'lifecycle_transition',
+            'transitions': rules,
+            'reason': (
+                f"{sum(moved[1] for moved in transitions.values()) / BYTES_PER_GB:,.1f} GB under {location} "
+                f"is old enough for cheaper storage classes; check retrieval patterns before applying"
+            ),
+            'objects_affected': sum(moved[0] for moved in transitions.values()),
+            'bytes_affected': sum(moved[1] for moved in transitions.values()),
+            'current_monthly_cost': summary['monthly_cost'],
+            'estimated_savings': round(savings, 2),
+            # One-time lifecycle request charges, paid back in transition_cost / savings months
+            'transition_cost': round(transition_cost, 2),
+        }
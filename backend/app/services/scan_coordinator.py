@@ -0,0 +1,319 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import asyncio
+import logging
+import os
+import time
+import zlib
+
+import boto3
+
+from app.core.config import Settings
+from app.core.snapshot import CAPTURE, REPLAY, Snapshot, shared_snapshot
+from app.services.aws_service import AWSService
+from app.services.utilization_store import UtilizationStore
+
+logger = logging.getLogger(__name__)
+settings = Settings()
+
+# Resource kinds scanned per region; commitments are account-wide and get a single shard
+REGIONAL_RESOURCE_KINDS = ('ec2', 'rds')
+# Regions listed concurrently while planning
+PLAN_THREADS = 8
+
+
+def shard_of(resource_id: str, shard_count: int) -> int:
+    """Get the resource-ID range (hash bucket) a resource belongs to."""
+    return zlib.crc32(resource_id.encode()) % shard_count
+
+
+class ScanShard:
+    """One independently retryable unit of a scan: account, region, resource kind and id range.
+
+    resource_ids are the ids in the range, listed by the coordinator, and metric_dimensions
+    the memory metrics discovered for them, so shards don't repeat region-wide listings.
+    """
+
+    __slots__ = (
+        'provider', 'account', 'region', 'resource_kind', 'shard_index', 'shard_count',
+        'resource_ids', 'metric_dimensions'
+    )
+
+    def __init__(
+        self,
+        provider: str,
+        account: str,
+        region: str,
+        resource_kind: str,
+        shard_index: int = 0,
+        shard_count: int = 1,
+        resource_ids: Optional[List[str]] = None,
+        metric_dimensions: Optional[Dict[str, List[Dict]]] = None
+    ):
+        self.provider = provider
+        self.account = account
+        self.region = region
+        self.resource_kind = resource_kind
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.resource_ids = resource_ids
+        self.metric_dimensions = metric_dimensions
+
+    @property
+    def key(self) -> str:
+        return f"{self.provider}/{self.account or 'default'}/{self.region or 'global'}/{self.resource_kind}/{self.shard_index}of{self.shard_count}"
+
+    def to_dict(self) -> Dict:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ScanShard':
+        return cls(**data)
+
+    def __repr__(self) -> str:
+        return f"ScanShard({self.key!r})"
+
+
+def _session_for_account(account: str) -> boto3.Session:
+    """Get a session for the default credentials, or for a role assumed in another account."""
+    if not account or settings.SCAN_SNAPSHOT_MODE == 'replay':
+        return boto3.Session()
+    credentials = boto3.client('sts').assume_role(
+        RoleArn=account, RoleSessionName='cloudtrim-scan'
+    )['Credentials']
+    return boto3.Session(
+        aws_access_key_id=credentials['AccessKeyId'],
+        aws_secret_access_key=credentials['SecretAccessKey'],
+        aws_session_token=credentials['SessionToken']
+    )
+
+
+def _shard_snapshot(shard: ScanShard) -> Optional[Snapshot]:
+    """Open the snapshot a shard captures to or replays from, or None when snapshots are off.
+
+    Pool workers are forked with the parent's open snapshot and never run atexit, so each
+    shard captures to a file of its own, which the coordinator absorbs into the shared
+    capture, and replays through its own file handle.
+    """
+    if settings.SCAN_SNAPSHOT_MODE == CAPTURE:
+        shard_id = zlib.crc32(shard.key.encode())
+        return Snapshot(f"{settings.SCAN_SNAPSHOT_PATH}.{os.getpid()}-{shard_id:08x}", CAPTURE)
+    if settings.SCAN_SNAPSHOT_MODE == REPLAY:
+        return Snapshot(settings.SCAN_SNAPSHOT_PATH, REPLAY)
+    return None
+
+
+def run_shard(shard_data: Dict) -> Dict:
+    """Scan one shard and return its recommendations and the utilization it recorded.
+
+    Module-level and dict-in/dict-out so it can run in a process pool or a Celery worker.
+    Shards keep utilization history in memory only, since many run concurrently, and
+    return it for the coordinator to merge into the API's store.
+    """
+    shard = ScanShard.from_dict(shard_data)
+    if shard.provider != 'aws':
+        raise ValueError(f"Unsupported provider for sharded scans: {shard.provider}")
+
+    started = time.monotonic()
+    store = UtilizationStore(retention_hours=settings.UTILIZATION_RETENTION_DAYS * 24)
+    snapshot = _shard_snapshot(shard)
+    try:
+        service = AWSService(
+            session=_session_for_account(shard.account),
+            regions=[shard.region] if shard.region else None,
+            utilization_store=store,
+            snapshot_scope=shard.account,
+            snapshot=snapshot
+        )
+        recommendations = asyncio.run(service.get_shard_recommendations(
+            shard.resource_kind, shard.region or None, shard.resource_ids, shard.metric_dimensions
+        ))
+    except BaseException:
+        if snapshot is not None:
+            snapshot.close()
+            if snapshot.mode == CAPTURE:
+                # The retry captures the shard again
+                os.remove(snapshot.path)
+        raise
+    if snapshot is not None:
+        snapshot.close()
+    for recommendation in recommendations:
+        recommendation.setdefault('region', shard.region or None)
+        if shard.account:
+            recommendation['account'] = shard.account
+
+    return {
+        'shard': shard.to_dict(),
+        'recommendations': recommendations,
+        'utilization': store.export(),
+        'snapshot': snapshot.path if snapshot is not None and snapshot.mode == CAPTURE else None,
+        'duration_seconds': round(time.monotonic() - started, 3),
+    }
+
+
+def merge_shard_results(results: List[Dict]) -> List[Dict]:
+    """Merge shard results into one list whose order doesn't depend on completion order."""
+    recommendations = [
+        recommendation for result in results for recommendation in result['recommendations']
+    ]
+    recommendations.sort(key=lambda item: (
+        item['resource_type'], item.get('account') or '', item.get('region') or '', item['resource_id']
+    ))
+    return recommendations
+
+
+class ScanCoordinator:
+    """Split a scan into shards and run them across worker processes or Celery workers.
+
+    Shards are planned per account, region, resource kind and resource-ID hash range, so
+    throughput grows with the number of workers. Results stream back as shards finish,
+    a failed shard is retried on its own, and merge_shard_results() orders the combined output
+    deterministically.
+    """
+
+    def __init__(
+        self,
+        executor: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        shards_per_region: Optional[int] = None,
+        accounts: Optional[List[str]] = None
+    ):
+        self.executor = executor or settings.SCAN_EXECUTOR
+        if self.executor not in ('process', 'celery'):
+            raise ValueError(f"Unknown scan executor: {self.executor}")
+        if self.executor == 'celery' and settings.SCAN_SNAPSHOT_MODE == CAPTURE:
+            # Shard captures would be written on the worker nodes
+            raise ValueError("Snapshot capture needs SCAN_EXECUTOR=inline or process, not celery")
+        self.max_workers = max_workers or settings.SCAN_WORKERS or os.cpu_count() or 1
+        self.max_retries = settings.SCAN_SHARD_RETRIES if max_retries is None else max_retries
+        self.shards_per_region = max(1, shards_per_region or settings.SCAN_SHARDS_PER_REGION)
+        if accounts is None:
+            accounts = [arn.strip() for arn in settings.SCAN_ACCOUNT_ROLE_ARNS.split(',') if arn.strip()]
+        # '' is the account of the default credentials
+        self.accounts = accounts or ['']
+
+    def plan(self, regions: List[str]) -> List[ScanShard]:
+        """Split a scan of the given regions into shards.
+
+        Each account's regions are listed here once, concurrently, and every shard gets only
+        the ids in its range, so adding shards doesn't multiply inventory and metric
+        discovery calls. Ranges without resources get no shard.
+        """
+        shards = []
+        for account in self.accounts:
+            service = AWSService(
+                session=_session_for_account(account),
+                regions=regions,
+                utilization_store=UtilizationStore(),
+                snapshot_scope=account
+            )
+            with ThreadPoolExecutor(max_workers=max(1, min(len(regions), PLAN_THREADS))) as pool:
+                for region_shards in pool.map(lambda region: self._plan_region(service, account, region), regions):
+                    shards.extend(region_shards)
+            if settings.COMMITMENT_ANALYSIS_ENABLED:
+                shards.append(ScanShard('aws', account, '', 'commitments'))
+        return shards
+
+    def _plan_region(self, service: AWSService, account: str, region: str) -> List[ScanShard]:
+        shards = []
+        for resource_kind in REGIONAL_RESOURCE_KINDS:
+            ranges: List[List[str]] = [[] for _ in range(self.shards_per_region)]
+            for resource_id in service.list_resource_ids(resource_kind, region):
+                ranges[shard_of(resource_id, self.shards_per_region)].append(resource_id)
+            dimensions = service.get_memory_dimensions(region) if resource_kind == 'ec2' and any(ranges) else {}
+            for shard_index, resource_ids in enumerate(ranges):
+                if not resource_ids:
+                    continue
+                shards.append(ScanShard(
+                    'aws', account, region, resource_kind, shard_index, self.shards_per_region,
+                    resource_ids=sorted(resource_ids),
+                    metric_dimensions={rid: dimensions[rid] for rid in resource_ids if rid in dimensions}
+                    if resource_kind == 'ec2' else None
+                ))
+        return shards
+
+    def iter_results(self, shards: List[ScanShard], failed: Optional[List[Dict]] = None) -> Iterator[Dict]:
+        """Run shards and yield each result as soon as its shard finishes.
+
+        Shards still failing after max_retries attempts are appended to failed.
+        """
+        failed = failed if failed is not None else []
+        if self.executor == 'celery':
+            yield from self._iter_celery(shards, failed)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            yield from self._iter_futures(
+                shards, lambda shard: pool.submit(run_shard, shard.to_dict()), failed
+            )
+
+    def _iter_celery(self, shards: List[ScanShard], failed: List[Dict]) -> Iterator[Dict]:
+        """Dispatch shards to Celery workers and poll for their results."""
+        from app.worker import scan_shard
+
+        submitted = {
+            shard.key: (shard, scan_shard.delay(shard.to_dict()), 0) for shard in shards
+        }
+        while submitted:
+            for key, (shard, result, attempt) in list(submitted.items()):
+                if not result.ready():
+                    continue
+                del submitted[key]
+                if result.successful():
+                    yield result.get()
+                elif attempt < self.max_retries:
+                    logger.warning(f"Retrying shard {key} after error: {result.result}")
+                    submitted[key] = (shard, scan_shard.delay(shard.to_dict()), attempt + 1)
+                else:
+                    failed.append(self._failure(shard, result.result, attempt + 1))
+            if submitted:
+                time.sleep(0.5)
+
+    def _iter_futures(
+        self,
+        shards: List[ScanShard],
+        submit: Callable[[ScanShard], Future],
+        failed: List[Dict]
+    ) -> Iterator[Dict]:
+        """Wait on shard futures as they complete, resubmitting failures."""
+        pending = {submit(shard): (shard, 0) for shard in shards}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                shard, attempt = pending.pop(future)
+                error = future.exception()
+                if error is None:
+                    yield future.result()
+                elif attempt < self.max_retries:
+                    logger.warning(f"Retrying shard {shard.key} after error: {error}")
+                    pending[submit(shard)] = (shard, attempt + 1)
+                else:
+                    failed.append(self._failure(shard, error, attempt + 1))
+
+    def _failure(self, shard: ScanShard, error, attempts: int) -> Dict:
+        logger.error(f"Shard {shard.key} failed after {attempts} attempts: {error}")
+        return {'shard': shard.key, 'attempts': attempts, 'error': str(error)}
+
+    def run(
+        self,
+        regions: List[str],
+        utilization_store: Optional[UtilizationStore] = None
+    ) -> Tuple[List[Dict], List[Dict]]:
+        """Scan the given regions and return the merged recommendations plus failed shards.
+
+        The utilization each shard recorded is merged into utilization_store, and its snapshot
+        capture into the shared one, as shards finish.
+        """
+        failed: List[Dict] = []
+        results = []
+        snapshot = shared_snapshot(settings.SCAN_SNAPSHOT_MODE, settings.SCAN_SNAPSHOT_PATH)
+        for result in self.iter_results(self.plan(regions), failed):
+            if utilization_store is not None and result.get('utilization'):
+                utilization_store.merge(result.pop('utilization'))
+            if snapshot is not None and result.get('snapshot'):
+                snapshot.absorb(result.pop('snapshot'))
+            results.append(result)
+        if utilization_store is not None:
+            utilization_store.save()
+        return merge_shard_results(results), failed
@@ -0,0 +1,483 @@
+from bisect import bisect_right
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from zoneinfo import ZoneInfo
+import heapq
+import itertools
+import json
+import logging
+import time
+
+import boto3
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+RUNNING = 'running'
+STOPPED = 'stopped'
+
+DAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+# Holidays can hold a schedule in one state for a long time; look no further than this
+MAX_LOOKAHEAD_WEEKS = 53
+
+# Instance ids per StopInstances/StartInstances call
+ACTION_BATCH_SIZE = 500
+
+# Tag with a per-resource override: 'skip', or '<running|stopped>:<ISO 8601 time>' to hold a state until then
+OVERRIDE_TAG = 'cloudtrim:schedule-override'
+
+
+def _parse_days(spec: str) -> List[int]:
+    """Parse 'mon-fri', 'sat,sun' or '*' into weekday numbers (Monday is 0)."""
+    if spec.strip() == '*':
+        return list(range(7))
+    days = []
+    for part in spec.lower().split(','):
+        first, _, last = part.strip().partition('-')
+        start = DAYS.index(first[:3])
+        end = DAYS.index(last[:3]) if last else start
+        days.extend(DAYS.index(day) for day in (DAYS[(start + i) % 7] for i in range((end - start) % 7 + 1)))
+    return sorted(set(days))
+
+
+def _parse_minutes(value: str) -> int:
+    hours, _, minutes = value.partition(':')
+    return int(hours) * 60 + int(minutes or 0)
+
+
+def _weekly_intervals(windows: Iterable[Dict]) -> List[Tuple[int, int]]:
+    """Compile windows into sorted, merged [start, end) minute-of-week intervals.
+
+    Each window is {'days': 'mon-fri', 'start': '08:00', 'end': '19:00'}; a window ending
+    at or before its start runs past midnight into the next day.
+    """
+    intervals = []
+    for window in windows:
+        start = _parse_minutes(window['start'])
+        end = _parse_minutes(window['end'])
+        length = (end - start) % MINUTES_PER_DAY or MINUTES_PER_DAY
+        for day in _parse_days(window.get('days', '*')):
+            begin = day * MINUTES_PER_DAY + start
+            finish = begin + length
+            if finish <= MINUTES_PER_WEEK:
+                intervals.append((begin, finish))
+            else:
+                # Sunday night into Monday morning wraps to the start of the week
+                intervals.append((begin, MINUTES_PER_WEEK))
+                intervals.append((0, finish - MINUTES_PER_WEEK))
+
+    merged: List[Tuple[int, int]] = []
+    for begin, finish in sorted(intervals):
+        if merged and begin <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], finish))
+        else:
+            merged.append((begin, finish))
+    return merged
+
+
+class CompiledSchedule:
+    """Weekly running windows and holidays in one timezone, compiled for fast lookups.
+
+    Rules with the same timezone, windows and holidays share one compiled schedule, so
+    thousands of rules usually reduce to a handful of distinct transition timelines.
+    """
+
+    def __init__(self, timezone_name: str, intervals: List[Tuple[int, int]], holidays: Iterable[date]):
+        self.timezone_name = timezone_name
+        self.zone = ZoneInfo(timezone_name)
+        self.intervals = intervals
+        self.holidays: Set[date] = set(holidays)
+        self._starts = [begin for begin, _ in intervals]
+        self._ends = [finish for _, finish in intervals]
+        # Wall-clock minutes of the week at which the state can change
+        boundaries = set(self._starts) | set(self._ends)
+        if self.holidays:
+            boundaries |= set(range(0, MINUTES_PER_WEEK, MINUTES_PER_DAY))
+        self._boundaries = sorted(boundary % MINUTES_PER_WEEK for boundary in boundaries)
+
+    @property
+    def key(self) -> Tuple:
+        return (self.timezone_name, tuple(self.intervals), tuple(sorted(self.holidays)))
+
+    def _state_at_wall(self, wall: datetime) -> str:
+        if wall.date() in self.holidays:
+            return STOPPED
+        minute = wall.weekday() * MINUTES_PER_DAY + wall.hour * 60 + wall.minute
+        index = bisect_right(self._starts, minute) - 1
+        return RUNNING if index >= 0 and minute < self._ends[index] else STOPPED
+
+    def _boundaries_after(self, wall: datetime) -> Iterator[datetime]:
+        week_start = (wall - timedelta(days=wall.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+        for week in range(MAX_LOOKAHEAD_WEEKS + 1):
+            for minute in self._boundaries:
+                candidate = week_start + timedelta(weeks=week, minutes=minute)
+                if candidate > wall:
+                    yield candidate
+
+    def state_at(self, now: datetime) -> Tuple[str, Optional[datetime]]:
+        """Get the desired state at a UTC instant and the next UTC instant it changes, if any."""
+        wall = now.astimezone(self.zone).replace(tzinfo=None)
+        state = self._state_at_wall(wall)
+        for candidate in self._boundaries_after(wall):
+            if self._state_at_wall(candidate) != state:
+                transition = candidate.replace(tzinfo=self.zone).astimezone(timezone.utc)
+                # Wall times skipped by a DST change can map before now; the next boundary will do
+                if transition > now:
+                    return state, transition
+        return state, None
+
+
+class ScheduleRule:
+    """Run tag-matched resources inside weekly windows and stop them outside those windows and on holidays."""
+
+    __slots__ = ('name', 'selector', 'priority', 'schedule')
+
+    def __init__(self, name: str, selector: Dict[str, str], schedule: CompiledSchedule, priority: int = 0):
+        self.name = name
+        self.selector = selector
+        self.schedule = schedule
+        self.priority = priority
+
+    def matches(self, tags: Dict[str, str]) -> bool:
+        """Check whether every selector tag is present with its value ('*' matches any value)."""
+        return all(
+            key in tags and (value == '*' or tags[key] == value)
+            for key, value in self.selector.items()
+        )
+
+
+def load_rules(data: Dict) -> List[ScheduleRule]:
+    """Build rules from a schedule document, sharing compiled schedules between identical rules.
+
+    The document has 'rules' and optional named holiday calendars:
+    {"holidays": {"us": ["2026-12-25"]},
+     "rules": [{"name": "dev-office-hours", "selector": {"env": "dev"},
+                "timezone": "America/New_York", "holidays": "us", "priority": 0,
+                "windows": [{"days": "mon-fri", "start": "08:00", "end": "19:00"}]}]}
+    """
+    calendars = {
+        name: [date.fromisoformat(day) for day in days]
+        for name, days in data.get('holidays', {}).items()
+    }
+    schedules: Dict[Tuple, CompiledSchedule] = {}
+    rules = []
+    for spec in data.get('rules', []):
+        holidays = spec.get('holidays', [])
+        if isinstance(holidays, str):
+            holidays = calendars[holidays]
+        else:
+            holidays = [date.fromisoformat(day) if isinstance(day, str) else day for day in holidays]
+        schedule = CompiledSchedule(spec.get('timezone', 'UTC'), _weekly_intervals(spec['windows']), holidays)
+        schedule = schedules.setdefault(schedule.key, schedule)
+        rules.append(ScheduleRule(spec['name'], spec.get('selector', {}), schedule, spec.get('priority', 0)))
+    return rules
+
+
+def _parse_override(value: str) -> Optional[Tuple[Optional[str], Optional[datetime]]]:
+    """Parse an override tag into (state, until); (None, None) means never act on the resource."""
+    if value.strip().lower() == 'skip':
+        return None, None
+    state, _, until = value.partition(':')
+    if state not in (RUNNING, STOPPED) or not until:
+        return None
+    until_time = datetime.fromisoformat(until.replace('Z', '+00:00'))
+    if until_time.tzinfo is None:
+        until_time = until_time.replace(tzinfo=timezone.utc)
+    return state, until_time
+
+
+class ShutdownScheduler:
+    """Evaluate schedule rules against a fleet, touching only resources whose state must change.
+
+    load_fleet matches each resource to its highest-priority rule once and groups resources
+    by compiled schedule. A heap holds each schedule's next transition time, so a tick pops
+    only the schedules (and expiring overrides) that are due and returns start/stop actions
+    for their members that aren't already in the desired state. Everything else costs nothing.
+    """
+
+    def __init__(self, rules: List[ScheduleRule]):
+        # Best rule first: highest priority, then name for a stable tie-break
+        self.rules = sorted(rules, key=lambda rule: (-rule.priority, rule.name))
+        self._rank = {id(rule): rank for rank, rule in enumerate(self.rules)}
+        # Rules indexed by one of their selector tags, so matching looks at a few candidates
+        self._index: Dict[Tuple[str, str], List[ScheduleRule]] = {}
+        self._match_all: List[ScheduleRule] = []
+        for rule in self.rules:
+            if not rule.selector:
+                self._match_all.append(rule)
+                continue
+            key, value = min(rule.selector.items(), key=lambda item: item[1] == '*')
+            self._index.setdefault((key, value), []).append(rule)
+
+        self._resources: Dict[str, Dict] = {}
+        self._members: Dict[Tuple, Set[str]] = {}
+        self._schedules: Dict[Tuple, CompiledSchedule] = {}
+        self._desired: Dict[Tuple, str] = {}
+        self._overrides: Dict[str, Tuple[Optional[str], Optional[datetime]]] = {}
+        self._heap: List[Tuple[datetime, int, str, object]] = []
+        self._sequence = itertools.count()
+
+    def rule_for(self, tags: Dict[str, str]) -> Optional[ScheduleRule]:
+        """Get the highest-priority rule matching a resource's tags."""
+        candidates = list(self._match_all)
+        for key, value in tags.items():
+            candidates.extend(self._index.get((key, value), ()))
+            candidates.extend(self._index.get((key, '*'), ()))
+        candidates.sort(key=lambda rule: self._rank[id(rule)])
+        return next((rule for rule in candidates if rule.matches(tags)), None)
+
+    def load_fleet(self, resources: Iterable[Dict], now: datetime) -> None:
+        """Replace the fleet: dicts with resource_id, region, state and tags.
+
+        Per-resource overrides are read from the OVERRIDE_TAG tag; overrides set with
+        set_override survive a reload until they expire.
+        """
+        self._resources = {}
+        self._members = {}
+        self._heap = []
+        manual = {rid: override for rid, override in self._overrides.items() if override[1] is not None}
+        self._overrides = {}
+
+        for resource in resources:
+            rule = self.rule_for(resource.get('tags', {}))
+            if rule is None:
+                continue
+            key = rule.schedule.key
+            self._schedules[key] = rule.schedule
+            self._members.setdefault(key, set()).add(resource['resource_id'])
+            self._resources[resource['resource_id']] = {
+                'region': resource.get('region'),
+                'state': resource.get('state'),
+                'schedule': key,
+                'rule': rule.name,
+            }
+            tag = resource.get('tags', {}).get(OVERRIDE_TAG)
+            override = _parse_override(tag) if tag else None
+            if override is not None:
+                self._overrides[resource['resource_id']] = override
+
+        for resource_id, override in manual.items():
+            if resource_id in self._resources and resource_id not in self._overrides:
+                self._overrides[resource_id] = override
+
+        for key in self._members:
+            state, transition = self._schedules[key].state_at(now)
+            self._desired[key] = state
+            if transition is not None:
+                heapq.heappush(self._heap, (transition, next(self._sequence), 'schedule', key))
+        for resource_id, (_, until) in self._overrides.items():
+            if until is not None:
+                heapq.heappush(self._heap, (until, next(self._sequence), 'override', resource_id))
+
+    def set_override(self, resource_id: str, state: str, until: datetime) -> None:
+        """Hold a resource in a state until a time, after which its schedule applies again."""
+        self._overrides[resource_id] = (state, until)
+        heapq.heappush(self._heap, (until, next(self._sequence), 'override', resource_id))
+
+    def carry_overrides(self, previous: 'ShutdownScheduler') -> None:
+        """Take over the overrides set with set_override on a scheduler this one replaces."""
+        for resource_id, (state, until) in previous._overrides.items():
+            if until is not None:
+                self.set_override(resource_id, state, until)
+
+    def desired_state(self, resource_id: str, now: datetime) -> Optional[str]:
+        """The state a resource should be in, or None if nothing should act on it."""
+        resource = self._resources.get(resource_id)
+        if resource is None:
+            return None
+        override = self._overrides.get(resource_id)
+        if override is not None:
+            state, until = override
+            if until is None:
+                return None
+            if until > now:
+                return state
+        return self._desired[resource['schedule']]
+
+    def reconcile(self, now: datetime) -> List[Dict]:
+        """Actions for every resource not in its desired state, e.g. after loading a fleet."""
+        return self._actions(self._resources, now)
+
+    def tick(self, now: datetime) -> List[Dict]:
+        """Advance to now and return the actions for the schedules and overrides that became due."""
+        touched: Set[str] = set()
+        while self._heap and self._heap[0][0] <= now:
+            _, _, kind, key = heapq.heappop(self._heap)
+            if kind == 'schedule':
+                if key not in self._members:
+                    continue
+                state, transition = self._schedules[key].state_at(now)
+                self._desired[key] = state
+                if transition is not None:
+                    heapq.heappush(self._heap, (transition, next(self._sequence), 'schedule', key))
+                touched |= self._members[key]
+            else:
+                override = self._overrides.get(key)
+                if override is not None and override[1] is not None and override[1] <= now:
+                    del self._overrides[key]
+                    touched.add(key)
+        return self._actions(touched, now)
+
+    def next_transition(self) -> Optional[datetime]:
+        return self._heap[0][0] if self._heap else None
+
+    def _actions(self, resource_ids: Iterable[str], now: datetime) -> List[Dict]:
+        actions = []
+        for resource_id in resource_ids:
+            resource = self._resources.get(resource_id)
+            desired = self.desired_state(resource_id, now)
+            # Pending, stopping and other transitional states are left for the next reconcile
+            if resource is None or desired is None or resource['state'] not in (RUNNING, STOPPED):
+                continue
+            if resource['state'] != desired:
+                actions.append({
+                    'resource_id': resource_id,
+                    'region': resource['region'],
+                    'action': 'start' if desired == RUNNING else 'stop',
+                    'rule': resource['rule'],
+                })
+                # Assume success; failures are picked up by the next inventory reconcile
+                resource['state'] = desired
+        return actions
+
+
+def apply_actions(
+    actions: List[Dict],
+    client_for_region: Callable[[str], object],
+    dry_run: bool = False,
+    batch_size: int = ACTION_BATCH_SIZE
+) -> Dict:
+    """Send start/stop actions as multi-instance StartInstances/StopInstances calls per region.
+
+    A failed batch is retried one instance at a time so a single bad id (already
+    terminated, wrong state) doesn't hold back the rest.
+    """
+    groups: Dict[Tuple[str, str], List[str]] = {}
+    for action in actions:
+        groups.setdefault((action['region'], action['action']), []).append(action['resource_id'])
+
+    result = {'started': 0, 'stopped': 0, 'failed': [], 'calls': 0}
+    for (region, action), instance_ids in sorted(groups.items()):
+        if dry_run:
+            logger.info(f"Dry run: would {action} {len(instance_ids)} instances in {region}")
+            continue
+        client = client_for_region(region)
+        call = client.start_instances if action == 'start' else client.stop_instances
+        counter = 'started' if action == 'start' else 'stopped'
+        for i in range(0, len(instance_ids), batch_size):
+            batch = instance_ids[i:i + batch_size]
+            result['calls'] += 1
+            try:
+                call(InstanceIds=batch)
+                result[counter] += len(batch)
+                continue
+            except ClientError as e:
+                logger.warning(f"Batch {action} of {len(batch)} instances in {region} failed, retrying individually: {str(e)}")
+            for instance_id in batch:
+                result['calls'] += 1
+                try:
+                    call(InstanceIds=[instance_id])
+                    result[counter] += 1
+                except ClientError as e:
+                    logger.error(f"Could not {action} {instance_id} in {region}: {str(e)}")
+                    result['failed'].append(instance_id)
+    return result
+
+
+def list_schedulable_instances(client, region: str) -> List[Dict]:
+    """List running and stopped EC2 instances in a region with their tags."""
+    instances = []
+    paginator = client.get_paginator('describe_instances')
+    for page in paginator.paginate(Filters=[{'Name': 'instance-state-name', 'Values': [RUNNING, STOPPED]}]):
+        for reservation in page['Reservations']:
+            for instance in reservation['Instances']:
+                instances.append({
+                    'resource_id': instance['InstanceId'],
+                    'region': region,
+                    'state': instance['State']['Name'],
+                    'tags': {tag['Key']: tag['Value'] for tag in instance.get('Tags', [])},
+                })
+    return instances
+
+
+class ShutdownRunner:
+    """Keep a ShutdownScheduler loaded with the rules file and a periodically refreshed EC2 inventory.
+
+    run_once is meant to be called every minute (see the cloudtrim.shutdown_tick Celery task).
+    Between inventory refreshes a tick costs a heap peek plus work for due transitions.
+    """
+
+    def __init__(
+        self,
+        rules_path: str,
+        regions: Optional[List[str]] = None,
+        session: Optional[boto3.Session] = None,
+        inventory_refresh_seconds: float = 900,
+        dry_run: bool = True
+    ):
+        self.rules_path = rules_path
+        self.session = session or boto3.Session()
+        self.regions = regions
+        self.inventory_refresh_seconds = inventory_refresh_seconds
+        self.dry_run = dry_run
+        self.scheduler: Optional[ShutdownScheduler] = None
+        self._loaded_at = 0.0
+        self._clients: Dict[str, object] = {}
+
+    def _client(self, region: str):
+        if region not in self._clients:
+            self._clients[region] = self.session.client('ec2', region_name=region)
+        return self._clients[region]
+
+    def _regions(self) -> List[str]:
+        if not self.regions:
+            response = self.session.client('ec2').describe_regions(
+                Filters=[{'Name': 'opt-in-status', 'Values': ['opt-in-not-required', 'opted-in']}]
+            )
+            self.regions = sorted(region['RegionName'] for region in response['Regions'])
+        return self.regions
+
+    def refresh(self, now: datetime) -> List[Dict]:
+        """Reload the rules and inventory, returning the actions that bring the fleet in line."""
+        with open(self.rules_path) as f:
+            rules = load_rules(json.load(f))
+        previous = self.scheduler
+        self.scheduler = ShutdownScheduler(rules)
+        if previous is not None:
+            # Keep manual overrides across reloads
+            self.scheduler.carry_overrides(previous)
+        fleet = [
+            instance for region in self._regions()
+            for instance in list_schedulable_instances(self._client(region), region)
+        ]
+        self.scheduler.load_fleet(fleet, now)
+        self._loaded_at = time.monotonic()
+        logger.info(f"Loaded {len(rules)} schedule rules for {len(fleet)} instances")
+        return self.scheduler.reconcile(now)
+
+    def set_override(self, resource_id: str, state: str, until: datetime, now: Optional[datetime] = None) -> Dict:
+        """Hold an instance in a state until a time and act on it right away."""
+        if state not in (RUNNING, STOPPED):
+            raise ValueError(f"Override state must be {RUNNING} or {STOPPED}")
+        now = now or datetime.now(timezone.utc)
+        if self.scheduler is None:
+            self.run_once(now)
+        self.scheduler.set_override(resource_id, state, until)
+        actions = self.scheduler.reconcile(now)
+        result = apply_actions(actions, self._client, dry_run=self.dry_run)
+        result['actions'] = len(actions)
+        return result
+
+    def run_once(self, now: Optional[datetime] = None) -> Dict:
+        now = now or datetime.now(timezone.utc)
+        if self.scheduler is None or time.monotonic() - self._loaded_at >= self.inventory_refresh_seconds:
+            actions = self.refresh(now)
+        else:
+            actions = self.scheduler.tick(now)
+        result = apply_actions(actions, self._client, dry_run=self.dry_run)
+        result['actions'] = len(actions)
+        next_transition = self.scheduler.next_transition()
+        result['next_transition'] = next_transition.isoformat() if next_transition else None
+        return result
@@ -0,0 +1,177 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+import re
+import warnings
+
+import numpy as np
+
+from app.services.utilization_store import UtilizationStore, _epoch_hour
+
+# Most points a chart series may request
+MAX_POINTS = 2000
+# Most resources returned as separate series when not aggregating
+MAX_SERIES = 20
+# Matrix cells built at once when aggregating across resources; bounds memory for long ranges
+BLOCK_CELLS = 4_000_000
+AGGREGATES = ('mean', 'sum', 'min', 'max')
+_PERCENTILE = re.compile(r'^p(\d{1,2}(?:\.\d+)?)$')
+
+
+def lttb(x: np.ndarray, y: np.ndarray, points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Downsample with Largest-Triangle-Three-Buckets, which keeps a series' visual shape.
+
+    The first and last points are kept; every bucket in between contributes the point
+    forming the largest triangle with the previously kept point and the next bucket's
+    average. Each bucket is one vectorized step.
+    """
+    n = len(x)
+    if points >= n or points < 3:
+        return x, y
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+    x_sums = np.concatenate([[0.0], np.cumsum(x, dtype=np.float64)])
+    y_sums = np.concatenate([[0.0], np.cumsum(y, dtype=np.float64)])
+    counts = ends - starts
+    # The last bucket looks ahead to the final point instead of a bucket average
+    next_x = np.append(((x_sums[ends] - x_sums[starts]) / counts)[1:], x[-1])
+    next_y = np.append(((y_sums[ends] - y_sums[starts]) / counts)[1:], y[-1])
+
+    selected = np.empty(points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    anchor = 0
+    for bucket, (start, end) in enumerate(zip(starts.tolist(), ends.tolist())):
+        area = np.abs(
+            (x[anchor] - next_x[bucket]) * (y[start:end] - y[anchor])
+            - (x[anchor] - x[start:end]) * (next_y[bucket] - y[anchor])
+        )
+        anchor = start + int(np.argmax(area))
+        selected[bucket + 1] = anchor
+    return x[selected], y[selected]
+
+
+def minmax(x: np.ndarray, y: np.ndarray, points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Downsample to the minimum and maximum of equal-width time buckets, which keeps every spike."""
+    n = len(x)
+    if points >= n or points < 2:
+        return x, y
+    buckets = points // 2
+    span = x[-1] - x[0] + 1
+    bucket = ((x - x[0]) * buckets // span).astype(np.int64)
+    order = np.lexsort((y, bucket))
+    firsts = np.searchsorted(bucket[order], np.unique(bucket))
+    lasts = np.append(firsts[1:], n) - 1
+    selected = np.unique(np.concatenate([order[firsts], order[lasts]]))
+    return x[selected], y[selected]
+
+
+DOWNSAMPLERS = {'lttb': lttb, 'minmax': minmax}
+
+
+def _reducer(aggregate: str):
+    """Get a function reducing a (resources x hours) block to one value per hour."""
+    if aggregate == 'mean':
+        return lambda block: np.nanmean(block, axis=0)
+    if aggregate == 'sum':
+        # All-NaN hours stay NaN instead of summing to 0
+        return lambda block: np.where(np.isnan(block).all(axis=0), np.nan, np.nansum(block, axis=0))
+    if aggregate == 'min':
+        return lambda block: np.nanmin(block, axis=0)
+    if aggregate == 'max':
+        return lambda block: np.nanmax(block, axis=0)
+    match = _PERCENTILE.match(aggregate)
+    if match and 0 < float(match.group(1)) < 100:
+        percentile = float(match.group(1))
+        return lambda block: np.nanpercentile(block, percentile, axis=0)
+    raise ValueError(f"Unknown aggregate: {aggregate}; use {', '.join(AGGREGATES)}, none or a percentile such as p95")
+
+
+def _hour_datetime(hour: int) -> datetime:
+    return datetime.fromtimestamp(hour * 3600, tz=timezone.utc)
+
+
+def _series(name: str, hours: np.ndarray, values: np.ndarray, points: int, method: str) -> Dict:
+    """Drop hours without data, downsample, and encode as compact parallel lists."""
+    present = ~np.isnan(values)
+    x, y = DOWNSAMPLERS[method](hours[present].astype(np.float64), values[present].astype(np.float64), points)
+    return {
+        'name': name,
+        'timestamps': (x * 3600).astype(np.int64).tolist(),
+        'values': np.round(y, 2).tolist(),
+    }
+
+
+def query_series(
+    store: UtilizationStore,
+    metric: str,
+    resource_ids: Optional[Sequence[str]] = None,
+    resource_type: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    aggregate: str = 'mean',
+    points: int = 300,
+    method: str = 'lttb'
+) -> Dict:
+    """Query a chart-ready time series of a metric over resources and a time range.
+
+    With an aggregate, the resources are reduced to one fleet-wide series hour by hour,
+    in blocks of hours so year-long ranges over large fleets stay within BLOCK_CELLS.
+    With aggregate 'none', each resource (up to MAX_SERIES) gets its own series. Every
+    series is downsampled to at most `points` points.
+    """
+    if method not in DOWNSAMPLERS:
+        raise ValueError(f"Unknown downsampling method: {method}; use {', '.join(DOWNSAMPLERS)}")
+    if not 3 <= points <= MAX_POINTS:
+        raise ValueError(f"points must be between 3 and {MAX_POINTS}")
+    reduce = None if aggregate == 'none' else _reducer(aggregate)
+
+    ids = store.resource_ids(metric, resource_type)
+    if resource_ids:
+        typed = set(ids)
+        ids = [rid for rid in resource_ids if rid in typed]
+    if reduce is None and len(ids) > MAX_SERIES:
+        raise ValueError(f"At most {MAX_SERIES} resources can be charted without an aggregate")
+
+    result = {
+        'metric': metric,
+        'aggregate': aggregate,
+        'method': method,
+        'start': start,
+        'end': end,
+        'resources': 0,
+        'hours': 0,
+        'series': [],
+    }
+    bounds = store.time_range(metric, ids)
+    if bounds is None:
+        return result
+    first = max(bounds[0], _epoch_hour(start)) if start else bounds[0]
+    last = min(bounds[1], _epoch_hour(end)) if end else bounds[1]
+    if first > last:
+        return result
+    result.update({'start': _hour_datetime(first), 'end': _hour_datetime(last), 'hours': last - first + 1})
+
+    if reduce is None:
+        found, hours, values = store.matrix(metric, ids, _hour_datetime(first), _hour_datetime(last))
+        result['resources'] = len(found)
+        result['series'] = [_series(rid, hours, row, points, method) for rid, row in zip(found, values)]
+        return result
+
+    block_hours = max(1, BLOCK_CELLS // max(len(ids), 1))
+    hour_parts: List[np.ndarray] = []
+    value_parts: List[np.ndarray] = []
+    reporting = set()
+    with warnings.catch_warnings():
+        # Hours where no resource reported reduce to NaN, with a warning per call
+        warnings.simplefilter('ignore', RuntimeWarning)
+        for block_start in range(first, last + 1, block_hours):
+            block_end = min(block_start + block_hours - 1, last)
+            found, hours, values = store.matrix(metric, ids, _hour_datetime(block_start), _hour_datetime(block_end))
+            if not len(found):
+                continue
+            reporting.update(np.asarray(found)[~np.isnan(values).all(axis=1)].tolist())
+            hour_parts.append(hours)
+            value_parts.append(reduce(values))
+    result['resources'] = len(reporting)
+    if hour_parts:
+        result['series'] = [_series(aggregate, np.concatenate(hour_parts), np.concatenate(value_parts), points, method)]
+    return result
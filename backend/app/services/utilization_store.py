@@ -0,0 +1,201 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+import json
+import os
+import threading
+import numpy as np
+
+class UtilizationStore:
+    """Hourly utilization history per resource and metric.
+
+    Each (metric, resource) series is a pair of sorted numpy arrays: epoch hours and values.
+    Scans record the datapoints they already fetch, so policies can later be evaluated
+    against the whole fleet's history without calling the cloud APIs again.
+    """
+
+    def __init__(self, retention_hours: int = 24 * 90, path: Optional[str] = None):
+        self.retention_hours = retention_hours
+        self.path = path
+        self._series: Dict[str, Dict[str, Tuple[np.ndarray, np.ndarray]]] = {}
+        self._resources: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        # Incremented on every change, so query results can be cached by version
+        self.version = 0
+        if path and os.path.exists(path):
+            self.load()
+
+    def record(
+        self,
+        resource_id: str,
+        metric: str,
+        timestamps: Sequence[datetime],
+        values: Sequence[float],
+        resource_type: Optional[str] = None,
+        monthly_cost: Optional[float] = None
+    ) -> None:
+        """Record hourly datapoints for a resource, replacing any existing values for the same hours."""
+        if resource_type is not None or monthly_cost is not None:
+            self.set_resource(resource_id, resource_type, monthly_cost)
+        if not len(timestamps):
+            return
+
+        hours = np.fromiter((_epoch_hour(ts) for ts in timestamps), dtype=np.int64, count=len(timestamps))
+        with self._lock:
+            self._merge_series(metric, resource_id, hours, np.asarray(values, dtype=np.float32))
+
+    def _merge_series(self, metric: str, resource_id: str, hours: np.ndarray, new_values: np.ndarray) -> None:
+        """Merge hourly values into a series; call with the lock held."""
+        series = self._series.setdefault(metric, {})
+        if resource_id in series:
+            old_hours, old_values = series[resource_id]
+            hours = np.concatenate([hours, old_hours])
+            new_values = np.concatenate([new_values, old_values])
+
+        # np.unique keeps the first occurrence, so newly recorded values win
+        hours, index = np.unique(hours, return_index=True)
+        new_values = new_values[index]
+
+        keep = hours >= hours[-1] - self.retention_hours
+        series[resource_id] = (hours[keep], new_values[keep])
+        self.version += 1
+
+    def set_resource(self, resource_id: str, resource_type: Optional[str] = None, monthly_cost: Optional[float] = None) -> None:
+        """Record metadata used to price policies for a resource."""
+        with self._lock:
+            resource = self._resources.setdefault(resource_id, {'resource_type': None, 'monthly_cost': 0.0})
+            if resource_type is not None:
+                resource['resource_type'] = resource_type
+            if monthly_cost is not None:
+                resource['monthly_cost'] = float(monthly_cost)
+
+    def resource_ids(self, metric: str, resource_type: Optional[str] = None) -> List[str]:
+        """Get the ids of resources with history for a metric."""
+        with self._lock:
+            ids = sorted(self._series.get(metric, {}))
+            if resource_type is None:
+                return ids
+            return [rid for rid in ids if self._resources.get(rid, {}).get('resource_type') == resource_type]
+
+    def monthly_costs(self, resource_ids: Sequence[str]) -> np.ndarray:
+        """Get the estimated monthly cost of each resource, 0 where unknown."""
+        with self._lock:
+            return np.array(
+                [self._resources.get(rid, {}).get('monthly_cost', 0.0) for rid in resource_ids],
+                dtype=np.float64
+            )
+
+    def estimated_costs(self) -> Dict[str, float]:
+        """Get the estimated monthly cost of every resource with a known cost."""
+        with self._lock:
+            return {rid: resource['monthly_cost'] for rid, resource in self._resources.items() if resource['monthly_cost']}
+
+    def time_range(self, metric: str, resource_ids: Optional[Sequence[str]] = None) -> Optional[Tuple[int, int]]:
+        """Get the first and last epoch hour with data for a metric, or None without data."""
+        with self._lock:
+            series = self._series.get(metric, {})
+            ids = [rid for rid in (series if resource_ids is None else resource_ids) if rid in series]
+            if not ids:
+                return None
+            return min(int(series[rid][0][0]) for rid in ids), max(int(series[rid][0][-1]) for rid in ids)
+
+    def matrix(
+        self,
+        metric: str,
+        resource_ids: Optional[Sequence[str]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """Get a dense (resources x hours) matrix of a metric, with NaN where there is no data.
+
+        Returns the resource ids, the epoch hour of each column and the matrix.
+        """
+        with self._lock:
+            series = self._series.get(metric, {})
+            ids = sorted(series) if resource_ids is None else [rid for rid in resource_ids if rid in series]
+            if not ids:
+                return [], np.zeros(0, dtype=np.int64), np.zeros((0, 0), dtype=np.float32)
+
+            first = _epoch_hour(start) if start else min(int(series[rid][0][0]) for rid in ids)
+            last = _epoch_hour(end) if end else max(int(series[rid][0][-1]) for rid in ids)
+            hours = np.arange(first, last + 1, dtype=np.int64)
+            values = np.full((len(ids), len(hours)), np.nan, dtype=np.float32)
+
+            for row, rid in enumerate(ids):
+                series_hours, series_values = series[rid]
+                mask = (series_hours >= first) & (series_hours <= last)
+                values[row, series_hours[mask] - first] = series_values[mask]
+
+        return ids, hours, values
+
+    def export(self) -> Dict:
+        """Get every series and resource as JSON-serializable data, for merge() in another process."""
+        with self._lock:
+            return {
+                'series': {
+                    metric: {rid: [hours.tolist(), values.tolist()] for rid, (hours, values) in series.items()}
+                    for metric, series in self._series.items()
+                },
+                'resources': {rid: dict(resource) for rid, resource in self._resources.items()},
+            }
+
+    def merge(self, data: Dict) -> None:
+        """Merge series and resources exported by another store; the merged values win."""
+        with self._lock:
+            for metric, series in data.get('series', {}).items():
+                for rid, (hours, values) in series.items():
+                    if hours:
+                        self._merge_series(metric, rid, np.asarray(hours, dtype=np.int64), np.asarray(values, dtype=np.float32))
+        for rid, resource in data.get('resources', {}).items():
+            self.set_resource(rid, resource.get('resource_type'), resource.get('monthly_cost'))
+
+    def save(self) -> None:
+        """Persist the store to its path as a compressed numpy archive.
+
+        All series are concatenated into flat arrays with an offset index, so saving and
+        loading stay a handful of array operations regardless of fleet size.
+        """
+        if not self.path:
+            return
+        with self._lock:
+            index = []
+            hours_parts = []
+            values_parts = []
+            for metric, series in self._series.items():
+                for rid, (hours, values) in series.items():
+                    index.append([metric, rid, len(hours)])
+                    hours_parts.append(hours)
+                    values_parts.append(values)
+            meta = json.dumps({'index': index, 'resources': self._resources})
+
+        tmp_path = f"{self.path}.tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            meta=np.array(meta),
+            hours=np.concatenate(hours_parts) if hours_parts else np.zeros(0, dtype=np.int64),
+            values=np.concatenate(values_parts) if values_parts else np.zeros(0, dtype=np.float32)
+        )
+        os.replace(tmp_path, self.path)
+
+    def load(self) -> None:
+        """Load the store from its path."""
+        with np.load(self.path) as archive:
+            meta = json.loads(str(archive['meta']))
+            hours = archive['hours']
+            values = archive['values']
+
+        series: Dict[str, Dict[str, Tuple[np.ndarray, np.ndarray]]] = {}
+        offset = 0
+        for metric, rid, length in meta['index']:
+            series.setdefault(metric, {})[rid] = (hours[offset:offset + length], values[offset:offset + length])
+            offset += length
+        with self._lock:
+            self._series = series
+            self._resources = meta['resources']
+            self.version += 1
+
+def _epoch_hour(ts: datetime) -> int:
+    """Convert a timestamp to hours since the epoch, treating naive timestamps as UTC."""
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return int(ts.timestamp() // 3600)
+
@@ -0,0 +1,72 @@
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from celery import Celery
+
+from app.core.config import Settings
+from app.services.scan_coordinator import run_shard
+from app.services.shutdown_scheduler import ShutdownRunner
+
+settings = Settings()
+
+celery_app = Celery(
+    'cloudtrim',
+    broker=settings.CELERY_BROKER_URL,
+    backend=settings.CELERY_RESULT_BACKEND
+)
+celery_app.conf.update(
+    task_serializer='json',
+    result_serializer='json',
+    accept_content=['json'],
+    # Shards are long and uneven; don't let one worker hoard queued shards
+    worker_prefetch_multiplier=1,
+    task_acks_late=True,
+    # Shutdown tasks share one in-memory ShutdownRunner, so they go to a queue served by a
+    # single worker process: celery -A app.worker worker -Q shutdown --concurrency 1
+    task_routes={
+        'cloudtrim.shutdown_tick': {'queue': 'shutdown'},
+        'cloudtrim.shutdown_override': {'queue': 'shutdown'},
+    }
+)
+
+@celery_app.task(name='cloudtrim.scan_shard')
+def scan_shard(shard: Dict) -> Dict:
+    """Scan one shard on a worker node. Retries are driven by the ScanCoordinator."""
+    return run_shard(shard)
+
+if settings.SHUTDOWN_SCHEDULES_PATH:
+    celery_app.conf.beat_schedule = {
+        'shutdown-tick': {
+            'task': 'cloudtrim.shutdown_tick',
+            'schedule': settings.SHUTDOWN_TICK_SECONDS,
+        }
+    }
+
+# One engine in the shutdown queue's single worker process; it keeps compiled rules,
+# the fleet and manual overrides between ticks
+_shutdown_runner: Optional[ShutdownRunner] = None
+
+def _get_shutdown_runner() -> ShutdownRunner:
+    global _shutdown_runner
+    if _shutdown_runner is None:
+        regions = [region.strip() for region in settings.SHUTDOWN_REGIONS.split(',') if region.strip()]
+        _shutdown_runner = ShutdownRunner(
+            settings.SHUTDOWN_SCHEDULES_PATH,
+            regions=regions or None,
+            inventory_refresh_seconds=settings.SHUTDOWN_INVENTORY_REFRESH_SECONDS,
+            dry_run=settings.SHUTDOWN_DRY_RUN
+        )
+    return _shutdown_runner
+
+@celery_app.task(name='cloudtrim.shutdown_tick', ignore_result=True)
+def shutdown_tick() -> Dict:
+    """Start and stop scheduled instances whose window opened or closed since the last tick."""
+    return _get_shutdown_runner().run_once()
+
+@celery_app.task(name='cloudtrim.shutdown_override')
+def shutdown_override(resource_id: str, state: str, until: str) -> Dict:
+    """Hold an instance running or stopped until an ISO 8601 time, then hand it back to its schedule."""
+    until_time = datetime.fromisoformat(until.replace('Z', '+00:00'))
+    if until_time.tzinfo is None:
+        until_time = until_time.replace(tzinfo=timezone.utc)
+    return _get_shutdown_runner().set_override(resource_id, state, until_time)
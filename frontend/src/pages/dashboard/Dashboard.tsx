@@ -148,12 +148,17 @@ const Dashboard: React.FC = () => {
     const fetchDashboardData = async () => {
       try {
         setIsLoading(true);
-        const [costs, resources] = await Promise.all([
-          apiService.getCurrentCosts(),
-          apiService.getResourceUtilization(),
-        ]);
-        setCostData(costs);
-        setUtilization(resources);
+        const summary = await apiService.getDashboardSummary();
+        setCostData(summary.costs);
+        if (summary.utilization) {
+          setUtilization({
+            cpu_usage: summary.utilization.cpu_usage ?? 0,
+            memory_usage: summary.utilization.memory_usage ?? 0,
+            storage_usage: summary.utilization.storage_usage ?? 0,
+            total_memory: summary.utilization.total_memory ?? 100,
+            total_storage: summary.utilization.total_storage ?? 100,
+          });
+        }
       } catch (err) {
         setError('Failed to fetch dashboard data');
         console.error('Dashboard data fetch error:', err);
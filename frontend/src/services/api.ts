@@ -35,6 +35,14 @@ export interface OptimizationRecommendation {
   automated: boolean;
 }
 
+export interface RecommendationChanges {
+  version: string;
+  since: string;
+  added: OptimizationRecommendation[];
+  changed: OptimizationRecommendation[];
+  removed: string[];
+}
+
 export interface ResourceUtilization {
   cpu_usage: number;
   memory_usage: number;
@@ -43,6 +51,54 @@ export interface ResourceUtilization {
   total_storage: number;
 }
 
+export interface UtilizationSeriesQuery {
+  metric?: string;
+  resource_id?: string[];
+  resource_type?: string;
+  start?: string;
+  end?: string;
+  days?: number;
+  // mean | sum | min | max | none, or a percentile such as p95
+  aggregate?: string;
+  points?: number;
+  method?: 'lttb' | 'minmax';
+}
+
+export interface UtilizationSeries {
+  metric: string;
+  aggregate: string;
+  method: string;
+  start: string | null;
+  end: string | null;
+  resources: number;
+  hours: number;
+  // Timestamps are epoch seconds, parallel to values
+  series: { name: string; timestamps: number[]; values: number[] }[];
+}
+
+export interface DashboardSummary {
+  generated_at: string;
+  costs: CostAnalysis | null;
+  savings: {
+    total_potential_savings: number;
+    recommendations_count: number;
+    breakdown_by_service: Record<string, number>;
+    implementation_timeline: Record<string, number>;
+  } | null;
+  top_recommendations: Record<string, any>[];
+  underutilized: Record<string, any>[];
+  underutilized_count: number;
+  utilization: {
+    cpu_usage: number | null;
+    memory_usage: number | null;
+    storage_usage: number | null;
+    total_memory: number | null;
+    total_storage: number | null;
+    resources_reporting: number;
+  } | null;
+  errors: Record<string, string>;
+}
+
 export const apiService = {
   // Auth endpoints
   login: async (credentials: { email: string; password: string }) => {
@@ -50,6 +106,12 @@ export const apiService = {
     return response.data;
   },
 
+  // Every dashboard panel in one round-trip
+  getDashboardSummary: async (): Promise<DashboardSummary> => {
+    const response = await api.get('/dashboard');
+    return response.data;
+  },
+
   // Cost analysis endpoints
   getCurrentCosts: async (): Promise<CostAnalysis> => {
     const response = await api.get('/costs/current');
@@ -67,6 +129,16 @@ export const apiService = {
     return response.data;
   },
 
+  // Only the recommendations added, changed or removed since an earlier full response's ETag
+  // or an earlier delta's version. Falls back to the full list when the server no longer
+  // knows that version.
+  getOptimizationRecommendationChanges: async (
+    since: string
+  ): Promise<RecommendationChanges | OptimizationRecommendation[]> => {
+    const response = await api.get('/optimization/recommendations', { params: { since } });
+    return response.data;
+  },
+
   getUnderutilizedResources: async () => {
     const response = await api.get('/optimization/underutilized');
     return response.data;
@@ -83,6 +155,15 @@ export const apiService = {
     return response.data;
   },
 
+  // Downsampled server-side, so year-long ranges stay a few KB
+  getUtilizationSeries: async (query: UtilizationSeriesQuery = {}): Promise<UtilizationSeries> => {
+    const response = await api.get('/resources/utilization/series', {
+      params: query,
+      paramsSerializer: { indexes: null },
+    });
+    return response.data;
+  },
+
   // Health check
   healthCheck: async () => {
     const response = await api.get('/health');
@@ -0,0 +1,333 @@
+"""Drive a mixed endpoint workload at target request rates and report latency, throughput and server health.
+
+Starts loadtest/server.py in a subprocess (so the load generator doesn't share the
+server's GIL or event loop), warms it up, then runs each rate step open-loop: requests
+are sent on a fixed schedule whether or not earlier ones have finished, and latency is
+measured from each request's scheduled send time so a stalled server can't hide its
+queueing delay. With --baseline, the run fails when it regresses against an earlier
+--output file.
+
+    python loadtest/run.py --target backend --rps 50,100,200 --duration 30 --output baseline.json
+    python loadtest/run.py --target backend --rps 50,100,200 --duration 30 --baseline baseline.json
+"""
+from typing import Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+from jose import jwt
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Endpoint weights of the default workload per target
+WORKLOADS = {
+    'app': {
+        '/optimize/all': 3,
+        '/optimize/aws': 2,
+        '/costs/all': 2,
+        '/costs/aws': 1,
+        '/metrics/coalescing': 1,
+    },
+    'backend': {
+        '/api/v1/optimization/recommendations': 3,
+        '/api/v1/costs/historical?days=30': 2,
+        '/api/v1/costs/current': 1,
+        '/api/v1/dashboard': 2,
+        '/api/v1/resources/underutilized': 1,
+        '/api/v1/savings/forecast': 1,
+        '/api/v1/health': 1,
+    },
+}
+
+# Relative regressions beyond --tolerance fail the baseline comparison, unless the
+# absolute change is below the noise floor
+COMPARED_METRICS = {
+    # name: (path in the result, higher is worse, noise floor)
+    'p50_ms': (('overall', 'p50_ms'), True, 2.0),
+    'p95_ms': (('overall', 'p95_ms'), True, 5.0),
+    'p99_ms': (('overall', 'p99_ms'), True, 10.0),
+    'throughput_rps': (('overall', 'throughput_rps'), False, 1.0),
+    'error_rate': (('overall', 'error_rate'), True, 0.005),
+    'loop_lag_p99_ms': (('server', 'loop_lag_ms', 'p99'), True, 5.0),
+    'rss_peak_mb': (('server', 'rss_peak_mb'), True, 20.0),
+}
+SECRET_KEY = 'loadtest-secret'
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _summarize(samples: List[Tuple[float, bool]], duration: float) -> Dict:
+    latencies = [latency for latency, _ in samples]
+    errors = sum(1 for _, ok in samples if not ok)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+        'throughput_rps': round(len(samples) / duration, 2) if duration else 0.0,
+        'p50_ms': round(_percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(_percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(_percentile(latencies, 0.99) * 1000, 2),
+        'max_ms': round(max(latencies, default=0.0) * 1000, 2),
+    }
+
+
+def parse_mix(spec: Optional[str], target: str) -> Dict[str, float]:
+    """Parse 'path=weight,path=weight' into endpoint weights, or use the target's default workload."""
+    if not spec:
+        return WORKLOADS[target]
+    mix = {}
+    for entry in spec.split(','):
+        path, _, weight = entry.rpartition('=')
+        mix[path.strip()] = float(weight)
+    return mix
+
+
+def start_server(args, port: int) -> subprocess.Popen:
+    command = [
+        sys.executable, os.path.join(HERE, 'server.py'),
+        '--target', args.target,
+        '--port', str(port),
+        '--fleet-size', str(args.fleet_size),
+        '--latency-ms', str(args.latency_ms),
+        '--jitter-ms', str(args.jitter_ms),
+        '--seed', str(args.seed),
+        '--worker-threads', str(args.worker_threads),
+    ]
+    if args.snapshot:
+        command += ['--snapshot', os.path.abspath(args.snapshot)]
+    env = {**os.environ, 'SECRET_KEY': SECRET_KEY}
+    return subprocess.Popen(command, env=env)
+
+
+async def wait_until_ready(client: httpx.AsyncClient, server: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Load test server exited with status {server.returncode}")
+        try:
+            await client.get('/__loadtest/stats')
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError('Load test server did not start in time')
+
+
+async def run_step(
+    client: httpx.AsyncClient,
+    mix: Dict[str, float],
+    rps: float,
+    duration: float,
+    headers: List[Dict[str, str]],
+    max_in_flight: int,
+    rng: random.Random
+) -> Dict:
+    """Send requests on a fixed schedule for duration seconds and collect their latencies."""
+    paths = list(mix)
+    weights = [mix[path] for path in paths]
+    samples: Dict[str, List[Tuple[float, bool]]] = {path: [] for path in paths}
+    in_flight = asyncio.Semaphore(max_in_flight)
+    dropped = 0
+
+    async def send(path: str, scheduled: float, request_headers: Dict[str, str]) -> None:
+        try:
+            response = await client.get(path, headers=request_headers)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        finally:
+            in_flight.release()
+        samples[path].append((time.perf_counter() - scheduled, ok))
+
+    tasks = []
+    started = time.perf_counter()
+    total = int(rps * duration)
+    for i in range(total):
+        scheduled = started + i / rps
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if in_flight.locked():
+            # The client is saturated; count the request as failed rather than delay the schedule
+            dropped += 1
+            path = rng.choices(paths, weights)[0]
+            samples[path].append((time.perf_counter() - scheduled, False))
+            continue
+        await in_flight.acquire()
+        path = rng.choices(paths, weights)[0]
+        tasks.append(asyncio.create_task(send(path, scheduled, rng.choice(headers))))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    all_samples = [sample for path_samples in samples.values() for sample in path_samples]
+    return {
+        'target_rps': rps,
+        'duration_seconds': round(elapsed, 2),
+        'dropped': dropped,
+        'overall': _summarize(all_samples, elapsed),
+        'endpoints': {path: _summarize(path_samples, elapsed) for path, path_samples in samples.items()},
+    }
+
+
+def _lookup(result: Dict, path: Tuple[str, ...]) -> Optional[float]:
+    for key in path:
+        if not isinstance(result, dict) or key not in result:
+            return None
+        result = result[key]
+    return result
+
+
+def compare(baseline: Dict, current: Dict, tolerance: float) -> List[str]:
+    """List the metrics of each rate step that regressed beyond the tolerance."""
+    baseline_steps = {step['target_rps']: step for step in baseline['steps']}
+    regressions = []
+    for step in current['steps']:
+        previous = baseline_steps.get(step['target_rps'])
+        if previous is None:
+            continue
+        for name, (path, higher_is_worse, noise_floor) in COMPARED_METRICS.items():
+            before, after = _lookup(previous, path), _lookup(step, path)
+            if before is None or after is None:
+                continue
+            change = after - before if higher_is_worse else before - after
+            if change > noise_floor and change > tolerance * abs(before):
+                regressions.append(f"{step['target_rps']} rps {name}: {before} -> {after}")
+    return regressions
+
+
+def print_step(step: Dict) -> None:
+    overall = step['overall']
+    server = step['server']
+    print(
+        f"\n{step['target_rps']:>7} rps target  {overall['throughput_rps']:>8} rps achieved  "
+        f"p50 {overall['p50_ms']}ms  p95 {overall['p95_ms']}ms  p99 {overall['p99_ms']}ms  "
+        f"errors {overall['error_rate']:.2%}  dropped {step['dropped']}"
+    )
+    print(
+        f"         loop lag p50 {server['loop_lag_ms']['p50']}ms  p99 {server['loop_lag_ms']['p99']}ms  "
+        f"max {server['loop_lag_ms']['max']}ms  rss {server['rss_mb']}MB (peak {server['rss_peak_mb']}MB)"
+    )
+    for path, summary in step['endpoints'].items():
+        print(
+            f"         {path:<45} n={summary['requests']:<6} p50 {summary['p50_ms']:>8}ms  "
+            f"p99 {summary['p99_ms']:>8}ms  errors {summary['errors']}"
+        )
+
+
+async def run(args) -> Dict:
+    port = _free_port()
+    server = start_server(args, port)
+    rng = random.Random(args.seed)
+    mix = parse_mix(args.mix, args.target)
+    # Distinct users, so auth caches see as many tokens as a real deployment would
+    headers = [
+        {'Authorization': 'Bearer ' + jwt.encode({'sub': f"loadtest-{i}", 'exp': int(time.time()) + 24 * 3600}, SECRET_KEY, algorithm='HS256')}
+        for i in range(args.users)
+    ]
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=args.timeout) as client:
+            await wait_until_ready(client, server)
+            if args.warmup:
+                await run_step(client, mix, min(args.rps), args.warmup, headers, args.max_in_flight, rng)
+
+            steps = []
+            for rps in args.rps:
+                await client.post('/__loadtest/reset')
+                step = await run_step(client, mix, rps, args.duration, headers, args.max_in_flight, rng)
+                step['server'] = (await client.get('/__loadtest/stats')).json()
+                print_step(step)
+                steps.append(step)
+    finally:
+        server.terminate()
+        server.wait()
+
+    # The saturation point is the first rate the server can't keep up with or that breaks the SLO
+    saturation = next(
+        (
+            step['target_rps'] for step in steps
+            if step['overall']['throughput_rps'] < 0.95 * step['target_rps']
+            or step['overall']['p99_ms'] > args.slo_p99_ms
+            or step['overall']['error_rate'] > 0.01
+        ),
+        None
+    )
+    print(f"\nSaturation point: {saturation if saturation is not None else 'not reached'} rps (p99 SLO {args.slo_p99_ms}ms)")
+    return {
+        'target': args.target,
+        'config': {
+            'fleet_size': args.fleet_size,
+            'latency_ms': args.latency_ms,
+            'jitter_ms': args.jitter_ms,
+            'duration_seconds': args.duration,
+            'users': args.users,
+            'worker_threads': args.worker_threads,
+            'snapshot': args.snapshot,
+            'mix': mix,
+        },
+        'saturation_rps': saturation,
+        'steps': steps,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Load test app/ or backend/ with stub providers.')
+    parser.add_argument('--target', choices=['app', 'backend'], default='backend')
+    parser.add_argument('--rps', type=lambda value: [float(rate) for rate in value.split(',')], default=[20.0], help='comma-separated request rates to step through')
+    parser.add_argument('--duration', type=float, default=20, help='seconds per rate step')
+    parser.add_argument('--warmup', type=float, default=5, help='seconds of warm-up at the lowest rate')
+    parser.add_argument('--mix', help="endpoint weights as 'path=weight,...' (default: the target's standard workload)")
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--fleet-size', type=int, default=2000)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--jitter-ms', type=float, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--worker-threads', type=int, default=0, help="server's default thread pool size (0 keeps asyncio's default)")
+    parser.add_argument('--snapshot', help='replay the real providers from this captured scan snapshot instead of the stubs')
+    parser.add_argument('--max-in-flight', type=int, default=500)
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--slo-p99-ms', type=float, default=1000)
+    parser.add_argument('--output', help='write the results as JSON, e.g. to use as a baseline')
+    parser.add_argument('--baseline', help='fail if the results regress against this earlier --output')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression against the baseline')
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('target') != results['target'] or baseline.get('config') != results['config']:
+            print(f"\nWarning: {args.baseline} was recorded with a different target or configuration")
+        regressions = compare(baseline, results, args.tolerance)
+        if regressions:
+            print(f"\nRegressions against {args.baseline} (tolerance {args.tolerance:.0%}):")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"\nNo regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
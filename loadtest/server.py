@@ -0,0 +1,145 @@
+"""Run app/main.py or backend/app/main.py on uvicorn with stub providers, for load tests.
+
+Adds two endpoints the load generator reads: GET /__loadtest/stats (event-loop lag and
+memory since the last reset) and POST /__loadtest/reset, called after warm-up.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import argparse
+import asyncio
+import os
+import resource
+import sys
+import tempfile
+
+import uvicorn
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Event-loop lag is the extra delay of a sleep of this length
+LAG_SAMPLE_INTERVAL_SECONDS = 0.01
+
+
+def _rss_bytes() -> int:
+    """Current resident set size, from /proc where available."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class LoopMonitor:
+    """Sample event-loop lag and memory on the server's own loop."""
+
+    def __init__(self):
+        self.lags: List[float] = []
+        self.rss_peak = 0
+        self.task: Optional[asyncio.Task] = None
+
+    def reset(self) -> None:
+        self.lags = []
+        self.rss_peak = _rss_bytes()
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(LAG_SAMPLE_INTERVAL_SECONDS)
+            self.lags.append(max(0.0, loop.time() - started - LAG_SAMPLE_INTERVAL_SECONDS))
+            self.rss_peak = max(self.rss_peak, _rss_bytes())
+
+    def stats(self) -> Dict:
+        return {
+            'loop_lag_ms': {
+                'p50': round(_percentile(self.lags, 0.50) * 1000, 2),
+                'p99': round(_percentile(self.lags, 0.99) * 1000, 2),
+                'max': round(max(self.lags, default=0.0) * 1000, 2),
+                'samples': len(self.lags),
+            },
+            'rss_mb': round(_rss_bytes() / 2**20, 1),
+            'rss_peak_mb': round(self.rss_peak / 2**20, 1),
+        }
+
+
+def build_app(target: str, fleet_size: int, latency_ms: float, jitter_ms: float, seed: int, snapshot: Optional[str] = None):
+    """Import the target API with stub providers in place of the cloud SDK-backed ones.
+
+    With a snapshot, the real providers run instead, replaying a captured scan.
+    """
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from stubs import Latency, SyntheticFleet, build_stub_aws_service, install_app_stubs
+
+    if snapshot:
+        os.environ['SCAN_SNAPSHOT_MODE'] = 'replay'
+        os.environ['SCAN_SNAPSHOT_PATH'] = snapshot
+    fleet = SyntheticFleet(fleet_size, seed)
+    latency = Latency(latency_ms, jitter_ms, seed)
+    if target == 'app':
+        sys.path.insert(0, os.path.join(ROOT, 'app'))
+        if not snapshot:
+            install_app_stubs(fleet, latency)
+        import main
+        return main.app
+
+    sys.path.insert(0, os.path.join(ROOT, 'backend'))
+    # Settings require these; the stub service never calls AWS
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'loadtest')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'loadtest')
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    os.environ.setdefault('PROFILE_DIR', tempfile.mkdtemp(prefix='loadtest-profiles-'))
+    os.environ.setdefault('SLOW_REQUEST_SECONDS', '0')
+    from app import main
+    if not snapshot:
+        main.aws_service = build_stub_aws_service(fleet, latency)
+    return main.app
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='Serve an API with stub providers for load testing.')
+    parser.add_argument('--target', choices=['app', 'backend'], required=True)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--fleet-size', type=int, default=2000, help='resources per provider')
+    parser.add_argument('--latency-ms', type=float, default=50, help='latency of each stub provider API call')
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--worker-threads', type=int, default=0, help="size of the default thread pool (0 keeps asyncio's default)")
+    parser.add_argument('--snapshot', help='replay the real providers from a captured scan snapshot instead of the stubs')
+    args = parser.parse_args(argv)
+
+    app = build_app(args.target, args.fleet_size, args.latency_ms, args.jitter_ms, args.seed, args.snapshot)
+    monitor = LoopMonitor()
+
+    def ensure_monitoring() -> None:
+        # Started from the first load test request, which runs on the server's loop
+        if monitor.task is None:
+            if args.worker_threads:
+                asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(args.worker_threads))
+            monitor.reset()
+            monitor.task = asyncio.create_task(monitor.run())
+
+    @app.get('/__loadtest/stats', include_in_schema=False)
+    async def loadtest_stats():
+        ensure_monitoring()
+        return monitor.stats()
+
+    @app.post('/__loadtest/reset', include_in_schema=False)
+    async def loadtest_reset():
+        ensure_monitoring()
+        monitor.reset()
+        return {'ok': True}
+
+    uvicorn.run(app, host='127.0.0.1', port=args.port, log_level='warning', access_log=False)
+
+
+if __name__ == '__main__':
+    main()
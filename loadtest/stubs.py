@@ -0,0 +1,197 @@
+"""Stub cloud providers serving a synthetic fleet, for load tests without cloud credentials.
+
+Both APIs import their providers at module level, so the server installs these before
+importing an app: app/ gets stub cloud_providers.*_provider modules, backend/ gets a
+StubAWSService subclass in place of the boto3-backed service. Every provider call sleeps
+for the configured latency, the way a blocking SDK call would hold its worker thread.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import random
+import sys
+import time
+import types
+
+REGIONS = {
+    'aws': ['us-east-1', 'us-west-2', 'eu-west-1', 'ap-southeast-2'],
+    'gcp': ['us-central1', 'europe-west1', 'asia-east1'],
+    'azure': ['eastus', 'westeurope', 'southeastasia'],
+}
+INSTANCE_TYPES = {
+    'aws': [('t3.medium', 30.37), ('t3.large', 60.74), ('m5.xlarge', 140.16), ('m5.2xlarge', 280.32), ('c5.2xlarge', 248.2)],
+    'gcp': [('e2-standard-2', 48.91), ('e2-standard-4', 97.83), ('n2-standard-8', 283.54)],
+    'azure': [('Standard_D2s_v3', 70.08), ('Standard_D4s_v3', 140.16), ('Standard_E8s_v3', 367.92)],
+}
+RDS_CLASSES = [('db.t3.medium', 49.64), ('db.m5.large', 124.1), ('db.r5.xlarge', 350.4)]
+SERVICES = ['Amazon Elastic Compute Cloud - Compute', 'Amazon Relational Database Service', 'Amazon Simple Storage Service', 'AWS Lambda']
+ENVIRONMENTS = ['production', 'staging', 'development', '']
+
+
+class SyntheticFleet:
+    """A reproducible fleet of resources with utilization and monthly cost."""
+
+    def __init__(self, size: int, seed: int = 0):
+        rng = random.Random(seed)
+        self.resources: Dict[str, List[Dict]] = {}
+        for provider in REGIONS:
+            resources = []
+            for i in range(size):
+                is_rds = provider == 'aws' and i % 5 == 4
+                instance_type, monthly_cost = rng.choice(RDS_CLASSES if is_rds else INSTANCE_TYPES[provider])
+                average = rng.betavariate(1.2, 4) * 100
+                resources.append({
+                    'resource_id': f"{provider}-{'db' if is_rds else 'vm'}-{i:06d}",
+                    'resource_type': 'RDS' if is_rds else {'aws': 'EC2', 'gcp': 'Compute Engine', 'azure': 'Virtual Machine'}[provider],
+                    'region': rng.choice(REGIONS[provider]),
+                    'instance_type': instance_type,
+                    'monthly_cost': monthly_cost,
+                    'cpu_average': round(average, 2),
+                    'cpu_maximum': round(min(100.0, average * rng.uniform(1.2, 3.0)), 2),
+                })
+            self.resources[provider] = resources
+
+
+class Latency:
+    """Simulated provider API latency: a base delay plus uniform jitter."""
+
+    def __init__(self, milliseconds: float, jitter_milliseconds: float = 0, seed: int = 0):
+        self.seconds = milliseconds / 1000
+        self.jitter_seconds = jitter_milliseconds / 1000
+        self._rng = random.Random(seed)
+
+    def sleep(self, calls: int = 1) -> None:
+        for _ in range(calls):
+            time.sleep(self.seconds + self._rng.uniform(0, self.jitter_seconds))
+
+
+class StubCloudProvider:
+    """Stands in for AWSProvider, GCPProvider and AzureProvider in app/main.py."""
+
+    def __init__(self, provider: str, fleet: SyntheticFleet, latency: Latency, page_size: int = 1000):
+        from cloud_providers.inventory import Inventory, ResourceRecord
+        self._inventory_class = Inventory
+        self._record_class = ResourceRecord
+        self.provider = provider
+        self.resources = fleet.resources[provider]
+        self.latency = latency
+        # One inventory call per page of resources plus one metrics call
+        self.scan_calls = -(-len(self.resources) // page_size) + 1
+
+    def get_unused_resources(self, budget=None):
+        self.latency.sleep(self.scan_calls)
+        inventory = self._inventory_class()
+        for resource in sorted(self.resources, key=lambda item: -item['monthly_cost']):
+            if budget is not None:
+                budget.add(resource['resource_id'], resource['monthly_cost'], analyzed=True, resource_type=resource['resource_type'])
+            if resource['cpu_average'] >= 10:
+                continue
+            inventory.append(self._record_class(
+                provider=self.provider,
+                resource_id=resource['resource_id'],
+                resource_type=resource['resource_type'],
+                region=resource['region'],
+                instance_type=resource['instance_type'],
+                utilization=resource['cpu_average'],
+                recommendation='Consider stopping or terminating this instance',
+                potential_savings=resource['monthly_cost']
+            ))
+        if budget is not None:
+            inventory.coverage = budget.to_dict()
+        return inventory
+
+    def get_cost_analysis(self) -> Dict:
+        self.latency.sleep()
+        by_region: Dict[str, float] = {}
+        for resource in self.resources:
+            by_region[resource['region']] = by_region.get(resource['region'], 0.0) + resource['monthly_cost']
+        return {'total_cost': round(sum(by_region.values()), 2), 'by_region': by_region}
+
+    def get_daily_costs(self, days: int = 30) -> List[Dict]:
+        self.latency.sleep()
+        daily = sum(resource['monthly_cost'] for resource in self.resources) / 30
+        today = datetime.utcnow().date()
+        return [
+            {'provider': self.provider, 'date': (today - timedelta(days=day)).isoformat(), 'service': 'Compute', 'cost': round(daily, 2), 'currency': 'USD'}
+            for day in range(days, 0, -1)
+        ]
+
+
+def install_app_stubs(fleet: SyntheticFleet, latency: Latency) -> None:
+    """Register stub provider modules so app/main.py builds StubCloudProviders."""
+    for module_name, class_name, provider in (
+        ('aws_provider', 'AWSProvider', 'aws'),
+        ('gcp_provider', 'GCPProvider', 'gcp'),
+        ('azure_provider', 'AzureProvider', 'azure'),
+    ):
+        module = types.ModuleType(f"cloud_providers.{module_name}")
+        setattr(module, class_name, lambda provider=provider: StubCloudProvider(provider, fleet, latency))
+        sys.modules[module.__name__] = module
+
+
+def build_stub_aws_service(fleet: SyntheticFleet, latency: Latency, page_size: int = 1000):
+    """Build an AWSService for backend/app/main.py whose cloud calls return the synthetic fleet.
+
+    Only the methods that call AWS are replaced; the aggregation the API does on top of
+    them (forecasts, underutilization, utilization summaries) runs unchanged.
+    """
+    from app.services.aws_service import AWSService
+    from app.services.utilization_store import UtilizationStore
+
+    resources = fleet.resources['aws']
+
+    class StubAWSService(AWSService):
+        async def get_optimization_recommendations(self, budget=None) -> List[Dict]:
+            latency.sleep(-(-len(resources) // page_size) + 1)
+            recommendations = []
+            for resource in sorted(resources, key=lambda item: -item['monthly_cost']):
+                if budget is not None:
+                    if budget.expired():
+                        budget.add(resource['resource_id'], resource['monthly_cost'], analyzed=False, resource_type=resource['resource_type'])
+                        continue
+                    budget.add(resource['resource_id'], resource['monthly_cost'], analyzed=True, resource_type=resource['resource_type'])
+                if resource['cpu_average'] >= 20:
+                    continue
+                recommendations.append({
+                    'resource_id': resource['resource_id'],
+                    'resource_type': resource['resource_type'],
+                    'region': resource['region'],
+                    'current_config': resource['instance_type'],
+                    'recommended_config': 'smaller',
+                    'reason': 'Low utilization',
+                    'estimated_savings': round(resource['monthly_cost'] / 2, 2),
+                    'metrics': {
+                        'cpu_utilization': {'average': resource['cpu_average'], 'maximum': resource['cpu_maximum']}
+                    }
+                })
+            return recommendations
+
+        async def get_cost_analysis(self, start_date: datetime, end_date: datetime) -> Dict:
+            latency.sleep()
+            days = max((end_date.date() - start_date.date()).days, 1)
+            daily = sum(resource['monthly_cost'] for resource in resources) / 30
+            shares = [0.55, 0.3, 0.1, 0.05]
+            return {
+                'total_cost': round(daily * days, 2),
+                'start_date': start_date,
+                'end_date': end_date,
+                'currency': 'USD',
+                'breakdown_by_service': [
+                    {'service': service, 'cost': round(daily * days * share, 2), 'usage': round(days * 24 * share, 2)}
+                    for service, share in zip(SERVICES, shares)
+                ],
+                'breakdown_by_tag': {(environment or 'untagged'): round(daily * days / len(ENVIRONMENTS), 2) for environment in ENVIRONMENTS},
+                'daily_costs': [
+                    {'date': (start_date + timedelta(days=day)).strftime('%Y-%m-%d'), 'cost': round(daily, 2)}
+                    for day in range(days)
+                ],
+            }
+
+    store = UtilizationStore(path=None)
+    now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    hours = [now - timedelta(hours=hour) for hour in range(24, 0, -1)]
+    for resource in resources:
+        store.record(
+            resource['resource_id'], 'cpu', hours, [resource['cpu_average']] * len(hours),
+            resource_type=resource['resource_type'], monthly_cost=resource['monthly_cost']
+        )
+    return StubAWSService(regions=sorted({resource['region'] for resource in resources}), utilization_store=store)
@@ -0,0 +1,203 @@
+from typing import Dict, List, Optional, Tuple
+import logging
+import os
+import threading
+import time
+
+from azure.core.credentials import AccessToken
+from azure.identity import (
+    AzureCliCredential,
+    ChainedTokenCredential,
+    ClientCertificateCredential,
+    ClientSecretCredential,
+    DefaultAzureCredential,
+    ManagedIdentityCredential,
+    TokenCachePersistenceOptions,
+    WorkloadIdentityCredential,
+)
+
+logger = logging.getLogger(__name__)
+
+# Scope of the Azure Resource Manager APIs every management client calls
+MANAGEMENT_SCOPE = 'https://management.azure.com/.default'
+
+CREDENTIAL_SOURCES = ('environment', 'workload_identity', 'managed_identity', 'cli')
+
+# Tokens are refreshed in the background this long before they expire. azure-identity
+# credentials serve their own cached token until 5 minutes before expiry, so a larger
+# margin just refreshes to the same token.
+REFRESH_MARGIN_SECONDS = float(os.getenv('AZURE_TOKEN_REFRESH_MARGIN_SECONDS', 300))
+# A cached token is still handed out until this close to expiry, even if the refresh is late
+MIN_TOKEN_LIFETIME_SECONDS = 60
+# Wait before retrying a failed background refresh
+REFRESH_RETRY_SECONDS = 30
+
+
+def _token_cache_options() -> TokenCachePersistenceOptions:
+    """Persist service principal tokens across restarts (encrypted where the OS supports it)."""
+    return TokenCachePersistenceOptions(
+        name=os.getenv('AZURE_TOKEN_CACHE_NAME', 'cloudtrim'),
+        allow_unencrypted_storage=os.getenv('AZURE_TOKEN_CACHE_ALLOW_UNENCRYPTED', 'false').lower() == 'true'
+    )
+
+
+def _environment_credential():
+    """Build a service principal credential from the AZURE_* variables, or None if they are unset."""
+    tenant_id = os.getenv('AZURE_TENANT_ID')
+    client_id = os.getenv('AZURE_CLIENT_ID')
+    if not (tenant_id and client_id):
+        return None
+    if os.getenv('AZURE_CLIENT_SECRET'):
+        return ClientSecretCredential(
+            tenant_id, client_id, os.getenv('AZURE_CLIENT_SECRET'),
+            cache_persistence_options=_token_cache_options()
+        )
+    if os.getenv('AZURE_CLIENT_CERTIFICATE_PATH'):
+        return ClientCertificateCredential(
+            tenant_id, client_id, os.getenv('AZURE_CLIENT_CERTIFICATE_PATH'),
+            cache_persistence_options=_token_cache_options()
+        )
+    return None
+
+
+def build_credential_chain(sources: Optional[List[str]] = None):
+    """Build a credential that only tries the configured sources, in order.
+
+    Sources come from AZURE_CREDENTIAL_CHAIN, e.g. 'managed_identity' on Azure hosts or
+    'environment,cli' for development. Skipping the sources that can't apply avoids
+    DefaultAzureCredential's probing, notably the managed identity endpoint timing out
+    off Azure. Without a configured chain, DefaultAzureCredential is used as before.
+    """
+    if sources is None:
+        sources = [source.strip() for source in os.getenv('AZURE_CREDENTIAL_CHAIN', '').split(',') if source.strip()]
+    if not sources:
+        return DefaultAzureCredential(exclude_interactive_browser_credential=True)
+
+    credentials = []
+    for source in sources:
+        if source == 'environment':
+            credential = _environment_credential()
+            if credential is None:
+                logger.warning("AZURE_CREDENTIAL_CHAIN includes 'environment' but no service principal is configured")
+                continue
+        elif source == 'workload_identity':
+            credential = WorkloadIdentityCredential()
+        elif source == 'managed_identity':
+            credential = ManagedIdentityCredential(client_id=os.getenv('AZURE_MANAGED_IDENTITY_CLIENT_ID'))
+        elif source == 'cli':
+            credential = AzureCliCredential()
+        else:
+            raise ValueError(f"Unknown Azure credential source: {source} (expected one of {', '.join(CREDENTIAL_SOURCES)})")
+        credentials.append(credential)
+
+    if not credentials:
+        raise ValueError("AZURE_CREDENTIAL_CHAIN has no usable credential source")
+    return credentials[0] if len(credentials) == 1 else ChainedTokenCredential(*credentials)
+
+
+class CachedTokenCredential:
+    """Share one credential's tokens across every Azure client, refreshing them before they expire.
+
+    Each management client's pipeline otherwise asks the credential for its own token.
+    Here a token is fetched once per scope and tenant and handed to every client; a
+    background thread renews it refresh_margin_seconds before expiry, so callers only
+    block on the very first acquisition (which prefetch can move off the request path).
+    """
+
+    def __init__(self, credential, refresh_margin_seconds: float = REFRESH_MARGIN_SECONDS):
+        self.credential = credential
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self._tokens: Dict[Tuple, AccessToken] = {}
+        self._key_locks: Dict[Tuple, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._refresher: Optional[threading.Thread] = None
+
+    def get_token(self, *scopes: str, claims: Optional[str] = None, tenant_id: Optional[str] = None, **kwargs) -> AccessToken:
+        if claims:
+            # Claims challenges (continuous access evaluation) need a fresh token
+            return self.credential.get_token(*scopes, claims=claims, tenant_id=tenant_id, **kwargs)
+        key = (scopes, tenant_id)
+        token = self._tokens.get(key)
+        if token is not None and token.expires_on - time.time() > MIN_TOKEN_LIFETIME_SECONDS:
+            return token
+        return self._acquire(key)
+
+    def prefetch(self, *scopes: str) -> None:
+        """Acquire a token in the background so the first request doesn't wait for it."""
+        threading.Thread(target=self._prefetch, args=scopes, name='azure-token-prefetch', daemon=True).start()
+
+    def close(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        close = getattr(self.credential, 'close', None)
+        if close is not None:
+            close()
+
+    def _prefetch(self, *scopes: str) -> None:
+        try:
+            self.get_token(*scopes)
+        except Exception as e:
+            logger.warning(f"Azure token prefetch failed: {str(e)}")
+
+    def _acquire(self, key: Tuple) -> AccessToken:
+        token = self._fetch(key)
+        self._start_refresher()
+        return token
+
+    def _fetch(self, key: Tuple) -> AccessToken:
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # Another caller may have refreshed it while we waited
+            token = self._tokens.get(key)
+            if token is not None and token.expires_on - time.time() > self.refresh_margin_seconds:
+                return token
+            scopes, tenant_id = key
+            kwargs = {'tenant_id': tenant_id} if tenant_id else {}
+            token = self.credential.get_token(*scopes, **kwargs)
+            self._tokens[key] = token
+        return token
+
+    def _start_refresher(self) -> None:
+        with self._lock:
+            if self._refresher is None:
+                self._refresher = threading.Thread(target=self._refresh_loop, name='azure-token-refresh', daemon=True)
+                self._refresher.start()
+        # Reschedule around the new token's expiry
+        self._wake.set()
+
+    def _refresh_loop(self) -> None:
+        while not self._stop.is_set():
+            self._wake.clear()
+            now = time.time()
+            next_due = None
+            for key in list(self._tokens):
+                due = self._tokens[key].expires_on - self.refresh_margin_seconds
+                if due <= now:
+                    try:
+                        due = self._fetch(key).expires_on - self.refresh_margin_seconds
+                    except Exception as e:
+                        logger.warning(f"Azure token refresh failed, retrying in {REFRESH_RETRY_SECONDS}s: {str(e)}")
+                    if due <= now:
+                        # Failed, or the credential handed back the same token; try again shortly
+                        due = now + REFRESH_RETRY_SECONDS
+                next_due = due if next_due is None else min(next_due, due)
+
+            timeout = None if next_due is None else max(next_due - time.time(), 1.0)
+            self._wake.wait(timeout)
+
+
+_shared_credential: Optional[CachedTokenCredential] = None
+_shared_lock = threading.Lock()
+
+
+def shared_credential() -> CachedTokenCredential:
+    """Get the process-wide Azure credential, building it and prefetching a management token on first use."""
+    global _shared_credential
+    with _shared_lock:
+        if _shared_credential is None:
+            _shared_credential = CachedTokenCredential(build_credential_chain())
+            _shared_credential.prefetch(MANAGEMENT_SCOPE)
+        return _shared_credential
@@ -0,0 +1,184 @@
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional
+import argparse
+import os
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from cloud_providers.inventory import CATEGORICAL_FIELDS, Inventory
+
+DATASETS = ('recommendations', 'inventory', 'costs')
+FORMATS = ('parquet', 'arrow')
+
+# Arrow IPC stream media type, for HTTP responses
+ARROW_STREAM_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+
+_category = pa.dictionary(pa.int32(), pa.string())
+
+INVENTORY_SCHEMA = pa.schema(
+    [
+        pa.field('provider', _category, nullable=False),
+        pa.field('resource_id', pa.string(), nullable=False),
+        pa.field('resource_type', _category, nullable=False),
+        pa.field('region', _category),
+        pa.field('zone', _category),
+        pa.field('scope', _category),
+        pa.field('instance_type', _category),
+        pa.field('family', _category),
+        pa.field('utilization', pa.float64()),
+        pa.field('recommendation', _category),
+        pa.field('potential_savings', pa.float64()),
+        pa.field('date', pa.date32(), nullable=False),
+        pa.field('scanned_at', pa.timestamp('s', tz='UTC'), nullable=False),
+    ],
+    metadata={'dataset': 'inventory'}
+)
+
+RECOMMENDATIONS_SCHEMA = INVENTORY_SCHEMA.with_metadata({'dataset': 'recommendations'})
+
+COSTS_SCHEMA = pa.schema(
+    [
+        pa.field('provider', _category, nullable=False),
+        pa.field('date', pa.date32(), nullable=False),
+        pa.field('service', _category),
+        pa.field('cost', pa.float64(), nullable=False),
+        pa.field('currency', _category),
+    ],
+    metadata={'dataset': 'costs'}
+)
+
+
+def inventory_table(inventory: Inventory, scanned_at: Optional[datetime] = None, recommendations_only: bool = False) -> pa.Table:
+    """Build a typed Arrow table from an inventory, stamped with the scan time.
+
+    Low-cardinality strings are dictionary-encoded, matching the categorical columns of
+    Inventory.to_dataframe.
+    """
+    scanned_at = scanned_at or datetime.utcnow()
+    records = [record for record in inventory if record.recommendation] if recommendations_only else list(inventory)
+    columns = Inventory(records).to_columns()
+    columns['date'] = [scanned_at.date()] * len(records)
+    columns['scanned_at'] = [scanned_at] * len(records)
+
+    schema = RECOMMENDATIONS_SCHEMA if recommendations_only else INVENTORY_SCHEMA
+    arrays = []
+    for field in schema:
+        if field.name in CATEGORICAL_FIELDS:
+            arrays.append(pa.array(columns[field.name], type=pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(columns[field.name], type=field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def costs_table(rows: Iterable[Dict]) -> pa.Table:
+    """Build a typed Arrow table from daily cost rows (provider, date, service, cost, currency)."""
+    rows = list(rows)
+    arrays = []
+    for field in COSTS_SCHEMA:
+        values = [row.get(field.name) for row in rows]
+        if field.name == 'date':
+            values = [date.fromisoformat(value) if isinstance(value, str) else value for value in values]
+        if field.name in ('provider', 'service', 'currency'):
+            arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(values, type=field.type))
+    return pa.Table.from_arrays(arrays, schema=COSTS_SCHEMA)
+
+
+def to_arrow_stream(table: pa.Table) -> bytes:
+    """Serialize a table as an Arrow IPC stream."""
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def to_parquet(table: pa.Table) -> bytes:
+    """Serialize a table as a Parquet file."""
+    sink = pa.BufferOutputStream()
+    pq.write_table(table, sink, compression='zstd')
+    return sink.getvalue().to_pybytes()
+
+
+def write_partitioned(table: pa.Table, root: str, dataset: str, formats: Iterable[str] = FORMATS, part: Optional[str] = None) -> List[str]:
+    """Write a table under root/<format>/<dataset>/provider=<p>/date=<d>/ and return the files written.
+
+    Parquet files are zstd-compressed; .arrow files use the IPC file format so readers
+    can memory-map them (pa.memory_map + pa.ipc.open_file) and read columns without copying.
+    As usual for Hive-style layouts, provider and date live in the directory names rather
+    than the files; read each format's tree with pyarrow.dataset and partitioning='hive'
+    to get them back as columns.
+    """
+    part = part or datetime.utcnow().strftime('%Y%m%dT%H%M%S')
+    paths = []
+    if not table.num_rows:
+        return paths
+
+    keys = table.select(['provider', 'date']).group_by(['provider', 'date']).aggregate([])
+    for provider, day in zip(keys['provider'].to_pylist(), keys['date'].to_pylist()):
+        mask = pc.and_(
+            pc.equal(table['provider'].cast(pa.string()), provider),
+            pc.equal(table['date'], pa.scalar(day, pa.date32()))
+        )
+        partition = table.filter(mask).drop_columns(['provider', 'date'])
+        partition_path = os.path.join(dataset, f"provider={provider}", f"date={day.isoformat()}")
+        for file_format in formats:
+            directory = os.path.join(root, file_format, partition_path)
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"part-{part}.{file_format}")
+            if file_format == 'parquet':
+                pq.write_table(partition, path, compression='zstd')
+            elif file_format == 'arrow':
+                with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, partition.schema) as writer:
+                    writer.write_table(partition)
+            else:
+                raise ValueError(f"Unknown export format: {file_format}")
+            paths.append(path)
+    return paths
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Scan the configured providers and write the exports to a directory."""
+    parser = argparse.ArgumentParser(description='Export recommendations, inventory and daily costs as Parquet and Arrow.')
+    parser.add_argument('--output', default=os.getenv('EXPORT_DIR', 'exports'), help='root directory of the export')
+    parser.add_argument('--providers', nargs='+', default=['aws', 'gcp', 'azure'], choices=['aws', 'gcp', 'azure'])
+    parser.add_argument('--datasets', nargs='+', default=list(DATASETS), choices=DATASETS)
+    parser.add_argument('--formats', nargs='+', default=list(FORMATS), choices=FORMATS)
+    parser.add_argument('--days', type=int, default=30, help='days of cost history to export')
+    args = parser.parse_args(argv)
+
+    providers = {}
+    for name in args.providers:
+        if name == 'aws':
+            from cloud_providers.aws_provider import AWSProvider
+            providers[name] = AWSProvider()
+        elif name == 'gcp':
+            from cloud_providers.gcp_provider import GCPProvider
+            providers[name] = GCPProvider()
+        else:
+            from cloud_providers.azure_provider import AzureProvider
+            providers[name] = AzureProvider()
+
+    scanned_at = datetime.utcnow()
+    written = []
+    if {'recommendations', 'inventory'} & set(args.datasets):
+        inventory = Inventory()
+        for provider in providers.values():
+            inventory.extend(provider.get_unused_resources())
+        if 'inventory' in args.datasets:
+            written += write_partitioned(inventory_table(inventory, scanned_at), args.output, 'inventory', args.formats)
+        if 'recommendations' in args.datasets:
+            table = inventory_table(inventory, scanned_at, recommendations_only=True)
+            written += write_partitioned(table, args.output, 'recommendations', args.formats)
+    if 'costs' in args.datasets:
+        rows = [row for provider in providers.values() for row in provider.get_daily_costs(args.days)]
+        written += write_partitioned(costs_table(rows), args.output, 'costs', args.formats)
+
+    for path in written:
+        print(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+import re
+
+# Rough on-demand price per vCPU-hour (USD) used to rank resources by cost.
+# These are not billing-accurate; they only need to order the fleet sensibly.
+PRICE_PER_VCPU_HOUR = {
+    'aws': 0.048,
+    'azure': 0.048,
+    'gcp': 0.0475,
+}
+
+# vCPUs per AWS size name; 'NxLarge' sizes have 4 * N vCPUs
+AWS_SIZE_VCPUS = {
+    'nano': 2,
+    'micro': 2,
+    'small': 2,
+    'medium': 2,
+    'large': 2,
+    'xlarge': 4,
+    'metal': 96,
+}
+
+# Relative price of regions versus the cheapest US regions, by prefix
+REGION_PRICE_MULTIPLIERS = (
+    ('sa-', 1.55),
+    ('southamerica-', 1.55),
+    ('brazil', 1.55),
+    ('ap-', 1.25),
+    ('asia-', 1.25),
+    ('australia', 1.25),
+    ('japan', 1.25),
+    ('me-', 1.2),
+    ('af-', 1.2),
+    ('eu-', 1.1),
+    ('europe-', 1.1),
+    ('northeurope', 1.1),
+    ('westeurope', 1.1),
+)
+
+HOURS_PER_MONTH = 730
+
+# GCP persistent disk list price per provisioned GB-month (USD), by disk type
+GCP_DISK_PRICE_PER_GB_MONTH = {
+    'pd-standard': 0.04,
+    'pd-balanced': 0.10,
+    'pd-ssd': 0.17,
+    'pd-extreme': 0.125,
+    'hyperdisk-balanced': 0.08,
+}
+
+
+def estimate_vcpus(provider: str, instance_type: str) -> float:
+    """Estimate the vCPU count of an instance type, machine type or VM size.
+
+    Falls back to 2 vCPUs when the size cannot be parsed, so unknown resources are
+    neither ignored nor prioritized.
+    """
+    if not instance_type:
+        return 2.0
+
+    if provider == 'aws':
+        size = instance_type.split('.')[-1]
+        if size in AWS_SIZE_VCPUS:
+            # Burstable micro sizes are much cheaper than their vCPU count suggests
+            return AWS_SIZE_VCPUS[size] * (0.25 if size in ('nano', 'micro', 'small') else 1)
+        match = re.match(r'(\d+)xlarge$', size)
+        if match:
+            return 4.0 * int(match.group(1))
+    elif provider == 'gcp':
+        match = re.search(r'-(\d+)$', instance_type)
+        if match:
+            return float(match.group(1))
+    elif provider == 'azure':
+        match = re.match(r'Standard_[A-Za-z]+(\d+)', instance_type)
+        if match:
+            return float(match.group(1))
+
+    return 2.0
+
+
+def region_multiplier(region: str) -> float:
+    """Get the relative price level of a region."""
+    region = (region or '').lower()
+    for prefix, multiplier in REGION_PRICE_MULTIPLIERS:
+        if region.startswith(prefix):
+            return multiplier
+    return 1.0
+
+
+def estimate_monthly_cost(provider: str, instance_type: str, region: str = '') -> float:
+    """Estimate the monthly on-demand cost of a compute resource for prioritizing scans."""
+    hourly = estimate_vcpus(provider, instance_type) * PRICE_PER_VCPU_HOUR.get(provider, 0.048)
+    return hourly * region_multiplier(region) * HOURS_PER_MONTH
+
+
+def estimate_disk_monthly_cost(disk_type: str, size_gb: float, region: str = '') -> float:
+    """Estimate the monthly cost of a GCP persistent disk, billed whether attached or not."""
+    return GCP_DISK_PRICE_PER_GB_MONTH.get(disk_type, 0.04) * size_gb * region_multiplier(region)
@@ -0,0 +1,72 @@
+from typing import Dict, Iterable, List, Optional
+import time
+
+class ScanBudget:
+    """A scan's time budget plus coverage of the resources and spend it analyzed.
+
+    Scanners order their work by estimated cost, check expired() before each unit of
+    work and report every resource through add(), so a scan cut short by the deadline
+    still says how much of the fleet and of its spend it covered and what it skipped.
+    """
+
+    def __init__(self, budget_seconds: Optional[float] = None):
+        self.budget_seconds = budget_seconds
+        self.deadline = time.monotonic() + budget_seconds if budget_seconds is not None else None
+        self.total_resources = 0
+        self.analyzed_resources = 0
+        self.total_spend = 0.0
+        self.analyzed_spend = 0.0
+        self.skipped: List[Dict] = []
+
+    def expired(self) -> bool:
+        """Check whether the deadline has passed."""
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline, or None if the scan is unbounded."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def add(self, resource_id: str, estimated_monthly_cost: float, analyzed: bool, resource_type: str = '') -> None:
+        """Account for one resource, analyzed or skipped."""
+        self.total_resources += 1
+        self.total_spend += estimated_monthly_cost
+        if analyzed:
+            self.analyzed_resources += 1
+            self.analyzed_spend += estimated_monthly_cost
+        else:
+            self.skipped.append({
+                'resource_id': resource_id,
+                'resource_type': resource_type,
+                'estimated_monthly_cost': round(estimated_monthly_cost, 2),
+            })
+
+    def to_dict(self, max_skipped: int = 100) -> Dict:
+        """Summarize coverage, listing the most expensive skipped resources."""
+        skipped = sorted(self.skipped, key=lambda item: -item['estimated_monthly_cost'])
+        return {
+            'budget_seconds': self.budget_seconds,
+            'deadline_reached': bool(self.skipped),
+            'resources_total': self.total_resources,
+            'resources_analyzed': self.analyzed_resources,
+            'fraction_resources': round(self.analyzed_resources / self.total_resources, 4) if self.total_resources else 1.0,
+            'estimated_spend_total': round(self.total_spend, 2),
+            'estimated_spend_analyzed': round(self.analyzed_spend, 2),
+            'fraction_spend': round(self.analyzed_spend / self.total_spend, 4) if self.total_spend else 1.0,
+            'skipped_count': len(self.skipped),
+            'skipped': skipped[:max_skipped],
+        }
+
+    @classmethod
+    def combine(cls, budgets: Iterable['ScanBudget']) -> 'ScanBudget':
+        """Merge the coverage of several scans that shared one deadline."""
+        combined = cls()
+        for budget in budgets:
+            combined.budget_seconds = budget.budget_seconds
+            combined.total_resources += budget.total_resources
+            combined.analyzed_resources += budget.analyzed_resources
+            combined.total_spend += budget.total_spend
+            combined.analyzed_spend += budget.analyzed_spend
+            combined.skipped.extend(budget.skipped)
+        return combined
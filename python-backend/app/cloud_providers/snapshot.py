@@ -0,0 +1,269 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import atexit
+import datetime
+import hashlib
+import json
+import os
+import pickle
+import re
+import struct
+import threading
+import time
+import types
+import zlib
+
+CAPTURE = 'capture'
+REPLAY = 'replay'
+
+MAGIC = b'CTSNAP1\n'
+# Trailer: offset of the compressed JSON index, then the magic again
+FOOTER = struct.Struct('<Q8s')
+
+# Timestamps in call arguments (time windows relative to now) don't identify a call
+_TIME_PATTERN = re.compile(
+    r'\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?)?'
+)
+_PLAIN_TYPES = (str, bytes, int, float, bool, type(None), dict, list, tuple)
+
+
+class SnapshotMiss(KeyError):
+    """A replayed call that the snapshot has no recorded response for."""
+
+
+def _normalize(value: Any) -> Any:
+    """Reduce call arguments to JSON with timestamps blanked, so re-runs map to the same key."""
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return '<time>'
+    if isinstance(value, str):
+        return _TIME_PATTERN.sub('<time>', value)
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    if isinstance(value, dict):
+        return {str(key): _normalize(item) for key, item in sorted(value.items(), key=lambda item: str(item[0]))}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [_normalize(item) for item in value]
+        return sorted(items, key=repr) if isinstance(value, (set, frozenset)) else items
+    to_dict = getattr(type(value), 'to_dict', None)
+    if to_dict is not None:
+        # proto-plus requests (GCP)
+        try:
+            return _normalize(to_dict(value))
+        except Exception:
+            pass
+    if hasattr(value, '__dict__'):
+        return {'__type__': type(value).__name__, **_normalize(vars(value))}
+    return _TIME_PATTERN.sub('<time>', repr(value))
+
+
+def call_key(path: str, args: Tuple, kwargs: Dict) -> str:
+    """Get the snapshot key of an API call: its client path, method and normalized arguments."""
+    encoded = json.dumps([path, _normalize(args), _normalize(kwargs)], sort_keys=True, default=repr)
+    return hashlib.blake2b(encoded.encode(), digest_size=16).hexdigest()
+
+
+def _materialize(result: Any) -> Any:
+    """Drain SDK pagers and generators into lists so they can be stored and replayed."""
+    if isinstance(result, _PLAIN_TYPES):
+        return result
+    if hasattr(result, '__next__') or type(result).__name__.endswith(('Pager', 'Paged')):
+        return list(result)
+    return result
+
+
+class Snapshot:
+    """Provider API responses recorded during a scan, for replaying the scan offline.
+
+    In capture mode every call made through a wrapped client is passed to the SDK and its
+    response (or exception) is pickled, compressed and appended to the file. An index of
+    call key -> record offsets is written at the end when the snapshot is closed (at exit
+    by default). In replay mode no SDK client is created at all: calls are looked up by
+    key, read with one seek and decompressed. Repeated identical calls replay in the
+    order they were captured, wrapping around, so the same analysis can run many times.
+
+    Replay unpickles the file, so only replay snapshots you captured yourself.
+    """
+
+    def __init__(self, path: str, mode: str):
+        if mode not in (CAPTURE, REPLAY):
+            raise ValueError(f"Unknown snapshot mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._index: Dict[str, List[List[int]]] = {}
+        self._calls: Dict[str, int] = {}
+        self.metadata: Dict = {}
+        if mode == CAPTURE:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._file = open(f"{path}.tmp", 'wb')
+            self._file.write(MAGIC)
+            self.metadata = {'captured_at': time.time(), 'records': 0}
+            atexit.register(self.close)
+        else:
+            self._file = open(path, 'rb')
+            self._load_index()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == REPLAY
+
+    def _load_index(self) -> None:
+        if self._file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{self.path} is not a scan snapshot")
+        self._file.seek(-FOOTER.size, os.SEEK_END)
+        footer_start = self._file.tell()
+        index_offset, magic = FOOTER.unpack(self._file.read(FOOTER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is incomplete; was the capture closed?")
+        self._file.seek(index_offset)
+        document = json.loads(zlib.decompress(self._file.read(footer_start - index_offset)))
+        self._index = document['index']
+        self.metadata = document['metadata']
+
+    def record(self, path: str, key: str, outcome: Tuple[str, Any]) -> None:
+        """Append one call's outcome: ('result', value) or ('error', exception)."""
+        try:
+            blob = zlib.compress(pickle.dumps(outcome, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception as e:
+            if outcome[0] == 'error':
+                blob = zlib.compress(pickle.dumps(('error', RuntimeError(repr(outcome[1])))))
+            else:
+                print(f"Not capturing unpicklable response of {path}: {e}")
+                return
+        with self._lock:
+            if self._file.closed:
+                return
+            offset = self._file.tell()
+            self._file.write(blob)
+            self._index.setdefault(key, []).append([offset, len(blob)])
+            self.metadata['records'] += 1
+
+    def lookup(self, path: str, key: str) -> Any:
+        """Replay a call: return its recorded result or raise its recorded exception."""
+        with self._lock:
+            records = self._index.get(key)
+            if not records:
+                raise SnapshotMiss(f"No recorded response for {path} in {self.path}")
+            occurrence = self._calls.get(key, 0)
+            self._calls[key] = occurrence + 1
+            offset, length = records[occurrence % len(records)]
+            self._file.seek(offset)
+            blob = self._file.read(length)
+        kind, value = pickle.loads(zlib.decompress(blob))
+        if kind == 'error':
+            raise value
+        return value
+
+    def close(self) -> None:
+        """Finish a capture by writing the index; the snapshot only appears once complete."""
+        with self._lock:
+            if self._file.closed:
+                return
+            if self.mode == CAPTURE:
+                index_offset = self._file.tell()
+                self._file.write(zlib.compress(json.dumps(
+                    {'index': self._index, 'metadata': self.metadata}, separators=(',', ':')
+                ).encode()))
+                self._file.write(FOOTER.pack(index_offset, MAGIC))
+                self._file.close()
+                os.replace(f"{self.path}.tmp", self.path)
+            else:
+                self._file.close()
+
+    def client(self, name: str, factory: Callable[[], Any]) -> Any:
+        """Wrap an SDK client so its calls are captured or replayed under a name like 'aws.ec2.us-east-1'.
+
+        When replaying, factory is never called, so no credentials or network are needed.
+        """
+        if self.replaying:
+            return _ReplayProxy(self, name)
+        target = factory()
+        with self._lock:
+            # boto3 code reads client.meta.region_name; keep it for the replay
+            self.metadata.setdefault('clients', {})[name] = {
+                'region_name': getattr(getattr(target, 'meta', None), 'region_name', None)
+            }
+        return _CaptureProxy(self, target, name)
+
+
+class _CaptureProxy:
+    def __init__(self, snapshot: Snapshot, target: Any, path: str):
+        self._snapshot = snapshot
+        self._target = target
+        self._path = path
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._target, name)
+        path = f"{self._path}.{name}"
+        if name.startswith('_') or name in ('meta', 'exceptions') or isinstance(attr, (type,) + _PLAIN_TYPES):
+            return attr
+        if name == 'get_paginator':
+            return lambda operation, **kwargs: _CapturePaginator(self._snapshot, attr(operation, **kwargs), f"{path}.{operation}")
+        if callable(attr):
+            return _capture_call(self._snapshot, attr, path)
+        # Operation groups such as azure_client.metrics
+        return _CaptureProxy(self._snapshot, attr, path)
+
+
+def _capture_call(snapshot: Snapshot, method: Callable, path: str) -> Callable:
+    def call(*args, **kwargs):
+        key = call_key(path, args, kwargs)
+        try:
+            result = _materialize(method(*args, **kwargs))
+        except Exception as e:
+            snapshot.record(path, key, ('error', e))
+            raise
+        snapshot.record(path, key, ('result', result))
+        return result
+    return call
+
+
+class _CapturePaginator:
+    def __init__(self, snapshot: Snapshot, paginator: Any, path: str):
+        self._snapshot = snapshot
+        self._paginator = paginator
+        self._path = path
+
+    def paginate(self, **kwargs) -> List[Dict]:
+        return _capture_call(self._snapshot, lambda **kw: list(self._paginator.paginate(**kw)), f"{self._path}.paginate")(**kwargs)
+
+
+class _ReplayProxy:
+    def __init__(self, snapshot: Snapshot, path: str):
+        self._snapshot = snapshot
+        self._path = path
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if name == 'get_paginator':
+            return lambda operation, **kwargs: _ReplayProxy(self._snapshot, f"{self._path}.get_paginator.{operation}")
+        if name == 'meta':
+            return types.SimpleNamespace(**self._snapshot.metadata.get('clients', {}).get(self._path, {}))
+        return _ReplayProxy(self._snapshot, f"{self._path}.{name}")
+
+    def __call__(self, *args, **kwargs) -> Any:
+        return self._snapshot.lookup(self._path, call_key(self._path, args, kwargs))
+
+
+_shared: Dict[Tuple[str, str], Snapshot] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_snapshot(mode: Optional[str] = None, path: Optional[str] = None) -> Optional[Snapshot]:
+    """Get the process-wide snapshot for SCAN_SNAPSHOT_MODE and SCAN_SNAPSHOT_PATH, or None when off."""
+    mode = (mode if mode is not None else os.getenv('SCAN_SNAPSHOT_MODE', '')).lower()
+    if not mode or mode == 'off':
+        return None
+    path = path or os.getenv('SCAN_SNAPSHOT_PATH') or 'scan_snapshot.ctsnap'
+    with _shared_lock:
+        if (mode, path) not in _shared:
+            _shared[(mode, path)] = Snapshot(path, mode)
+        return _shared[(mode, path)]
+
+
+def snapshot_client(name: str, factory: Callable[[], Any], snapshot: Optional[Snapshot] = None) -> Any:
+    """Create an SDK client, wrapped for capture or replay when a snapshot is active."""
+    snapshot = snapshot or shared_snapshot()
+    if snapshot is None:
+        return factory()
+    return snapshot.client(name, factory)
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 import os
 
 class Settings(BaseSettings):
@@ -14,11 +14,81 @@ class Settings(BaseSettings):
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    TOKEN_CACHE_SIZE: int = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+    USER_CACHE_TTL_SECONDS: int = int(os.getenv("USER_CACHE_TTL_SECONDS", 60))
     
     # AWS Settings
     AWS_ACCESS_KEY_ID: str = os.getenv("AWS_ACCESS_KEY_ID")
     AWS_SECRET_ACCESS_KEY: str = os.getenv("AWS_SECRET_ACCESS_KEY")
     AWS_REGION: str = os.getenv("AWS_REGION", "us-east-1")
+    METRIC_DISCOVERY_TTL_SECONDS: int = int(os.getenv("METRIC_DISCOVERY_TTL_SECONDS", 3600))
+    
+    # Commitment (Savings Plans / RI) Settings
+    # Off by default: it needs hourly granularity enabled in Cost Explorer, and hourly queries are billed
+    COMMITMENT_ANALYSIS_ENABLED: bool = os.getenv("COMMITMENT_ANALYSIS_ENABLED", "false").lower() == "true"
+    COMMITMENT_LOOKBACK_DAYS: int = int(os.getenv("COMMITMENT_LOOKBACK_DAYS", 14))
+    COMMITMENT_TERM: str = os.getenv("COMMITMENT_TERM", "1yr")  # 1yr or 3yr
+    COMMITMENT_CACHE_TTL_SECONDS: int = int(os.getenv("COMMITMENT_CACHE_TTL_SECONDS", 86400))
+    
+    # Rightsizing Policy Settings
+    RIGHTSIZING_CPU_THRESHOLD: float = float(os.getenv("RIGHTSIZING_CPU_THRESHOLD", 20))
+    RIGHTSIZING_PEAK_THRESHOLD: float = float(os.getenv("RIGHTSIZING_PEAK_THRESHOLD", 50))
+    
+    # Utilization History Settings
+    UTILIZATION_STORE_PATH: Optional[str] = os.getenv("UTILIZATION_STORE_PATH")
+    UTILIZATION_RETENTION_DAYS: int = int(os.getenv("UTILIZATION_RETENTION_DAYS", 90))
+    UTILIZATION_QUERY_CACHE_TTL_SECONDS: int = int(os.getenv("UTILIZATION_QUERY_CACHE_TTL_SECONDS", 300))
+    MAX_BACKTEST_POLICIES: int = int(os.getenv("MAX_BACKTEST_POLICIES", 10000))
+    
+    # Sharded Scan Settings
+    SCAN_EXECUTOR: str = os.getenv("SCAN_EXECUTOR", "inline")  # inline, process or celery
+    SCAN_WORKERS: int = int(os.getenv("SCAN_WORKERS", 0))  # 0 uses one process per CPU
+    SCAN_SHARDS_PER_REGION: int = int(os.getenv("SCAN_SHARDS_PER_REGION", 1))
+    SCAN_SHARD_RETRIES: int = int(os.getenv("SCAN_SHARD_RETRIES", 2))
+    SCAN_ACCOUNT_ROLE_ARNS: str = os.getenv("SCAN_ACCOUNT_ROLE_ARNS", "")  # comma-separated
+    
+    # Snapshot Settings
+    SCAN_SNAPSHOT_MODE: str = os.getenv("SCAN_SNAPSHOT_MODE", "").lower()  # capture, replay or empty
+    SCAN_SNAPSHOT_PATH: str = os.getenv("SCAN_SNAPSHOT_PATH", "scan_snapshot.ctsnap")
+
+    # Scan Scheduling Settings
+    SCHEDULER_SLOTS: int = int(os.getenv("SCHEDULER_SLOTS", 4))
+    TENANT_MAX_CONCURRENT_SCANS: int = int(os.getenv("TENANT_MAX_CONCURRENT_SCANS", 2))
+    SCHEDULER_API_TOKENS_PER_SECOND: float = float(os.getenv("SCHEDULER_API_TOKENS_PER_SECOND", 0))  # 0 disables
+    SCHEDULER_API_TOKEN_BURST: float = float(os.getenv("SCHEDULER_API_TOKEN_BURST", 100))
+    # Tenants are the "tenant" claim of access tokens, or the username without one
+    TENANT_WEIGHTS: str = os.getenv("TENANT_WEIGHTS", "")  # e.g. "platform=2,finance=1"
+    
+    # Scheduled Shutdown Settings
+    SHUTDOWN_SCHEDULES_PATH: str = os.getenv("SHUTDOWN_SCHEDULES_PATH", "")  # empty disables
+    SHUTDOWN_DRY_RUN: bool = os.getenv("SHUTDOWN_DRY_RUN", "true").lower() == "true"
+    SHUTDOWN_TICK_SECONDS: int = int(os.getenv("SHUTDOWN_TICK_SECONDS", 60))
+    SHUTDOWN_INVENTORY_REFRESH_SECONDS: int = int(os.getenv("SHUTDOWN_INVENTORY_REFRESH_SECONDS", 900))
+    SHUTDOWN_REGIONS: str = os.getenv("SHUTDOWN_REGIONS", "")  # comma-separated; empty uses all enabled regions
+
+    # Cost Allocation Settings
+    COST_ALLOCATION_TTL_SECONDS: int = int(os.getenv("COST_ALLOCATION_TTL_SECONDS", 3600))
+
+    # S3 Inventory Settings
+    S3_INVENTORY_DIR: str = os.getenv("S3_INVENTORY_DIR", "")  # local copy of inventory reports; empty disables
+    S3_INVENTORY_PREFIX_DEPTH: int = int(os.getenv("S3_INVENTORY_PREFIX_DEPTH", 1))
+    S3_INVENTORY_WORKERS: int = int(os.getenv("S3_INVENTORY_WORKERS", 0))  # 0 uses every CPU
+    S3_MIN_MONTHLY_SAVINGS: float = float(os.getenv("S3_MIN_MONTHLY_SAVINGS", 1.0))
+
+    # Flow Log Settings
+    FLOW_LOGS_DIR: str = os.getenv("FLOW_LOGS_DIR", "")  # local copy of gzipped VPC flow logs; empty disables
+    FLOW_LOG_WORKERS: int = int(os.getenv("FLOW_LOG_WORKERS", 0))  # 0 uses every CPU
+    FLOW_LOG_INDEX_TTL_SECONDS: int = int(os.getenv("FLOW_LOG_INDEX_TTL_SECONDS", 3600))
+    FLOW_LOG_MIN_MONTHLY_SAVINGS: float = float(os.getenv("FLOW_LOG_MIN_MONTHLY_SAVINGS", 1.0))
+
+    # Dashboard Settings
+    DASHBOARD_CACHE_TTL_SECONDS: int = int(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", 300))
+    
+    # Profiling Settings
+    ADMIN_USERS: str = os.getenv("ADMIN_USERS", "")  # comma-separated usernames allowed to profile
+    PROFILE_DIR: str = os.getenv("PROFILE_DIR", "profiles")
+    SLOW_REQUEST_SECONDS: float = float(os.getenv("SLOW_REQUEST_SECONDS", 0))  # 0 disables capture; opt in with a threshold
+    PROFILE_SAMPLE_INTERVAL_MS: float = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", 5))
     
     # Database Settings
     POSTGRES_SERVER: str = os.getenv("POSTGRES_SERVER", "localhost")
@@ -33,6 +103,8 @@ class Settings(BaseSettings):
     # Redis Settings
     REDIS_HOST: str = os.getenv("REDIS_HOST", "localhost")
     REDIS_PORT: int = int(os.getenv("REDIS_PORT", 6379))
+    COALESCE_ACROSS_WORKERS: bool = os.getenv("COALESCE_ACROSS_WORKERS", "false").lower() == "true"
+    COALESCING_REDIS_DB: int = int(os.getenv("COALESCING_REDIS_DB", 1))
     
     # Celery Settings
     CELERY_BROKER_URL: str = os.getenv(
@@ -1,15 +1,23 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional
+import hashlib
+import time
 from jose import JWTError, jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from passlib.context import CryptContext
+from app.core.cache import TTLCache
 from app.core.config import Settings
 
 settings = Settings()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Verified token claims by token digest; each entry expires with its token
+verified_tokens = TTLCache(ttl_seconds=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60, maxsize=settings.TOKEN_CACHE_SIZE)
+# Users by username
+users = TTLCache(ttl_seconds=settings.USER_CACHE_TTL_SECONDS, maxsize=settings.TOKEN_CACHE_SIZE)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
     return pwd_context.verify(plain_password, hashed_password)
@@ -31,6 +39,28 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     )
     return encoded_jwt
 
+def decode_token(token: str) -> Dict:
+    """Verify a JWT and return its claims, reusing the result for tokens seen before.
+
+    Only successfully verified tokens are cached, keyed by a digest of the token, until
+    the token's own expiry. Raises JWTError for invalid or expired tokens.
+    """
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    payload = verified_tokens.get(key)
+    if payload is not None:
+        return payload
+
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    expires_in = payload["exp"] - time.time() if "exp" in payload else None
+    if expires_in is None or expires_in > 0:
+        verified_tokens.set(key, payload, expires_in)
+    return payload
+
+def get_user(username: str) -> Optional[Dict]:
+    """Look up a user by username, cached for USER_CACHE_TTL_SECONDS."""
+    # In a real application, you would fetch the user from your database here
+    return users.get_or_set(username, lambda: {"username": username})
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     """Get current user from JWT token."""
     credentials_exception = HTTPException(
@@ -39,17 +69,36 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
+        payload = decode_token(token)
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
     
-    # In a real application, you would fetch the user from your database here
-    user = {"username": username}
+    user = get_user(username)
     if user is None:
         raise credentials_exception
-    return user
+    # Users without a tenant claim are their own tenant
+    return {**user, "role": payload.get("role", "user"), "tenant": payload.get("tenant") or username}
+
+def _is_admin(username: Optional[str], role: Optional[str]) -> bool:
+    admins = {name.strip() for name in settings.ADMIN_USERS.split(",") if name.strip()}
+    return role == "admin" or (username is not None and username in admins)
+
+async def get_current_admin(current_user: dict = Depends(get_current_user)):
+    """Get the current user, requiring the admin role or an ADMIN_USERS entry."""
+    if not _is_admin(current_user["username"], current_user.get("role")):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin privileges required")
+    return current_user
+
+def is_admin_request(request: Request) -> bool:
+    """Check whether a request carries a valid admin bearer token, outside of FastAPI dependencies."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        payload = decode_token(token)
+    except JWTError:
+        return False
+    return _is_admin(payload.get("sub"), payload.get("role"))